@@ -1,14 +1,29 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
 import numpy as np
-import pandas as pd
-import tensorflow as tf
 import os
 import logging
+import threading
+from itertools import chain
 from datetime import datetime, timedelta
-from utils.scaler import scale_features, unscale_predictions
-from utils.data_prep import prepare_prediction_data
-import mysql.connector  # Ensure you have mysql-connector-python installed
+from utils.model_registry import ModelRegistry
+from utils.data_store import ConsumptionStore
+from utils.segment_store import SegmentStore
+from utils.readings import parse_readings, validate_readings, MAX_REPORTED_ERRORS
+from utils.forecasting import ForecastRequest, forecast_batch
+from utils.global_forecaster import GlobalForecaster
+from utils.forecast_cache import ForecastCache
+from utils.materialized import MaterializedForecasts
+from utils.coalescer import ForecastCoalescer
+from utils.single_flight import SingleFlight
+from utils.process_memory import process_memory
+from utils.db import ConnectionPool, connect, db_config_from_env
+from utils.users import (INSERT_USER_SQL, UserImportError, user_params,
+                         parse_bulk_users, insert_users, fetch_users_page,
+                         iter_user_pages, stream_users, page_params)
+
+# TensorFlow, pandas and mysql.connector are imported by the subsystems
+# that need them, so the non-ML endpoints come up without waiting on them
 
 app = Flask(__name__)
 CORS(app)
@@ -20,85 +35,375 @@ logger = logging.getLogger(__name__)
 # Constants
 MODELS_DIR = os.path.join(os.path.dirname(__file__), 'train', 'models')
 CSV_PATH = os.path.join(os.path.dirname(__file__), 'water_consumption_data.csv')
+READINGS_DIR = os.environ.get('READINGS_DIR', os.path.join(os.path.dirname(__file__), 'readings'))
+MODEL_CACHE_SIZE = int(os.environ.get('MODEL_CACHE_SIZE', 32))
+INFERENCE_JIT_COMPILE = os.environ.get('INFERENCE_JIT_COMPILE', '0') == '1'
+# 'keras' or 'numpy'; numpy serves the .npz files written by export_models.py
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'keras')
+INFERENCE_STATEFUL = os.environ.get('INFERENCE_STATEFUL', '0') == '1'  # numpy backend only
+FAST_START = os.environ.get('FAST_START', '0') == '1'
+FORECAST_MODEL = os.environ.get('FORECAST_MODEL', 'per_unit')  # 'per_unit' or 'global'
+FORECAST_CACHE_MB = float(os.environ.get('FORECAST_CACHE_MB', 16))
+FORECAST_CACHE_TTL = float(os.environ['FORECAST_CACHE_TTL']) if os.environ.get('FORECAST_CACHE_TTL') else None
+PREDICT_BATCH_WAIT_MS = float(os.environ.get('PREDICT_BATCH_WAIT_MS', 0))  # 0 disables coalescing
+PREDICT_MAX_BATCH = int(os.environ.get('PREDICT_MAX_BATCH', 64))
+
+# Models stay resident between requests instead of being loaded per call
+model_registry = ModelRegistry(MODELS_DIR, max_size=MODEL_CACHE_SIZE,
+                               jit_compile=INFERENCE_JIT_COMPILE,
+                               backend=INFERENCE_BACKEND,
+                               stateful=INFERENCE_STATEFUL)
+
+# Single multi-unit model, used when a request asks for model='global'
+global_forecaster = GlobalForecaster(MODELS_DIR)
+
+# Consumption data is indexed once per file version, not parsed per request,
+# and readings posted to /api/readings are appended to it unit by unit
+consumption_store = ConsumptionStore(CSV_PATH, segments=SegmentStore(READINGS_DIR))
+
+# Repeated (unit, days) forecasts are served from memory until the model
+# or the consumption data they came from changes
+forecast_cache = ForecastCache(max_bytes=int(FORECAST_CACHE_MB * 1024 * 1024),
+                               ttl=FORECAST_CACHE_TTL)
+
+# Forecasts precomputed by train/materialize_forecasts.py, served while fresh
+materialized_forecasts = MaterializedForecasts(MODELS_DIR)
+
+# Concurrent forecasts share one batched inference when a wait is configured
+coalescers = {}
+if PREDICT_BATCH_WAIT_MS > 0:
+    coalescers = {
+        model_type: ForecastCoalescer(
+            lambda reqs, model_type=model_type: run_forecasts(reqs, model_type),
+            max_wait=PREDICT_BATCH_WAIT_MS / 1000, max_batch=PREDICT_MAX_BATCH,
+            name=f'coalescer-{model_type}')
+        for model_type in ('per_unit', 'global')
+    }
+
+# Identical /api/predict calls in flight at the same time share one forecast
+predict_flights = SingleFlight()
+
+# Set once data and models are loaded; liveness does not depend on it
+ready = threading.Event()
+_startup_lock = threading.Lock()
+_startup_started = False
+
+# Database connection settings come from DB_HOST, DB_USER, DB_PASSWORD,
+# DB_NAME (or DB_ENGINE=sqlite), and the user endpoints reuse pooled
+# connections instead of connecting per request
+DB_CONFIG = db_config_from_env()
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 5))
+DB_POOL_RECYCLE = float(os.environ.get('DB_POOL_RECYCLE', 3600))
+DB_POOL_PING_AFTER = float(os.environ.get('DB_POOL_PING_AFTER', 10))
+USERS_PAGE_SIZE = int(os.environ.get('USERS_PAGE_SIZE', 500))  # rows per streamed chunk
+USERS_MAX_PAGE = int(os.environ.get('USERS_MAX_PAGE', 1000))  # largest ?limit= page
+USER_IMPORT_BATCH = int(os.environ.get('USER_IMPORT_BATCH', 500))  # rows per INSERT transaction
+
+db_pool = ConnectionPool(lambda: connect(DB_CONFIG), size=DB_POOL_SIZE,
+                         timeout=DB_POOL_TIMEOUT, recycle=DB_POOL_RECYCLE,
+                         ping_after=DB_POOL_PING_AFTER)
 
-# Database connection
 def get_db_connection():
-    return mysql.connector.connect(
-        host='127.0.0.1',
-        user='root',  # Replace with your MySQL username
-        password='kaif&*9363',  # Replace with your MySQL password
-        database='smart_water_management'
+    """Pooled connection, returned to db_pool when the with block exits"""
+    return db_pool.connection()
+
+def insert_user(params):
+    with get_db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(INSERT_USER_SQL, params)  # Hash the password before storing
+        conn.commit()
+        cursor.close()
+
+def users_page_payload(limit, after=0):
+    """One keyset page of /api/users as (body, status), with the id to pass as after for the next"""
+    try:
+        limit, after = page_params(limit, after, USERS_MAX_PAGE)
+    except ValueError as e:
+        return {'success': False, 'error': str(e)}, 400
+    with get_db_connection() as conn:
+        users = fetch_users_page(conn, after, limit)
+    next_after = users[-1]['id'] if len(users) == limit else None
+    return {'success': True, 'users': users, 'next_after': next_after}, 200
+
+def bulk_register_payload(body, content_type, email_columns=''):
+    """Response for a /api/register/bulk body as (body, status)"""
+    columns = [column for column in email_columns.split(',') if column]
+    try:
+        rows = parse_bulk_users(body, content_type, columns)
+    except ValueError as e:
+        return {'success': False, 'error': str(e)}, 400
+    try:
+        imported = insert_users(get_db_connection, rows, batch_size=USER_IMPORT_BATCH)
+    except UserImportError as e:
+        return {'success': False, 'error': str(e), 'imported': e.imported}, 500
+    return {'success': True, 'imported': imported}, 201
+
+def readings_payload(body, content_type):
+    """Response for a /api/readings body as (body, status)"""
+    consumption_store.refresh()
+    try:
+        frame = parse_readings(body, content_type)
+    except ValueError as e:
+        return {'status': 'error', 'message': str(e)}, 400
+
+    batch, duplicates, errors = validate_readings(frame, consumption_store)
+    if errors:
+        return {
+            'status': 'error',
+            'message': f"{len({error['row'] for error in errors})} invalid readings, none were stored",
+            'errors': errors[:MAX_REPORTED_ERRORS]
+        }, 400
+
+    changed = consumption_store.append(batch) if len(batch['date']) else []
+    # Cached forecasts of other units stay valid
+    changed_units = set(changed)
+    invalidated = forecast_cache.invalidate(lambda slot: (slot[1], slot[2]) in changed_units) if changed else 0
+    logger.info(f"Stored {len(batch['date'])} readings for {len(changed)} units")
+    return {
+        'status': 'success',
+        'stored': int(len(batch['date'])),
+        'duplicates': duplicates,
+        'units': [{'floor': floor, 'unit': unit} for floor, unit in changed],
+        'invalidated_forecasts': invalidated
+    }, 201
+
+def run_forecasts(forecast_requests, model_type):
+    """Fill in predictions for ForecastRequests with the chosen model family"""
+    if model_type == 'global':
+        global_forecaster.forecast_requests(forecast_requests, consumption_store)
+    elif model_type == 'per_unit':
+        forecast_batch(forecast_requests, model_registry, consumption_store)
+    else:
+        raise ValueError(f"Unknown model type: {model_type}")
+    return forecast_requests
+
+def cached_forecasts(forecast_requests, model_type):
+    """run_forecasts, answering from forecast_cache or the materialized store first"""
+    consumption_store.refresh()
+
+    misses = []
+    for req in forecast_requests:
+        try:
+            slot = (model_type, req.floor, req.unit, req.days)
+            if model_type == 'global':
+                # The start date follows the unit's last reading, so unit_version covers it
+                artifacts = global_forecaster.fingerprint()
+            else:
+                artifacts = model_registry.fingerprint(req.floor, req.unit)
+            version = (artifacts, consumption_store.unit_version(req.floor, req.unit))
+        except Exception:
+            # Let run_forecasts report the missing model on the request
+            misses.append((req, None, None))
+            continue
+
+        cached = forecast_cache.get(slot, version)
+        if cached is None and model_type == 'per_unit':
+            cached = materialized_forecasts.lookup(req.floor, req.unit, req.days, artifacts,
+                                                   consumption_store, model_registry.stateful)
+            if cached is not None:
+                forecast_cache.put(slot, version, cached)
+        if cached is not None:
+            req.predictions, req.input_data = cached
+        else:
+            misses.append((req, slot, version))
+
+    if misses:
+        coalescer = coalescers.get(model_type)
+        if coalescer is not None:
+            coalescer.submit([req for req, _, _ in misses])
+        else:
+            run_forecasts([req for req, _, _ in misses], model_type)
+        for req, slot, version in misses:
+            if slot is not None and req.error is None:
+                forecast_cache.put(slot, version, (req.predictions, req.input_data))
+
+    return forecast_requests
+
+def format_predictions(predictions):
+    """Pair forecast values with the dates they apply to, starting tomorrow"""
+    dates = [(datetime.now() + timedelta(days=i+1)).strftime('%Y-%m-%d') 
+            for i in range(len(predictions))]
+    
+    return [
+        {"date": date, "value": round(float(value), 2)} 
+        for date, value in zip(dates, predictions)
+    ]
+
+# Routes listed by / and by the 404 handler, shared with asgi_app.py
+API_ENDPOINTS = {
+    '/': 'This help message',
+    '/api/health': 'Health check endpoint',
+    '/api/ready': 'Readiness check, 503 until models and data are loaded',
+    '/api/metrics': 'Forecast cache, materialized store, batching and dedup counters',
+    '/api/predict': 'POST endpoint for predictions',
+    '/api/predict/batch': 'POST endpoint for multi-unit predictions',
+    '/api/units': 'GET endpoint for available units',
+    '/api/readings': 'POST endpoint for appending meter readings'
+}
+
+AVAILABLE_ROUTES = {
+    '/': 'API information',
+    '/api/health': 'Health check',
+    '/api/ready': 'Readiness check',
+    '/api/metrics': 'Serving counters',
+    '/api/predict': 'Make predictions (POST)',
+    '/api/predict/batch': 'Make predictions for several units (POST)',
+    '/api/units': 'Get available units (GET)',
+    '/api/readings': 'Append meter readings (POST)'
+}
+
+# Response bodies are built here and returned by both the Flask routes
+# below and the async routes in asgi_app.py, so the two stay identical
+
+def predict_payload(data):
+    """Response for one /api/predict body, raising on failure"""
+    logger.info(f"Received prediction request: {data}")
+
+    floor = data.get('floor')
+    unit = data.get('unit')
+    days = data.get('days', 7)  # Default to 7 days if not specified
+    model_type = data.get('model', FORECAST_MODEL)
+
+    # Served from the forecast cache when the model and data are unchanged;
+    # otherwise the whole forecast runs as one compiled call, shared by
+    # identical requests that arrive while it is running
+    req = predict_flights.do(
+        (model_type, floor, unit, days),
+        lambda: cached_forecasts([ForecastRequest(floor, unit, days)], model_type)[0]
     )
+    if req.error is not None:
+        raise ValueError(req.error)
+    input_data = req.input_data.reshape(1, 7, 3)
+    predictions = req.predictions
+    
+    prediction_list = format_predictions(predictions)
+    
+    return {
+        'status': 'success',
+        'predictions': prediction_list,
+        'unit_info': {
+            'floor': floor,
+            'unit': unit,
+            'residents': int(input_data[0, -1, 1]),
+            'unit_size': int(input_data[0, -1, 2])
+        }
+    }
+
+def predict_batch_payload(data):
+    """Response for one /api/predict/batch body, raising on failure"""
+    default_days = data.get('days', 7)
+    model_type = data.get('model', FORECAST_MODEL)
+    items = data.get('units', [])
+    logger.info(f"Received batch prediction request for {len(items)} units")
+
+    forecast_requests = [
+        ForecastRequest(item.get('floor'), item.get('unit'), item.get('days', default_days))
+        for item in items
+    ]
+    cached_forecasts(forecast_requests, model_type)
+
+    forecasts = []
+    for req in forecast_requests:
+        if req.error is not None:
+            forecasts.append({
+                'floor': req.floor,
+                'unit': req.unit,
+                'status': 'error',
+                'message': req.error
+            })
+            continue
+        forecasts.append({
+            'floor': req.floor,
+            'unit': req.unit,
+            'status': 'success',
+            'predictions': format_predictions(req.predictions),
+            'unit_info': {
+                'floor': req.floor,
+                'unit': req.unit,
+                'residents': int(req.input_data[-1, 1]),
+                'unit_size': int(req.input_data[-1, 2])
+            }
+        })
+
+    return {
+        'status': 'success',
+        'forecasts': forecasts
+    }
+
+def units_payload():
+    # Get unique combinations of floor and unit
+    units = [
+        {'floor': floor, 'unit': unit}
+        for floor, unit in consumption_store.units()
+    ]
+    
+    return {
+        'status': 'success',
+        'units': units
+    }
+
+def health_payload():
+    return {
+        'status': 'healthy',
+        'ready': ready.is_set(),
+        'timestamp': datetime.now().isoformat(),
+        'models_dir': os.path.exists(MODELS_DIR),
+        'data_file': os.path.exists(CSV_PATH),
+        'models': {
+            'backend': model_registry.backend,
+            'stateful': model_registry.stateful,
+            'resident': model_registry.resident(),
+            'max_size': model_registry.max_size,
+            'global_model': global_forecaster.available()
+        }
+    }
+
+def readiness_payload():
+    """(body, status code) for /api/ready"""
+    if not ready.is_set():
+        return {'status': 'starting', 'ready': False}, 503
+    return {'status': 'ready', 'ready': True}, 200
+
+def metrics_payload():
+    return {
+        'status': 'success',
+        'forecast_cache': forecast_cache.stats(),
+        'materialized': materialized_forecasts.stats(),
+        'readings': consumption_store.segments.stats(),
+        'coalescer': {model_type: c.stats() for model_type, c in coalescers.items()},
+        'single_flight': predict_flights.stats(),
+        'db_pool': db_pool.stats(),
+        'process': process_memory()
+    }
 
 @app.route('/')
 def home():
     return jsonify({
         'status': 'online',
         'message': 'Water Usage Prediction API',
-        'endpoints': {
-            '/': 'This help message',
-            '/api/health': 'Health check endpoint',
-            '/api/predict': 'POST endpoint for predictions',
-            '/api/units': 'GET endpoint for available units'
-        }
+        'endpoints': API_ENDPOINTS
     })
 
 @app.route('/api/predict', methods=['POST'])
 def predict():
     try:
-        data = request.get_json()
-        logger.info(f"Received prediction request: {data}")
-
-        floor = data.get('floor')
-        unit = data.get('unit')
-        days = data.get('days', 7)  # Default to 7 days if not specified
+        return jsonify(predict_payload(request.get_json()))
 
-        # Load the CSV data
-        df = pd.read_csv(CSV_PATH)
-        
-        # Prepare input data
-        input_data = prepare_prediction_data(df, floor, unit)
-        
-        # Load model and make prediction
-        model = tf.keras.models.load_model(os.path.join(MODELS_DIR, f'lstm_model_A{(floor-1):01d}{unit:02d}.keras'))
-        
-        # Reshape input data for LSTM (batch_size, timesteps, features)
-        input_data = input_data.reshape(1, 7, 3)
-        
-        # Make predictions
-        predictions = []
-        current_sequence = input_data.copy()
-        
-        for _ in range(days):
-            next_day = model.predict(current_sequence, verbose=0)
-            predictions.append(float(next_day[0, 0]))
-            
-            # Update sequence for next prediction
-            current_sequence[0, :-1] = current_sequence[0, 1:]  # Shift data
-            current_sequence[0, -1, 0] = next_day[0, 0]  # Add new prediction
-        
-        # Format predictions with dates
-        dates = [(datetime.now() + timedelta(days=i+1)).strftime('%Y-%m-%d') 
-                for i in range(len(predictions))]
-        
-        prediction_list = [
-            {"date": date, "value": round(value, 2)} 
-            for date, value in zip(dates, predictions)
-        ]
-        
+    except Exception as e:
+        logger.error(f"Prediction error: {str(e)}", exc_info=True)
         return jsonify({
-            'status': 'success',
-            'predictions': prediction_list,
-            'unit_info': {
-                'floor': floor,
-                'unit': unit,
-                'residents': int(input_data[0, -1, 1]),
-                'unit_size': int(input_data[0, -1, 2])
-            }
-        })
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    try:
+        return jsonify(predict_batch_payload(request.get_json()))
 
     except Exception as e:
-        logger.error(f"Prediction error: {str(e)}", exc_info=True)
+        logger.error(f"Batch prediction error: {str(e)}", exc_info=True)
         return jsonify({
             'status': 'error',
             'message': str(e)
@@ -107,23 +412,7 @@ def predict():
 @app.route('/api/units', methods=['GET'])
 def get_available_units():
     try:
-        # Read the CSV file using the absolute path
-        df = pd.read_csv(CSV_PATH)
-        
-        # Get unique combinations of floor and unit
-        units = []
-        for floor in df['floor'].unique():
-            floor_units = df[df['floor'] == floor]['unit'].unique()
-            for unit in floor_units:
-                units.append({
-                    'floor': int(floor),
-                    'unit': int(unit)
-                })
-        
-        return jsonify({
-            'status': 'success',
-            'units': units
-        })
+        return jsonify(units_payload())
         
     except Exception as e:
         logger.error(f"Error in get_available_units: {str(e)}", exc_info=True)
@@ -132,78 +421,131 @@ def get_available_units():
             'message': str(e)
         }), 500
 
+def startup():
+    """Load consumption data and warm the model registry, then mark ready"""
+    logger.info(f"Models directory: {MODELS_DIR}")
+    
+    if os.path.exists(MODELS_DIR):
+        logger.info("Found models directory")
+        files = os.listdir(MODELS_DIR)
+        logger.info(f"Number of files in models directory: {len(files)}")
+        model_registry.warm()
+    else:
+        logger.error(f"Models directory not found: {MODELS_DIR}")
+    
+    if os.path.exists(CSV_PATH):
+        logger.info(f"Found water consumption data at: {CSV_PATH}")
+        consumption_store.refresh()
+    else:
+        logger.error(f"Water consumption data not found at: {CSV_PATH}")
+    
+    ready.set()
+    logger.info("Startup complete, API is ready")
+
+def preload():
+    """Load what forked workers can share before the server forks them
+
+    The consumption arrays always, and the model weights when they are
+    plain NumPy arrays. Keras models are left to each worker because
+    TensorFlow's runtime does not survive a fork.
+    """
+    if os.path.exists(CSV_PATH):
+        consumption_store.refresh()
+    if model_registry.backend == 'numpy' and os.path.exists(MODELS_DIR):
+        model_registry.warm()
+
+def begin_startup(background=FAST_START):
+    """Run startup once, in a background thread when fast-starting"""
+    global _startup_started
+    with _startup_lock:
+        if _startup_started:
+            return
+        _startup_started = True
+    
+    if background:
+        threading.Thread(target=startup, name='startup', daemon=True).start()
+    else:
+        startup()
+
 @app.route('/api/health')
 def health():
-    return jsonify({
-        'status': 'healthy',
-        'timestamp': datetime.now().isoformat(),
-        'models_dir': os.path.exists(MODELS_DIR),
-        'data_file': os.path.exists(CSV_PATH)
-    })
+    return jsonify(health_payload())
+
+@app.route('/api/ready')
+def readiness():
+    body, status = readiness_payload()
+    return jsonify(body), status
+
+@app.route('/api/metrics')
+def metrics():
+    return jsonify(metrics_payload())
 
 @app.errorhandler(404)
 def not_found(e):
     return jsonify({
         'status': 'error',
         'message': 'Route not found',
-        'available_routes': {
-            '/': 'API information',
-            '/api/health': 'Health check',
-            '/api/predict': 'Make predictions (POST)',
-            '/api/units': 'Get available units (GET)'
-        }
+        'available_routes': AVAILABLE_ROUTES
     }), 404
 
+@app.route('/api/readings', methods=['POST'])
+def add_readings():
+    try:
+        body, status = readings_payload(request.get_data(), request.content_type)
+        return jsonify(body), status
+    except Exception as e:
+        logger.error(f"Readings ingestion error: {str(e)}", exc_info=True)
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 500
+
 @app.route('/api/register', methods=['POST'])
 def register_user():
-    data = request.get_json()
-    name = data.get('name')
-    flat_no = data.get('flatNo')
-    phone_number = data.get('phoneNumber')
-    email = data.get('email')
-    password = data.get('password')  # Ensure to hash this in production
+    try:
+        params = user_params(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
 
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        cursor.execute(
-            'INSERT INTO users (name, flat_no, phone_number, email, password_hash) VALUES (%s, %s, %s, %s, %s)',
-            (name, flat_no, phone_number, email, password)  # Hash the password before storing
-        )
-        conn.commit()
-        cursor.close()
-        conn.close()
+        insert_user(params)
         return jsonify({'success': True}), 201
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
+@app.route('/api/register/bulk', methods=['POST'])
+def register_users_bulk():
+    try:
+        body, status = bulk_register_payload(request.get_data(), request.content_type,
+                                             request.args.get('email_columns', ''))
+        return jsonify(body), status
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
 @app.route('/api/users', methods=['GET'])
 def get_all_users():
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor(dictionary=True)
-        cursor.execute('SELECT id, name, flat_no, phone_number, email FROM users')
-        users = cursor.fetchall()
-        cursor.close()
-        conn.close()
-        return jsonify({'success': True, 'users': users})
+        if request.args.get('limit'):
+            body, status = users_page_payload(request.args['limit'], request.args.get('after', 0))
+            return jsonify(body), status
+
+        # Otherwise the whole table, streamed a keyset page at a time. The
+        # first page is read up front so a database error is still a 500.
+        ndjson = request.args.get('format') == 'ndjson'
+        pages = iter_user_pages(get_db_connection, USERS_PAGE_SIZE)
+        first = next(pages, [])
+        body = stream_users(chain([first], pages), ndjson=ndjson)
+        mimetype = 'application/x-ndjson' if ndjson else 'application/json'
+        return Response(stream_with_context(body), mimetype=mimetype)
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 if __name__ == '__main__':
     logger.info("Starting server...")
-    logger.info(f"Models directory: {MODELS_DIR}")
-    
-    if os.path.exists(MODELS_DIR):
-        logger.info("Found models directory")
-        files = os.listdir(MODELS_DIR)
-        logger.info(f"Number of files in models directory: {len(files)}")
-    else:
-        logger.error(f"Models directory not found: {MODELS_DIR}")
     
-    if os.path.exists(CSV_PATH):
-        logger.info(f"Found water consumption data at: {CSV_PATH}")
-    else:
-        logger.error(f"Water consumption data not found at: {CSV_PATH}")
+    # With debug=True the reloader parent only watches files, so leave the
+    # startup work to the child process that actually serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        begin_startup()
     
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
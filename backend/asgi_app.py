@@ -0,0 +1,315 @@
+import os
+import asyncio
+import logging
+from itertools import chain
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.concurrency import iterate_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+import app as api
+from utils.users import (INSERT_USER_SQL, PAGE_USERS_SQL, USERS_STREAM_HEAD, USERS_STREAM_TAIL,
+                         parse_bulk_users, batches, iter_user_pages, encode_users_page,
+                         stream_users, page_params)
+
+# Async serving mode: the same routes and JSON bodies as app.py, served
+# from one event loop. Inference and CSV indexing run on a bounded thread
+# pool and MySQL is reached through aiomysql, so slow requests no longer
+# hold a thread per connection and /api/health stays responsive.
+#
+#   uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+
+logger = logging.getLogger(__name__)
+
+# TensorFlow releases the GIL inside graph calls, so more threads than cores
+# raises forecast throughput, but every thread also competes with the event
+# loop for the GIL between calls. Raise it when throughput matters more
+# than the latency of the cheap endpoints.
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 4 * (os.cpu_count() or 1)))
+INFERENCE_MAX_PENDING = int(os.environ.get('INFERENCE_MAX_PENDING', 1024))
+
+executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix='inference')
+_pending = None
+_rejected = 0
+_db_pool = None
+_db_pool_lock = None
+
+
+class Overloaded(Exception):
+    """The inference pool already has INFERENCE_MAX_PENDING calls running or queued"""
+
+
+async def offload(fn, *args):
+    """Run blocking work on the inference pool, rejecting calls past INFERENCE_MAX_PENDING"""
+    global _rejected
+    if _pending.locked():
+        _rejected += 1
+        raise Overloaded(f"{INFERENCE_MAX_PENDING} forecasts already pending, retry later")
+    async with _pending:
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+
+
+async def get_db_pool():
+    global _db_pool
+    async with _db_pool_lock:
+        if _db_pool is None:
+            import aiomysql
+
+            config = api.DB_CONFIG
+            _db_pool = await aiomysql.create_pool(
+                host=config['host'], port=config['port'], user=config['user'],
+                password=config['password'], db=config['database'], minsize=0,
+                maxsize=api.DB_POOL_SIZE, pool_recycle=int(api.DB_POOL_RECYCLE)
+            )
+    return _db_pool
+
+
+def error_response(message, status_code=500):
+    return JSONResponse({'status': 'error', 'message': message}, status_code=status_code)
+
+
+async def home(request):
+    return JSONResponse({
+        'status': 'online',
+        'message': 'Water Usage Prediction API',
+        'endpoints': api.API_ENDPOINTS
+    })
+
+
+async def predict(request):
+    try:
+        return JSONResponse(await offload(api.predict_payload, await request.json()))
+    except Overloaded as e:
+        return error_response(str(e), 503)
+    except Exception as e:
+        logger.error(f"Prediction error: {str(e)}", exc_info=True)
+        return error_response(str(e))
+
+
+async def predict_batch(request):
+    try:
+        return JSONResponse(await offload(api.predict_batch_payload, await request.json()))
+    except Overloaded as e:
+        return error_response(str(e), 503)
+    except Exception as e:
+        logger.error(f"Batch prediction error: {str(e)}", exc_info=True)
+        return error_response(str(e))
+
+
+async def get_available_units(request):
+    try:
+        # May index the CSV if it changed, so keep it off the event loop, but
+        # on the default pool so it does not queue behind forecasts
+        payload = await asyncio.get_running_loop().run_in_executor(None, api.units_payload)
+        return JSONResponse(payload)
+    except Exception as e:
+        logger.error(f"Error in get_available_units: {str(e)}", exc_info=True)
+        return error_response(str(e))
+
+
+async def add_readings(request):
+    try:
+        body = await request.body()
+        payload, status = await asyncio.get_running_loop().run_in_executor(
+            None, api.readings_payload, body, request.headers.get('content-type'))
+        return JSONResponse(payload, status_code=status)
+    except Exception as e:
+        logger.error(f"Readings ingestion error: {str(e)}", exc_info=True)
+        return error_response(str(e))
+
+
+async def health(request):
+    return JSONResponse(api.health_payload())
+
+
+async def readiness(request):
+    body, status = api.readiness_payload()
+    return JSONResponse(body, status_code=status)
+
+
+async def metrics(request):
+    body = api.metrics_payload()
+    body['inference_pool'] = {'workers': INFERENCE_WORKERS, 'max_pending': INFERENCE_MAX_PENDING,
+                              'rejected': _rejected}
+    if _users_async():
+        # The user endpoints use aiomysql's pool here, not app.py's
+        body['db_pool'] = {
+            'size': api.DB_POOL_SIZE,
+            'open': _db_pool.size if _db_pool is not None else 0,
+            'idle': _db_pool.freesize if _db_pool is not None else 0
+        }
+    return JSONResponse(body)
+
+
+def _users_async():
+    """Whether the user endpoints use aiomysql or app.py's pool on a thread"""
+    return api.DB_CONFIG['engine'] == 'mysql'
+
+
+async def register_user(request):
+    try:
+        params = api.user_params(await request.json())
+    except ValueError as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=400)
+
+    try:
+        if not _users_async():
+            await asyncio.get_running_loop().run_in_executor(None, api.insert_user, params)
+            return JSONResponse({'success': True}, status_code=201)
+
+        pool = await get_db_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(INSERT_USER_SQL, params)
+            await conn.commit()
+        return JSONResponse({'success': True}, status_code=201)
+    except Exception as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=500)
+
+
+async def register_users_bulk(request):
+    body = await request.body()
+    content_type = request.headers.get('content-type')
+    email_columns = request.query_params.get('email_columns', '')
+    loop = asyncio.get_running_loop()
+
+    try:
+        if not _users_async():
+            payload, status = await loop.run_in_executor(
+                None, api.bulk_register_payload, body, content_type, email_columns)
+            return JSONResponse(payload, status_code=status)
+
+        columns = [column for column in email_columns.split(',') if column]
+        try:
+            rows = await loop.run_in_executor(None, parse_bulk_users, body, content_type, columns)
+        except ValueError as e:
+            return JSONResponse({'success': False, 'error': str(e)}, status_code=400)
+
+        imported = 0
+        pool = await get_db_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                try:
+                    for batch in batches(rows, api.USER_IMPORT_BATCH):
+                        await cursor.executemany(INSERT_USER_SQL, batch)
+                        await conn.commit()
+                        imported += len(batch)
+                except Exception as e:
+                    await conn.rollback()
+                    return JSONResponse({'success': False, 'error': str(e), 'imported': imported},
+                                        status_code=500)
+        return JSONResponse({'success': True, 'imported': imported}, status_code=201)
+    except Exception as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=500)
+
+
+async def fetch_users_page_async(after_id, limit):
+    import aiomysql
+
+    pool = await get_db_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor(aiomysql.DictCursor) as cursor:
+            await cursor.execute(PAGE_USERS_SQL, (after_id, limit))
+            return list(await cursor.fetchall())
+
+
+async def stream_users_async(first, page_size, ndjson):
+    """stream_users over aiomysql keyset pages, one short checkout per page"""
+    if not ndjson:
+        yield USERS_STREAM_HEAD
+    page, is_first = first, True
+    while page:
+        yield encode_users_page(page, is_first, ndjson)
+        is_first = False
+        if len(page) < page_size:
+            break
+        page = await fetch_users_page_async(page[-1]['id'], page_size)
+    if not ndjson:
+        yield USERS_STREAM_TAIL
+
+
+async def get_all_users(request):
+    loop = asyncio.get_running_loop()
+    limit = request.query_params.get('limit')
+    after = request.query_params.get('after', 0)
+    ndjson = request.query_params.get('format') == 'ndjson'
+    media_type = 'application/x-ndjson' if ndjson else 'application/json'
+
+    try:
+        if not _users_async():
+            if limit:
+                payload, status = await loop.run_in_executor(None, api.users_page_payload, limit, after)
+                return JSONResponse(payload, status_code=status)
+            pages = iter_user_pages(api.get_db_connection, api.USERS_PAGE_SIZE)
+            first = await loop.run_in_executor(None, next, pages, [])
+            body = iterate_in_threadpool(stream_users(chain([first], pages), ndjson=ndjson))
+            return StreamingResponse(body, media_type=media_type)
+
+        if limit:
+            try:
+                limit, after = page_params(limit, after, api.USERS_MAX_PAGE)
+            except ValueError as e:
+                return JSONResponse({'success': False, 'error': str(e)}, status_code=400)
+            users = await fetch_users_page_async(after, limit)
+            next_after = users[-1]['id'] if len(users) == limit else None
+            return JSONResponse({'success': True, 'users': users, 'next_after': next_after})
+
+        # First page up front, so a database error is still a 500
+        first = await fetch_users_page_async(0, api.USERS_PAGE_SIZE)
+        return StreamingResponse(stream_users_async(first, api.USERS_PAGE_SIZE, ndjson),
+                                 media_type=media_type)
+    except Exception as e:
+        return JSONResponse({'success': False, 'error': str(e)}, status_code=500)
+
+
+async def not_found(request, exc):
+    return JSONResponse({
+        'status': 'error',
+        'message': 'Route not found',
+        'available_routes': api.AVAILABLE_ROUTES
+    }, status_code=404)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global _pending, _db_pool_lock, _db_pool
+    _pending = asyncio.Semaphore(INFERENCE_MAX_PENDING)
+    _db_pool_lock = asyncio.Lock()
+    # Same startup as the Flask server, without blocking the event loop
+    await asyncio.get_running_loop().run_in_executor(None, api.begin_startup)
+    yield
+    if _db_pool is not None:
+        _db_pool.close()
+        await _db_pool.wait_closed()
+        _db_pool = None
+    executor.shutdown(wait=False)
+
+
+app = Starlette(
+    routes=[
+        Route('/', home),
+        Route('/api/health', health),
+        Route('/api/ready', readiness),
+        Route('/api/metrics', metrics),
+        Route('/api/predict', predict, methods=['POST']),
+        Route('/api/predict/batch', predict_batch, methods=['POST']),
+        Route('/api/units', get_available_units, methods=['GET']),
+        Route('/api/readings', add_readings, methods=['POST']),
+        Route('/api/register', register_user, methods=['POST']),
+        Route('/api/register/bulk', register_users_bulk, methods=['POST']),
+        Route('/api/users', get_all_users, methods=['GET'])
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    exception_handlers={404: not_found},
+    lifespan=lifespan
+)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host='0.0.0.0', port=5000, backlog=4096)
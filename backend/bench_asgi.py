@@ -0,0 +1,138 @@
+import os
+import sys
+import time
+import socket
+import asyncio
+import argparse
+import subprocess
+
+import numpy as np
+
+# Each server runs in its own process with the forecast cache off so that
+# every /api/predict does real inference
+SERVERS = {
+    'flask': [sys.executable, '-c',
+              "import sys, logging, app\n"
+              "from werkzeug.serving import run_simple\n"
+              "logging.disable(logging.CRITICAL)\n"
+              "app.begin_startup(background=False)\n"
+              "run_simple('127.0.0.1', int(sys.argv[1]), app.app, threaded=True)\n"],
+    'asgi': [sys.executable, '-c',
+             "import sys, uvicorn\n"
+             "uvicorn.run('asgi_app:app', host='127.0.0.1', port=int(sys.argv[1]),\n"
+             "            log_level='critical', access_log=False, backlog=4096)\n"]
+}
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def percentile(values, q):
+    return float(np.percentile(np.array(values) * 1000, q)) if values else float('nan')
+
+async def mixed_load(port, duration, heavy, light, idle, days):
+    """Slow forecasts, fast probes and idle keep-alive sockets at the same time"""
+    import httpx
+
+    base = f'http://127.0.0.1:{port}'
+    limits = httpx.Limits(max_connections=heavy + light, max_keepalive_connections=heavy + light)
+    async with httpx.AsyncClient(base_url=base, limits=limits, timeout=120) as client:
+        units = (await client.get('/api/units')).json()['units']
+
+        # Dashboards that keep a connection open without sending anything
+        sockets = [await asyncio.open_connection('127.0.0.1', port) for _ in range(idle)]
+
+        latencies = {'predict': [], 'health': [], 'units': []}
+        errors = 0
+        loop = asyncio.get_running_loop()
+        stop = loop.time() + duration
+
+        async def timed(name, call):
+            nonlocal errors
+            start = time.perf_counter()
+            try:
+                response = await call()
+                if response.status_code >= 500:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+                return
+            latencies[name].append(time.perf_counter() - start)
+
+        async def forecasts(i):
+            while loop.time() < stop:
+                unit = units[i % len(units)]
+                i += heavy
+                await timed('predict', lambda: client.post(
+                    '/api/predict', json={'floor': unit['floor'], 'unit': unit['unit'], 'days': days}))
+
+        async def probes(i):
+            while loop.time() < stop:
+                path = '/api/health' if i % 2 else '/api/units'
+                i += 1
+                await timed('health' if path == '/api/health' else 'units', lambda: client.get(path))
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*[forecasts(i) for i in range(heavy)], *[probes(i) for i in range(light)])
+
+        for _, writer in sockets:
+            writer.close()
+
+    return latencies, errors
+
+def bench_server(mode, duration, heavy, light, idle, days):
+    port = free_port()
+    env = dict(os.environ, FORECAST_CACHE_MB='0')
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    server = subprocess.Popen(SERVERS[mode] + [str(port)], cwd=backend_dir, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        import httpx
+
+        deadline = time.time() + 180
+        while True:
+            try:
+                if httpx.get(f'http://127.0.0.1:{port}/api/ready', timeout=2).status_code == 200:
+                    break
+            except httpx.HTTPError:
+                pass
+            if time.time() > deadline or server.poll() is not None:
+                raise RuntimeError(f"{mode} server did not become ready")
+            time.sleep(0.5)
+
+        latencies, errors = asyncio.run(mixed_load(port, duration, heavy, light, idle, days))
+    finally:
+        server.terminate()
+        server.wait()
+
+    return {
+        'predict_rps': len(latencies['predict']) / duration,
+        'predict_p50': percentile(latencies['predict'], 50),
+        'predict_p99': percentile(latencies['predict'], 99),
+        'health_p50': percentile(latencies['health'], 50),
+        'health_p99': percentile(latencies['health'], 99),
+        'units_p99': percentile(latencies['units'], 99),
+        'errors': errors
+    }
+
+def bench_asgi(modes=('flask', 'asgi'), duration=15, heavy=32, light=32, idle=500, days=30):
+    """Tail latency of cheap endpoints while forecasts saturate the server"""
+    print(f"\nMixed load for {duration}s: {heavy} forecast clients ({days} days), "
+          f"{light} health/units clients, {idle} idle connections")
+    print(f"{'server':>7} {'predict/s':>10} {'predict p50':>12} {'predict p99':>12} "
+          f"{'health p50':>11} {'health p99':>11} {'units p99':>10} {'errors':>7}")
+    for mode in modes:
+        r = bench_server(mode, duration, heavy, light, idle, days)
+        print(f"{mode:>7} {r['predict_rps']:>10.1f} {r['predict_p50']:>12.1f} {r['predict_p99']:>12.1f} "
+              f"{r['health_p50']:>11.1f} {r['health_p99']:>11.1f} {r['units_p99']:>10.1f} {r['errors']:>7}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare the Flask and ASGI servers under mixed load')
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--heavy', type=int, default=32)
+    parser.add_argument('--light', type=int, default=32)
+    parser.add_argument('--idle', type=int, default=500)
+    parser.add_argument('--days', type=int, default=30)
+    args = parser.parse_args()
+    bench_asgi(duration=args.duration, heavy=args.heavy, light=args.light, idle=args.idle, days=args.days)
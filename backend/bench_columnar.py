@@ -0,0 +1,83 @@
+import os
+import time
+import shutil
+import tempfile
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from utils.columnar import ColumnarReadings, convert_csv, read_consumption
+from utils.data_store import ConsumptionStore
+
+CSV_PATH = 'water_consumption_data.csv'
+
+def scaled_csv(directory, multiple):
+    """Today's CSV repeated with the copies on new floors, so every unit is distinct"""
+    base = pd.read_csv(CSV_PATH)
+    floors = base['floor'].max()
+    copies = []
+    for i in range(multiple):
+        copy = base.copy()
+        copy['floor'] += i * floors
+        copies.append(copy)
+    path = os.path.join(directory, f'consumption_x{multiple}.csv')
+    pd.concat(copies, ignore_index=True).to_csv(path, index=False)
+    return path
+
+def timed(fn, repeat=3):
+    """Best of repeat runs, in ms"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def recent_from_csv(path):
+    df = pd.read_csv(path)
+    unit = df[(df['floor'] == 1) & (df['unit'] == 1)].copy()
+    unit['date'] = pd.to_datetime(unit['date'])
+    return unit.sort_values('date')['water_usage'].tail(7).values
+
+def recent_from_store(path):
+    store = ConsumptionStore(path)
+    return store.recent(1, 1, 7)
+
+def bench_columnar(multiples=(1, 10, 100)):
+    directory = tempfile.mkdtemp(prefix='columnar_')
+    try:
+        print(f"\n{'size':>5} {'rows':>8} {'CSV MB':>7} {'convert ms':>11} "
+              f"{'read_csv ms':>12} {'columnar frame ms':>18} "
+              f"{'CSV recent ms':>14} {'mmap recent ms':>15}")
+        for multiple in multiples:
+            path = scaled_csv(directory, multiple)
+            size_mb = os.path.getsize(path) / 1e6
+
+            start = time.perf_counter()
+            convert_csv(path)
+            convert_ms = (time.perf_counter() - start) * 1000
+            rows = len(ColumnarReadings.for_csv(path))
+
+            read_csv_ms = timed(lambda: pd.read_csv(path, parse_dates=['date']))
+            frame_ms = timed(lambda: read_consumption(path))
+
+            # One unit's last week from a fresh process's point of view: the
+            # old helpers parse the whole CSV, the store maps the columns
+            csv_recent_ms = timed(lambda: recent_from_csv(path))
+            mmap_recent_ms = timed(lambda: recent_from_store(path))
+            assert np.allclose(recent_from_csv(path), recent_from_store(path)[:, 0], atol=1e-3)
+
+            print(f"{str(multiple) + 'x':>5} {rows:>8} {size_mb:>7.1f} {convert_ms:>11.1f} "
+                  f"{read_csv_ms:>12.1f} {frame_ms:>18.1f} "
+                  f"{csv_recent_ms:>14.1f} {mmap_recent_ms:>15.2f}")
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='CSV vs memory-mapped columnar reads')
+    parser.add_argument('--multiples', default='1,10,100', help='data sizes relative to today')
+    args = parser.parse_args()
+
+    bench_columnar(tuple(int(m) for m in args.multiples.split(',')))
@@ -0,0 +1,95 @@
+import os
+import time
+import logging
+
+import numpy as np
+import tensorflow as tf
+
+from utils.data_store import ConsumptionStore
+from utils.forecasting import rollout, keras_predict_fn, DirectForecaster
+from utils.inference import CompiledModel
+from utils.numpy_engine import NumpyModel
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def time_call(fn, repeats):
+    """Median wall time of fn() in milliseconds"""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return float(np.median(timings))
+
+def bench_inference(floor_no=4, unit_no=4, horizons=(1, 7, 30), repeats=10,
+                    models_dir=os.path.join('train', 'models')):
+    """Compare the model.predict loop against the compiled serving paths
+
+    If the unit has a direct multi-horizon model it is timed as well.
+    """
+    model_key = f"A{(floor_no-1):01d}{unit_no:02d}"
+    model = tf.keras.models.load_model(os.path.join(models_dir, f'lstm_model_{model_key}.keras'))
+    store = ConsumptionStore('water_consumption_data.csv')
+    sequences = store.recent(floor_no, unit_no, 7)[None]
+
+    compiled = CompiledModel(model)
+    compiled.warm()
+    compiled_xla = CompiledModel(model, jit_compile=True)
+    compiled_xla.warm()
+
+    direct = None
+    direct_path = os.path.join(models_dir, f'lstm_direct_{model_key}.keras')
+    if os.path.exists(direct_path):
+        direct_model = CompiledModel(tf.keras.models.load_model(direct_path), features=1)
+        scaler = np.load(os.path.join(models_dir, f'lstm_scaler_{model_key}.npy'))
+        offset = float(scaler[1]) if len(scaler) > 1 else 0.0
+        horizon = direct_model.outputs(np.zeros((1, 7, 1), dtype=np.float32)).shape[1]
+        direct = DirectForecaster(direct_model, float(scaler[0]), horizon, model_key, offset)
+
+    print(f"\nInference latency for {model_key} (median of {repeats}, ms)")
+    print(f"{'days':>5} {'predict loop':>14} {'traced loop':>12} {'graph rollout':>14} {'xla rollout':>12}"
+          f"{' direct':>8}")
+    for days in horizons:
+        predict_loop = time_call(lambda: rollout(keras_predict_fn(model), sequences, days), repeats)
+        traced_loop = time_call(lambda: rollout(compiled.predict, sequences, days), repeats)
+        graph_rollout = time_call(lambda: compiled.rollout(sequences, days), repeats)
+        xla_rollout = time_call(lambda: compiled_xla.rollout(sequences, days), repeats)
+        direct_time = '-'
+        if direct is not None and days <= direct.horizon:
+            direct_time = f"{time_call(lambda: direct.rollout(sequences, days), repeats):.2f}"
+        print(f"{days:>5} {predict_loop:>14.2f} {traced_loop:>12.2f} {graph_rollout:>14.2f} "
+              f"{xla_rollout:>12.2f} {direct_time:>7}")
+
+def bench_stateful(floor_no=1, unit_no=1, horizons=(7, 30, 90, 365), repeats=5,
+                   models_dir=os.path.join('train', 'models')):
+    """Windowed vs stateful NumPy rollouts for an exported LSTM/GRU stack
+
+    Also reports the largest difference between the two forecasts, in
+    the model's output units.
+    """
+    model_key = f"A{(floor_no-1):01d}{unit_no:02d}"
+    path = os.path.join(models_dir, f'lstm_model_{model_key}.npz')
+    if not os.path.exists(path):
+        logger.info(f"{path} not found, run export_models.py first")
+        return
+    model = NumpyModel.load(path)
+    if not model.streamable:
+        logger.info(f"{model_key} ({model.architecture}) cannot be rolled out statefully")
+        return
+
+    store = ConsumptionStore('water_consumption_data.csv')
+    sequences = store.recent(floor_no, unit_no, 7)[None]
+    model.warm()
+
+    print(f"\nNumPy rollout latency for {model_key} ({model.architecture}, median of {repeats}, ms)")
+    print(f"{'days':>5} {'windowed':>10} {'stateful':>10} {'max drift':>10}")
+    for days in horizons:
+        windowed = time_call(lambda: model.rollout(sequences, days), repeats)
+        stateful = time_call(lambda: model.rollout_stateful(sequences, days), repeats)
+        drift = np.abs(model.rollout(sequences, days) - model.rollout_stateful(sequences, days)).max()
+        print(f"{days:>5} {windowed:>10.2f} {stateful:>10.2f} {drift:>10.4f}")
+
+if __name__ == "__main__":
+    bench_inference()
+    bench_stateful()
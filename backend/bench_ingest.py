@@ -0,0 +1,83 @@
+import os
+import time
+import shutil
+import tempfile
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from utils.data_store import ConsumptionStore, FEATURES
+from utils.segment_store import SegmentStore
+from utils.readings import validate_readings
+
+CSV_PATH = 'water_consumption_data.csv'
+
+def daily_batch(store, day):
+    """One reading per unit for a single day, as a /api/readings body would carry"""
+    units = store.units()
+    return pd.DataFrame({
+        'date': [str(day)] * len(units),
+        'floor': [floor for floor, _ in units],
+        'unit': [unit for _, unit in units],
+        'water_usage': np.random.uniform(300, 700, len(units)).round(2)
+    })
+
+def bench_ingest(batches=2000, report_every=250):
+    """Per-batch ingest and read latency as appended history grows"""
+    directory = tempfile.mkdtemp(prefix='readings_')
+    try:
+        store = ConsumptionStore(CSV_PATH, segments=SegmentStore(directory))
+        store.refresh()
+        day = max(store.series(*unit).dates[-1] for unit in store.units())
+        # Readings are dated in the past, so let validation accept them
+        today = day + batches + 1
+        floor_no, unit_no = store.units()[0]
+
+        print(f"\n{'batches':>8} {'rows/unit':>10} {'ingest ms':>10} {'recent us':>10}")
+        ingest, read = [], []
+        for i in range(1, batches + 1):
+            frame = daily_batch(store, day + i)
+            start = time.perf_counter()
+            batch, _, errors = validate_readings(frame, store, today=today)
+            assert not errors, errors
+            store.append(batch)
+            ingest.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            store.recent(floor_no, unit_no, 7)
+            read.append(time.perf_counter() - start)
+
+            if i % report_every == 0:
+                print(f"{i:>8} {len(store.series(floor_no, unit_no)):>10} "
+                      f"{np.median(ingest) * 1000:>10.2f} {np.median(read) * 1e6:>10.1f}")
+                ingest, read = [], []
+    finally:
+        shutil.rmtree(directory)
+
+def bench_csv_rewrite(multiples=(1, 4, 8)):
+    """What one batch used to cost: append to the CSV and re-index all of it"""
+    base = pd.read_csv(CSV_PATH)
+    print(f"\n{'CSV rows':>9} {'append + re-index ms':>21}")
+    for multiple in multiples:
+        frame = pd.concat([base] * multiple, ignore_index=True)
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            path = f.name
+        try:
+            frame.to_csv(path, index=False)
+            store = ConsumptionStore(path)
+            store.refresh()
+            start = time.perf_counter()
+            base.head(16).to_csv(path, mode='a', header=False, index=False)
+            store.refresh()
+            print(f"{len(frame):>9} {(time.perf_counter() - start) * 1000:>21.2f}")
+        finally:
+            os.remove(path)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Readings ingestion benchmark')
+    parser.add_argument('--batches', type=int, default=2000)
+    args = parser.parse_args()
+
+    bench_ingest(args.batches)
+    bench_csv_rewrite()
@@ -0,0 +1,45 @@
+import os
+import sys
+import json
+import subprocess
+
+# Modules that must not be imported just to serve the non-ML endpoints
+HEAVY_MODULES = ['tensorflow', 'keras', 'pandas', 'mysql']
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.app.test_client()
+response = client.get('/api/health')
+served = time.perf_counter()
+print(json.dumps({
+    'import_seconds': imported - start,
+    'first_health_seconds': served - start,
+    'health_status': response.status_code,
+    'ready': response.get_json()['ready'],
+    'heavy_modules': [m for m in %r if m in sys.modules]
+}))
+"""
+
+def check_startup(budget=float(os.environ.get('STARTUP_BUDGET_SECONDS', 1.0))):
+    """Measure cold import and first /api/health time against a budget"""
+    result = subprocess.run(
+        [sys.executable, '-c', PROBE % HEAVY_MODULES],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True, check=True
+    )
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+
+    print(f"\nImport time: {stats['import_seconds']:.3f}s")
+    print(f"First /api/health: {stats['first_health_seconds']:.3f}s "
+          f"(status {stats['health_status']}, ready={stats['ready']})")
+    print(f"Heavy modules loaded: {stats['heavy_modules'] or 'none'}")
+
+    ok = stats['first_health_seconds'] <= budget and not stats['heavy_modules']
+    print(f"\n{'Within' if ok else 'Over'} startup budget of {budget:.2f}s")
+    return ok
+
+if __name__ == "__main__":
+    sys.exit(0 if check_startup() else 1)
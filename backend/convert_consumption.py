@@ -0,0 +1,14 @@
+import logging
+import argparse
+
+from utils.columnar import convert_csv
+
+logging.basicConfig(level=logging.INFO)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Convert the consumption CSV to the memory-mapped columnar format')
+    parser.add_argument('csv_path', nargs='?', default='water_consumption_data.csv')
+    parser.add_argument('--out', help='output directory (default: next to the CSV, .columnar)')
+    args = parser.parse_args()
+
+    convert_csv(args.csv_path, args.out)
@@ -0,0 +1,54 @@
+import os
+import logging
+
+import numpy as np
+import tensorflow as tf
+
+from utils.numpy_engine import NumpyModel, export_model
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Per-unit rollout models and direct multi-horizon models
+MODEL_PREFIXES = ('lstm_model_', 'lstm_direct_')
+
+def export_models(models_dir=os.path.join('train', 'models'), tolerance=1e-4):
+    """Export every lstm_model_*/lstm_direct_*.keras to an .npz the NumPy engine can serve"""
+    exported = 0
+    for file in sorted(os.listdir(models_dir)):
+        prefix = next((p for p in MODEL_PREFIXES if file.startswith(p)), None)
+        if prefix is None or not file.endswith('.keras'):
+            continue
+        model_key = file[len(prefix):-len('.keras')]
+        model_path = os.path.join(models_dir, file)
+        export_path = os.path.join(models_dir, f'{prefix}{model_key}.npz')
+
+        try:
+            architecture = None
+            architecture_path = os.path.join(models_dir, f'architecture_{model_key}.txt')
+            if os.path.exists(architecture_path):
+                with open(architecture_path, 'r') as f:
+                    architecture = f.read().strip()
+
+            model = tf.keras.models.load_model(model_path)
+            export_model(model, export_path, architecture)
+
+            # Check the NumPy forward pass against Keras on random windows
+            sample = np.random.default_rng(0).uniform(
+                0, 1, size=(16,) + tuple(model.input_shape[1:])).astype(np.float32)
+            expected = model.predict(sample, verbose=0).reshape(16, -1)
+            actual = NumpyModel.load(export_path).outputs(sample)
+            error = float(np.max(np.abs(expected - actual)))
+            if error > tolerance:
+                raise ValueError(f"NumPy output differs from Keras by {error:.2e}")
+
+            logger.info(f"Exported {file} ({architecture}), max abs error {error:.2e}")
+            exported += 1
+        except Exception as e:
+            logger.error(f"Error exporting {file}: {e}")
+
+    logger.info(f"Exported {exported} models to {models_dir}")
+    return exported
+
+if __name__ == "__main__":
+    export_models()
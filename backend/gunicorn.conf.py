@@ -0,0 +1,49 @@
+import gc
+import os
+import logging
+
+# Production launcher for app.py:
+#
+#   gunicorn -c gunicorn.conf.py app:app
+#
+# The app is imported and its consumption arrays (and NumPy model weights)
+# loaded once in the master, then frozen out of the garbage collector's
+# reach before the workers are forked. Workers share those pages
+# copy-on-write instead of each holding a copy. Use INFERENCE_BACKEND=numpy
+# to share the models too; Keras models are loaded by every worker after
+# the fork because TensorFlow cannot be forked.
+
+logger = logging.getLogger('gunicorn.error')
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 4))
+preload_app = os.environ.get('PRELOAD_APP', '1') == '1'
+pidfile = os.environ.get('PID_FILE')
+timeout = 120
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    import app
+
+    app.preload()
+    # Objects allocated so far are never collected, so the collector does
+    # not write to (and unshare) their pages in the workers
+    gc.freeze()
+    logger.info(f"Preloaded data and {app.model_registry.backend} models, "
+                f"{gc.get_freeze_count()} objects frozen")
+
+
+def post_worker_init(worker):
+    import app
+    from utils.process_memory import process_memory
+
+    # Data is already indexed when preloaded; Keras models load here
+    app.begin_startup(background=False)
+    memory = process_memory()
+    if memory is not None:
+        logger.info(f"Worker {worker.pid} ready: RSS {memory['rss_mb']} MB, "
+                    f"PSS {memory['pss_mb']} MB")
@@ -0,0 +1,39 @@
+import sys
+import time
+import logging
+import argparse
+
+from utils.db import ConnectionPool, connect, db_config_from_env
+from utils.users import read_user_csv, insert_users, UserImportError
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def import_users(path, email_columns=None, batch_size=500):
+    """Bulk-load users from a CSV file into the DB_* configured database"""
+    config = db_config_from_env()
+    pool = ConnectionPool(lambda: connect(config), size=1)
+    start = time.perf_counter()
+    try:
+        with open(path, 'r', newline='', encoding='utf-8') as f:
+            imported = insert_users(pool.connection, read_user_csv(f, email_columns), batch_size)
+    finally:
+        pool.close()
+    elapsed = time.perf_counter() - start
+    logger.info(f"Imported {imported} users from {path} in {elapsed:.2f}s "
+                f"({imported / max(elapsed, 1e-9):.0f} rows/s)")
+    return imported
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Import users from a CSV file')
+    parser.add_argument('path', help='CSV with name, flat_no, phone_number, email, password columns')
+    parser.add_argument('--email-columns', default='',
+                        help='comma separated columns to take addresses from, e.g. sender,receiver for emails.csv')
+    parser.add_argument('--batch-size', type=int, default=500, help='rows per INSERT transaction')
+    args = parser.parse_args()
+
+    columns = [column for column in args.email_columns.split(',') if column]
+    try:
+        import_users(args.path, columns, args.batch_size)
+    except (UserImportError, ValueError) as e:
+        sys.exit(str(e))
@@ -0,0 +1,26 @@
+import time
+import logging
+import argparse
+
+from utils.readings_repository import ReadingsRepository
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def load_readings(url, csv_path='water_consumption_data.csv', batch_size=5000):
+    """Create the readings table if needed and bulk-load the consumption CSV into it"""
+    repository = ReadingsRepository.from_url(url)
+    start = time.perf_counter()
+    loaded = repository.load_csv(csv_path, batch_size)
+    elapsed = time.perf_counter() - start
+    logger.info(f"{loaded} readings in {elapsed:.2f}s ({loaded / max(elapsed, 1e-9):.0f} rows/s)")
+    return repository
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Load the consumption CSV into the readings table')
+    parser.add_argument('url', help="sqlite:///<file> for a local database, or mysql for the DB_* settings")
+    parser.add_argument('--csv', default='water_consumption_data.csv')
+    parser.add_argument('--batch-size', type=int, default=5000, help='rows per INSERT transaction')
+    args = parser.parse_args()
+
+    load_readings(args.url, args.csv, args.batch_size)
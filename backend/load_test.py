@@ -0,0 +1,88 @@
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+def run_load(clients=16, requests_per_client=50, days=7, warmup=20):
+    """Serve app on a threaded WSGI server and hammer /api/predict
+
+    Runs in the current process, so configuration comes from the
+    environment app.py reads at import.
+    """
+    import threading
+    from werkzeug.serving import make_server
+    import app
+
+    app.begin_startup(background=False)
+    units = app.consumption_store.units()
+    server = make_server('127.0.0.1', 0, app.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://127.0.0.1:{server.server_port}/api/predict'
+
+    def call(i):
+        floor_no, unit_no = units[i % len(units)]
+        body = json.dumps({'floor': int(floor_no), 'unit': int(unit_no), 'days': days}).encode()
+        request = urllib.request.Request(url, body, {'Content-Type': 'application/json'})
+        start = time.perf_counter()
+        with urllib.request.urlopen(request) as response:
+            response.read()
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(clients) as pool:
+        list(pool.map(call, range(warmup)))
+        start = time.perf_counter()
+        latencies = list(pool.map(call, range(clients * requests_per_client)))
+        elapsed = time.perf_counter() - start
+
+    server.shutdown()
+    latencies = np.array(latencies) * 1000
+    return {
+        'requests': len(latencies),
+        'throughput': len(latencies) / elapsed,
+        'p50_ms': float(np.percentile(latencies, 50)),
+        'p95_ms': float(np.percentile(latencies, 95)),
+        'coalescer': app.coalescers['per_unit'].stats() if app.coalescers else None
+    }
+
+def compare(wait_ms_values, backend='keras', clients=16, requests_per_client=50, days=7):
+    """Run the load test once per batching wait, each in a fresh process"""
+    print(f"\n/api/predict load test: {clients} clients, {backend} backend, forecast cache off")
+    print(f"{'wait ms':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'mean batch':>11} {'queue p95 ms':>13}")
+    for wait_ms in wait_ms_values:
+        env = dict(os.environ, PREDICT_BATCH_WAIT_MS=str(wait_ms), FORECAST_CACHE_MB='0',
+                   INFERENCE_BACKEND=backend)
+        result = subprocess.run(
+            [sys.executable, __file__, '--worker', '--clients', str(clients),
+             '--requests', str(requests_per_client), '--days', str(days)],
+            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+            capture_output=True, text=True, check=True
+        )
+        stats = json.loads(result.stdout.strip().splitlines()[-1])
+        coalescer = stats['coalescer'] or {}
+        mean_batch = coalescer.get('mean_batch_size') or 1
+        queue_p95 = (coalescer.get('queue_wait_ms') or {}).get('p95') or 0
+        print(f"{wait_ms:>8} {stats['throughput']:>8.1f} {stats['p50_ms']:>8.1f} {stats['p95_ms']:>8.1f} "
+              f"{mean_batch:>11} {queue_p95:>13}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare /api/predict throughput with and without batching')
+    parser.add_argument('--wait-ms', type=float, nargs='+', default=[0, 2, 5])
+    parser.add_argument('--backend', default='keras')
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=50, help='requests per client')
+    parser.add_argument('--days', type=int, default=7)
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        import logging
+        logging.disable(logging.CRITICAL)
+        print(json.dumps(run_load(args.clients, args.requests, args.days)))
+    else:
+        compare(args.wait_ms, args.backend, args.clients, args.requests, args.days)
@@ -1,6 +1,7 @@
 import numpy as np
 import tensorflow as tf
 from tensorflow.keras.models import load_model
+from utils.model_utils import get_recent_data, make_predictions
 
 def load_best_model(floor_no, unit_no):
     """Load the best performing model for a unit"""
@@ -27,7 +28,7 @@ def make_prediction(floor_no, unit_no, days=7):
         recent_data = get_recent_data(floor_no, unit_no)
         
         # Make predictions
-        predictions = predict_next_days(model, scaler, recent_data, days)
+        predictions = make_predictions(model, scaler, recent_data, days)
         
         return predictions
     except Exception as e:
@@ -0,0 +1,39 @@
+import os
+import sys
+import argparse
+
+from utils.process_memory import process_memory, child_pids
+
+def report_memory(master_pid):
+    """Print RSS and PSS for a preforking server's master and workers"""
+    rows = [('master', master_pid)] + [('worker', pid) for pid in child_pids(master_pid)]
+    print(f"\n{'process':>8} {'pid':>8} {'RSS MB':>9} {'PSS MB':>9} {'shared MB':>10} {'private MB':>11}")
+    totals = {'rss_mb': 0.0, 'pss_mb': 0.0}
+    for role, pid in rows:
+        memory = process_memory(pid)
+        if memory is None:
+            continue
+        shared = memory.get('shared_clean_mb', 0) + memory.get('shared_dirty_mb', 0)
+        private = memory.get('private_clean_mb', 0) + memory.get('private_dirty_mb', 0)
+        print(f"{role:>8} {pid:>8} {memory['rss_mb']:>9.1f} {memory['pss_mb']:>9.1f} "
+              f"{shared:>10.1f} {private:>11.1f}")
+        totals['rss_mb'] += memory['rss_mb']
+        totals['pss_mb'] += memory['pss_mb']
+
+    print(f"{'total':>8} {'':>8} {totals['rss_mb']:>9.1f} {totals['pss_mb']:>9.1f}")
+    print("\nPSS counts shared pages once across processes; its total is the real footprint")
+    return totals
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Per-worker memory of the gunicorn server')
+    parser.add_argument('pid', type=int, nargs='?', help='master pid (default: read PID_FILE)')
+    args = parser.parse_args()
+
+    pid = args.pid
+    if pid is None:
+        pid_file = os.environ.get('PID_FILE')
+        if not pid_file or not os.path.exists(pid_file):
+            sys.exit("Pass the master pid or set PID_FILE to gunicorn's pidfile")
+        with open(pid_file, 'r') as f:
+            pid = int(f.read().strip())
+    report_memory(pid)
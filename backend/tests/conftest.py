@@ -0,0 +1,63 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# utils is imported as a top-level package from backend, the training
+# helpers from backend/train, the way the scripts themselves run
+for path in (BACKEND_DIR, os.path.join(BACKEND_DIR, 'train')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+def make_readings(units=((1, 1), (1, 2)), days=30, start='2024-01-01', seed=0):
+    """Consumption rows in the CSV's layout, one per unit and day"""
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start, periods=days).strftime('%Y-%m-%d')
+    rows = []
+    for floor_no, unit_no in units:
+        usage = rng.uniform(300, 700, days).round(2)
+        for date, value in zip(dates, usage):
+            rows.append({'date': date, 'floor': floor_no, 'unit': unit_no, 'water_usage': value,
+                         'num_residents': floor_no + 1, 'unit_size': 100 + unit_no})
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def readings():
+    return make_readings()
+
+
+def build_keras_model(sequence_length=7, features=3, outputs=1, seed=0):
+    """A small seeded LSTM, standing in for a trained unit model"""
+    import keras
+
+    keras.utils.set_random_seed(seed)
+    return keras.Sequential([
+        keras.Input(shape=(sequence_length, features)),
+        keras.layers.LSTM(8, return_sequences=True),
+        keras.layers.LSTM(4),
+        keras.layers.Dense(outputs)
+    ])
+
+
+@pytest.fixture(scope='session')
+def keras_model():
+    return build_keras_model()
+
+
+@pytest.fixture(scope='session')
+def api(tmp_path_factory):
+    """The Flask app module, with its database and readings under a temp dir"""
+    directory = tmp_path_factory.mktemp('api')
+    os.environ.update({
+        'DB_ENGINE': 'sqlite',
+        'DB_NAME': str(directory / 'users.db'),
+        'READINGS_DIR': str(directory / 'readings')
+    })
+    import app
+
+    return app
@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+
+from tests.conftest import make_readings
+from utils.panel import ConsumptionPanel
+
+advanced_training = pytest.importorskip('advanced_training')
+
+
+def candidate(mae):
+    """A stand-in architecture builder; fake_fold reads its MAE back"""
+    def build(sequence_length, features=1):
+        raise AssertionError('fake_fold never builds models')
+    build.mae = mae
+    return build
+
+
+@pytest.fixture
+def trained(monkeypatch):
+    """Replace train_fold with a lookup of each candidate's fixed MAE"""
+    calls = []
+
+    def fake_fold(model_fn, X, y, train_idx, val_idx, sequence_length=7, epochs=100):
+        calls.append((model_fn, threading.current_thread()))
+        if model_fn.mae is None:
+            raise RuntimeError('does not build')
+        return model_fn.mae, f'model-{model_fn.mae}'
+
+    monkeypatch.setattr(advanced_training, 'train_fold', fake_fold)
+    return calls
+
+
+@pytest.fixture(scope='module')
+def panel():
+    return ConsumptionPanel.from_frame(make_readings(days=60))
+
+
+def search(panel, architectures, **options):
+    return advanced_training.successive_halving_search(panel, architectures, 1, 1, **options)
+
+
+def test_halving_prunes_to_one_survivor(panel, trained):
+    architectures = {'a': candidate(0.4), 'b': candidate(0.1), 'c': candidate(0.3), 'd': candidate(0.2)}
+    results, model, _, best = search(panel, architectures, n_splits=3, eta=2)
+
+    assert best == 'b' and model == 'model-0.1'
+    by_name = {r['architecture']: r for r in results}
+    assert {name: r['folds_trained'] for name, r in by_name.items()} == {'a': 1, 'b': 3, 'c': 1, 'd': 2}
+    assert {name: r['status'] for name, r in by_name.items()} == {
+        'a': 'pruned', 'b': 'selected', 'c': 'pruned', 'd': 'pruned'}
+    assert all(r['folds_budget'] == 3 for r in results)
+    # 4 candidates, then 2, then 1, instead of 4 on every fold
+    assert len(trained) == 7
+
+
+def test_failed_candidate_is_dropped(panel, trained):
+    architectures = {'ok': candidate(0.2), 'broken': candidate(None)}
+    results, _, _, best = search(panel, architectures, n_splits=2, eta=2)
+
+    assert best == 'ok'
+    # The failure never produced a score, so it has no result row
+    assert [r['architecture'] for r in results] == ['ok']
+
+
+def test_all_candidates_failing_selects_nothing(panel, trained):
+    results, model, scaler, best = search(panel, {'broken': candidate(None)}, n_splits=2)
+    assert (results, model, best) == ([], None, None)
+    assert scaler is not None
+
+
+def test_candidates_train_in_turn_by_default(panel, trained):
+    search(panel, {'a': candidate(0.1), 'b': candidate(0.2)}, n_splits=2)
+    assert {thread for _, thread in trained} == {threading.current_thread()}
+
+
+def test_threads_only_when_asked(panel, trained):
+    results, _, _, best = search(panel, {'a': candidate(0.1), 'b': candidate(0.2)},
+                                 n_splits=2, workers=2)
+    assert best == 'a'
+    assert threading.current_thread() not in {thread for _, thread in trained}
@@ -0,0 +1,56 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip('starlette')
+from starlette.testclient import TestClient
+
+
+@pytest.fixture
+def asgi(api, monkeypatch):
+    import asgi_app
+
+    # Skip loading models and data; each client gets its own pool to shut down
+    monkeypatch.setattr(api, '_startup_started', True)
+    monkeypatch.setattr(asgi_app, 'executor', ThreadPoolExecutor(max_workers=1))
+    return asgi_app
+
+
+def test_register_rejects_bad_bodies_with_400(asgi):
+    with TestClient(asgi.app) as client:
+        response = client.post('/api/register', content=b'{not json',
+                               headers={'content-type': 'application/json'})
+        assert response.status_code == 400
+        assert response.json()['success'] is False
+
+        response = client.post('/api/register', json=['a', 'list'])
+        assert response.status_code == 400
+        assert response.json() == {'success': False, 'error': 'Expected a JSON object'}
+
+
+def test_register_stores_the_user(asgi):
+    with TestClient(asgi.app) as client:
+        response = client.post('/api/register', json={'name': 'Asgi', 'flatNo': 'A101',
+                                                      'email': 'asgi@example.com'})
+        assert response.status_code == 201
+        users = client.get('/api/users', params={'limit': 100}).json()['users']
+    assert 'asgi@example.com' in [user['email'] for user in users]
+
+
+def test_forecasts_past_the_pending_limit_get_503(asgi, monkeypatch):
+    monkeypatch.setattr(asgi, 'INFERENCE_MAX_PENDING', 0)
+    rejected = asgi._rejected
+    with TestClient(asgi.app) as client:
+        response = client.post('/api/predict', json={'floor': 1, 'unit': 1, 'days': 7})
+        assert response.status_code == 503
+        assert response.json()['status'] == 'error'
+        batch = client.post('/api/predict/batch', json={'units': [{'floor': 1, 'unit': 1}]})
+        assert batch.status_code == 503
+        assert client.get('/api/metrics').json()['inference_pool']['rejected'] == rejected + 2
+
+
+def test_flask_register_rejects_bad_json_with_400(api):
+    response = api.app.test_client().post('/api/register', data=b'{not json',
+                                           content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
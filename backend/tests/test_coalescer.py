@@ -0,0 +1,89 @@
+import time
+import threading
+
+import numpy as np
+
+from utils.coalescer import ForecastCoalescer
+from utils.forecasting import ForecastRequest
+
+
+class Recorder:
+    """run_batch stand-in that fills in predictions and records batch sizes"""
+
+    def __init__(self, gate=None):
+        self.batches = []
+        self.gate = gate
+        self.entered = threading.Event()
+
+    def __call__(self, requests):
+        self.entered.set()
+        if self.gate is not None:
+            self.gate.wait(timeout=5)
+        self.batches.append(len(requests))
+        for req in requests:
+            req.predictions = np.full(req.days, float(req.unit))
+
+
+def test_submit_fills_requests_in():
+    run_batch = Recorder()
+    requests = [ForecastRequest(1, unit, 3) for unit in (1, 2)]
+    ForecastCoalescer(run_batch).submit(requests)
+
+    assert run_batch.batches == [2]
+    np.testing.assert_array_equal(requests[1].predictions, [2.0, 2.0, 2.0])
+
+
+def test_concurrent_submits_share_a_batch():
+    gate = threading.Event()
+    run_batch = Recorder(gate)
+    coalescer = ForecastCoalescer(run_batch, max_wait=0.05)
+
+    # The first batch blocks in run_batch while the others queue behind it
+    threads = [threading.Thread(target=coalescer.submit, args=([ForecastRequest(1, unit, 1)],))
+               for unit in range(1, 6)]
+    threads[0].start()
+    assert run_batch.entered.wait(timeout=5)
+    for thread in threads[1:]:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while coalescer._queue.qsize() < 4 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    gate.set()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert run_batch.batches == [1, 4]
+    stats = coalescer.stats()
+    assert stats['batches'] == 2 and stats['requests'] == 5
+    assert stats['max_batch_size'] == 4
+    assert stats['batch_size_histogram']['<=1'] == 1 and stats['batch_size_histogram']['<=4'] == 1
+
+
+def test_batches_are_capped_at_max_batch():
+    gate = threading.Event()
+    run_batch = Recorder(gate)
+    coalescer = ForecastCoalescer(run_batch, max_wait=0.05, max_batch=2)
+    requests = [ForecastRequest(1, unit, 1) for unit in range(1, 6)]
+
+    gate.set()
+    coalescer.submit(requests)
+    assert sum(run_batch.batches) == 5
+    assert max(run_batch.batches) == 2
+
+
+def test_failed_batch_reports_the_error_on_each_request():
+    def run_batch(requests):
+        requests[0].predictions = np.zeros(1)
+        raise RuntimeError('model crashed')
+
+    requests = [ForecastRequest(1, unit, 1) for unit in (1, 2)]
+    coalescer = ForecastCoalescer(run_batch)
+    coalescer.submit(requests)
+
+    assert requests[0].error is None
+    assert requests[1].error == 'model crashed'
+    # The worker survives the failure
+    later = ForecastRequest(1, 3, 1)
+    coalescer.run_batch = Recorder()
+    coalescer.submit([later])
+    assert later.predictions is not None
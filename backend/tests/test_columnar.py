@@ -0,0 +1,88 @@
+import os
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.columnar import ColumnarReadings, columnar_path, convert_csv, read_consumption
+from utils.data_store import ConsumptionStore
+from tests.conftest import make_readings
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    # Rows out of date order and units interleaved, as a hand-edited CSV might be
+    frame = make_readings(units=((2, 1), (1, 3), (1, 1)), days=20)
+    frame = frame.sample(frac=1, random_state=0).reset_index(drop=True)
+    path = str(tmp_path / 'consumption.csv')
+    frame.to_csv(path, index=False)
+    return path
+
+
+def sorted_frame(frame):
+    frame = frame.assign(date=pd.to_datetime(frame['date']))
+    return frame.sort_values(['floor', 'unit', 'date']).reset_index(drop=True)
+
+
+def test_round_trip_matches_the_csv(csv_path):
+    out_path = convert_csv(csv_path)
+    assert out_path == columnar_path(csv_path)
+    readings = ColumnarReadings.for_csv(csv_path)
+
+    original = sorted_frame(pd.read_csv(csv_path))
+    converted = sorted_frame(readings.frame())
+    assert len(readings) == len(original)
+    np.testing.assert_array_equal(converted['date'].values, original['date'].values)
+    for column in ('floor', 'unit', 'water_usage', 'num_residents', 'unit_size'):
+        np.testing.assert_array_equal(converted[column].values, original[column].values)
+
+
+def test_units_are_contiguous_and_date_sorted(csv_path):
+    readings = ColumnarReadings(convert_csv(csv_path))
+    first_seen = list(dict.fromkeys(zip(*pd.read_csv(csv_path)[['floor', 'unit']].values.T)))
+    assert readings.unit_keys() == [(int(f), int(u)) for f, u in first_seen]
+
+    start, end = readings.unit_rows(1, 3)
+    assert end - start == 20
+    dates = readings.unit_column(1, 3, 'date')
+    assert np.all(np.diff(dates) == np.timedelta64(1, 'D'))
+    assert readings.unit_rows(9, 9) is None and readings.unit_column(9, 9, 'date') is None
+    assert len(readings.frame(1, 3)) == 20 and len(readings.frame(9, 9)) == 0
+
+
+def test_stale_copy_is_ignored(csv_path):
+    convert_csv(csv_path)
+    make_readings(days=5).to_csv(csv_path, index=False)
+    assert ColumnarReadings.for_csv(csv_path) is None
+    assert len(read_consumption(csv_path)) == 10
+
+
+def test_older_format_is_ignored(csv_path):
+    out_path = convert_csv(csv_path)
+    meta_path = os.path.join(out_path, 'meta.json')
+    with open(meta_path) as f:
+        meta = json.load(f)
+    with open(meta_path, 'w') as f:
+        json.dump({**meta, 'format': 1}, f)
+    assert ColumnarReadings.for_csv(csv_path) is None
+    assert len(read_consumption(csv_path)) == 60
+
+
+def test_reconverting_replaces_the_copy(csv_path):
+    convert_csv(csv_path)
+    make_readings(days=5).to_csv(csv_path, index=False)
+    convert_csv(csv_path)
+    assert len(ColumnarReadings.for_csv(csv_path)) == 10
+    directory = os.path.dirname(csv_path)
+    assert sorted(os.listdir(directory)) == ['consumption.columnar', 'consumption.csv']
+
+
+def test_store_serves_the_same_windows_from_either_format(csv_path):
+    from_csv = ConsumptionStore.from_frame(pd.read_csv(csv_path))
+    convert_csv(csv_path)
+    mapped = ConsumptionStore(csv_path)
+    assert mapped.units() == from_csv.units()
+    for floor_no, unit_no in from_csv.units():
+        np.testing.assert_array_equal(mapped.recent(floor_no, unit_no, 7),
+                                      from_csv.recent(floor_no, unit_no, 7))
@@ -0,0 +1,58 @@
+import os
+
+import numpy as np
+import pytest
+
+from utils.data_prep import prepare_prediction_data
+from utils.data_store import ConsumptionStore
+from tests.conftest import make_readings
+
+
+def test_recent_matches_the_frame(readings):
+    store = ConsumptionStore.from_frame(readings.sample(frac=1, random_state=0))
+    unit = readings[(readings['floor'] == 1) & (readings['unit'] == 2)].sort_values('date')
+    expected = unit[['water_usage', 'num_residents', 'unit_size']].values[-7:]
+    np.testing.assert_array_equal(store.recent(1, 2, 7), expected)
+
+
+def test_units_keep_file_order():
+    frame = make_readings(units=((2, 3), (1, 2), (2, 1)), days=3)
+    assert ConsumptionStore.from_frame(frame).units() == [(2, 3), (2, 1), (1, 2)]
+
+
+def test_insufficient_data(readings):
+    store = ConsumptionStore.from_frame(readings)
+    with pytest.raises(ValueError):
+        store.recent(1, 1, 31)
+    with pytest.raises(ValueError):
+        store.recent(9, 9, 1)
+
+
+def test_prepare_prediction_data_accepts_a_frame(readings):
+    window = prepare_prediction_data(readings, 1, 1)
+    assert window.shape == (7, 3)
+    np.testing.assert_array_equal(window, ConsumptionStore.from_frame(readings).recent(1, 1, 7))
+
+
+def test_refresh_reloads_a_changed_csv(tmp_path, readings):
+    path = str(tmp_path / 'consumption.csv')
+    readings.to_csv(path, index=False)
+    store = ConsumptionStore(path)
+    assert len(store.series(1, 1)) == 30
+    version = store.unit_version(1, 1)
+
+    make_readings(days=40).to_csv(path, index=False)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert len(store.series(1, 1)) == 40
+    assert store.unit_version(1, 1) != version
+
+
+def test_refresh_skips_an_unchanged_csv(tmp_path, readings):
+    path = str(tmp_path / 'consumption.csv')
+    readings.to_csv(path, index=False)
+    store = ConsumptionStore(path)
+    store.refresh()
+    version = store.version
+    store.refresh()
+    assert store.version == version
@@ -0,0 +1,149 @@
+import threading
+import time
+
+import pytest
+
+from utils import db
+from utils.db import ConnectionPool, PoolTimeout, SQLiteConnection
+
+
+class FakeConnection:
+    def __init__(self, fail_ping=False, fail_rollback=False):
+        self.fail_ping = fail_ping
+        self.fail_rollback = fail_rollback
+        self.rollbacks = 0
+        self.closed = False
+
+    def ping(self, reconnect=False):
+        if self.fail_ping:
+            raise ConnectionError('gone away')
+
+    def rollback(self):
+        self.rollbacks += 1
+        if self.fail_rollback:
+            raise ConnectionError('gone away')
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(db.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def fake_pool(**options):
+    opened = []
+
+    def connect():
+        opened.append(FakeConnection())
+        return opened[-1]
+
+    pool = ConnectionPool(connect, **options)
+    pool.opened_connections = opened
+    return pool
+
+
+def test_reuses_a_released_connection():
+    pool = fake_pool(size=2)
+    with pool.connection() as first:
+        pass
+    with pool.connection() as second:
+        assert pool.stats()['in_use'] == 1
+    assert second is first
+    stats = pool.stats()
+    assert (stats['opened'], stats['open'], stats['idle'], stats['acquisitions']) == (1, 1, 1, 2)
+    assert first.rollbacks == 2
+
+
+def test_connection_that_raised_is_discarded():
+    pool = fake_pool()
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            raise RuntimeError('query failed')
+    assert conn.closed
+    stats = pool.stats()
+    assert (stats['discarded'], stats['open'], stats['idle']) == (1, 0, 0)
+
+
+def test_connection_that_cannot_roll_back_is_discarded():
+    pool = fake_pool()
+    with pool.connection() as conn:
+        conn.fail_rollback = True
+    assert conn.closed
+    assert pool.stats()['open'] == 0
+    with pool.connection() as replacement:
+        assert replacement is not conn
+
+
+def test_old_connections_are_recycled(clock):
+    pool = fake_pool(recycle=60, ping_after=1000)
+    with pool.connection() as first:
+        pass
+    clock[0] += 61
+    with pool.connection() as second:
+        pass
+    assert second is not first and first.closed
+    assert pool.stats()['recycled'] == 1
+
+
+def test_idle_connections_are_pinged_before_reuse(clock):
+    pool = fake_pool(ping_after=10)
+    with pool.connection() as first:
+        first.fail_ping = True
+    clock[0] += 5
+    with pool.connection() as conn:
+        assert conn is first
+    clock[0] += 11
+    with pool.connection() as conn:
+        assert conn is not first
+    assert pool.stats()['failed_health_checks'] == 1
+
+
+def test_waits_for_a_free_connection_then_times_out():
+    pool = fake_pool(size=1, timeout=0.05)
+    released = threading.Event()
+
+    def hold():
+        with pool.connection():
+            released.wait(timeout=5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    while pool.stats()['in_use'] == 0:
+        time.sleep(0.001)
+    with pytest.raises(PoolTimeout):
+        with pool.connection():
+            pass
+    released.set()
+    holder.join(timeout=5)
+    with pool.connection():
+        pass
+    assert pool.stats()['timeouts'] == 1
+
+
+def test_reused_checkout_does_not_see_uncommitted_writes(tmp_path):
+    database = str(tmp_path / 'users.db')
+    pool = ConnectionPool(lambda: SQLiteConnection(database), size=1)
+
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('INSERT INTO users (name) VALUES (%s)', ('forgot to commit',))
+        cursor.close()
+
+    with pool.connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT COUNT(*) FROM users')
+        assert cursor.fetchone() == (0,)
+        # And the rolled back write no longer locks out other connections
+        cursor.execute('INSERT INTO users (name) VALUES (%s)', ('committed',))
+        conn.commit()
+        cursor.close()
+
+    other = SQLiteConnection(database)
+    cursor = other.cursor()
+    cursor.execute('SELECT name FROM users')
+    assert cursor.fetchall() == [('committed',)]
+    other.close()
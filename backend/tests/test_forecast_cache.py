@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from utils import forecast_cache
+from utils.forecast_cache import ENTRY_OVERHEAD, ForecastCache
+
+
+def value(days=30):
+    return np.arange(days, dtype=np.float64), np.ones((7, 3))
+
+
+ENTRY_BYTES = sum(array.nbytes for array in value()) + ENTRY_OVERHEAD
+
+
+def test_hit_returns_a_read_only_copy():
+    cache = ForecastCache()
+    predictions, window = value()
+    cache.put(('per_unit', 1, 1, 30), 'v1', (predictions, window))
+    predictions[0] = 99
+
+    cached, _ = cache.get(('per_unit', 1, 1, 30), 'v1')
+    assert cached[0] == 0
+    with pytest.raises(ValueError):
+        cached[0] = 1
+    assert cache.stats()['hits'] == 1
+
+
+def test_evicts_least_recently_used_within_the_byte_budget():
+    cache = ForecastCache(max_bytes=2 * ENTRY_BYTES)
+    cache.put('a', 1, value())
+    cache.put('b', 1, value())
+    cache.get('a', 1)
+    cache.put('c', 1, value())
+
+    assert cache.get('b', 1) is None
+    assert cache.get('a', 1) is not None and cache.get('c', 1) is not None
+    stats = cache.stats()
+    assert stats['evictions'] == 1 and stats['bytes'] == 2 * ENTRY_BYTES
+
+
+def test_entries_larger_than_the_budget_are_not_stored():
+    cache = ForecastCache(max_bytes=ENTRY_BYTES - 1)
+    cache.put('a', 1, value())
+    assert cache.stats()['entries'] == 0
+
+
+def test_new_version_drops_the_stale_entry():
+    cache = ForecastCache()
+    cache.put('a', ('model-1', 3), value())
+    assert cache.get('a', ('model-2', 3)) is None
+    assert cache.get('a', ('model-1', 3)) is None
+    stats = cache.stats()
+    assert stats['invalidations'] == 1 and stats['entries'] == 0 and stats['bytes'] == 0
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(forecast_cache.time, 'monotonic', lambda: now[0])
+    cache = ForecastCache(ttl=60)
+    cache.put('a', 1, value())
+
+    now[0] += 60
+    assert cache.get('a', 1) is not None
+    now[0] += 1
+    assert cache.get('a', 1) is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_invalidate_by_slot():
+    cache = ForecastCache()
+    for unit in (1, 2):
+        for days in (7, 30):
+            cache.put(('per_unit', 1, unit, days), 1, value(days))
+
+    assert cache.invalidate(lambda slot: slot[2] == 2) == 2
+    assert cache.get(('per_unit', 1, 1, 7), 1) is not None
+    assert cache.get(('per_unit', 1, 2, 7), 1) is None
+    assert cache.invalidate() == 2
@@ -0,0 +1,139 @@
+import numpy as np
+
+from utils.data_store import ConsumptionStore
+from utils.forecasting import ForecastRequest, forecast_batch, rollout
+from utils.model_registry import ModelEntry, ModelRegistry, get_model_key
+from tests.conftest import make_readings
+
+
+def mean_predict(sequences):
+    """Next day is the mean of the window's usage, an easy model to check"""
+    return np.asarray(sequences)[:, :, 0].mean(axis=1, keepdims=True)
+
+
+class MeanEngine:
+    def __init__(self):
+        self.calls = []
+
+    def rollout(self, sequences, days):
+        self.calls.append((len(sequences), days))
+        return rollout(mean_predict, sequences, days)
+
+
+class StubRegistry:
+    def __init__(self, engines):
+        self.engines = engines
+
+    def get(self, floor_no, unit_no):
+        key = get_model_key(floor_no, unit_no)
+        if key not in self.engines:
+            raise FileNotFoundError(f"Model file not found: {key}")
+        return ModelEntry(key, None, self.engines[key], 'shared', None, None, {})
+
+
+def test_rollout_matches_a_step_by_step_loop():
+    rng = np.random.default_rng(1)
+    sequences = rng.uniform(size=(3, 7, 3))
+    predictions = rollout(mean_predict, sequences, 5)
+
+    for window, expected in zip(sequences, predictions):
+        window = window.copy()
+        for day in range(5):
+            value = window[:, 0].mean()
+            assert np.isclose(value, expected[day])
+            window = np.vstack([window[1:], np.r_[value, window[-1, 1:]]])
+
+
+def test_rollout_leaves_the_input_alone():
+    sequences = np.ones((1, 7, 3))
+    rollout(lambda x: np.full((len(x), 1), 2.0), sequences, 3)
+    assert (sequences == 1).all()
+
+
+def test_batch_groups_by_key_and_isolates_failures():
+    store = ConsumptionStore.from_frame(make_readings(units=((1, 1), (1, 2), (2, 1))))
+    engine = MeanEngine()
+    registry = StubRegistry({'A001': engine, 'A002': engine})
+    requests = [ForecastRequest(1, 1, 3), ForecastRequest(1, 2, 5), ForecastRequest(2, 1, 3),
+                ForecastRequest(7, 7, 3)]
+
+    forecast_batch(requests, registry, store)
+
+    assert engine.calls == [(2, 5)]
+    assert requests[0].predictions.shape == (3,)
+    assert requests[1].predictions.shape == (5,)
+    expected = rollout(mean_predict, store.recent(1, 1, 7)[None], 3)[0]
+    np.testing.assert_allclose(requests[0].predictions, expected)
+    assert 'A101' in requests[2].error
+    assert requests[3].error is not None
+
+
+class UnstackableEngine(MeanEngine):
+    """Like CompiledModel: serves its own weights only, no stack()"""
+
+
+def test_batch_with_reloaded_engines_under_one_key():
+    store = ConsumptionStore.from_frame(make_readings())
+    first, reloaded = UnstackableEngine(), UnstackableEngine()
+    registry = StubRegistry({'A001': first, 'A002': reloaded})
+    requests = [ForecastRequest(1, 1, 3), ForecastRequest(1, 2, 3)]
+
+    forecast_batch(requests, registry, store)
+
+    assert [req.error for req in requests] == [None, None]
+    assert first.calls == [(1, 3)] and reloaded.calls == [(1, 3)]
+
+
+def damped_predict(sequences):
+    """Pulls the window's mean towards 0.5, so its forecasts depend on the scale"""
+    return 0.5 * mean_predict(sequences) + 0.25
+
+
+class RolloutEngine:
+    def warm(self):
+        pass
+
+    def rollout(self, sequences, days):
+        return rollout(damped_predict, sequences, days)
+
+
+class DirectEngine(RolloutEngine):
+    """A direct model that learned the rollout model's recurrence exactly"""
+
+    horizon = 10
+    calls = 0
+
+    def outputs(self, windows):
+        DirectEngine.calls += 1
+        return rollout(damped_predict, windows, self.horizon)
+
+
+def test_direct_and_rollout_forecasts_agree_at_the_horizon(tmp_path, monkeypatch):
+    for name in ('lstm_model_A001.keras', 'lstm_direct_A001.keras'):
+        (tmp_path / name).write_bytes(b'model')
+    np.save(tmp_path / 'lstm_scaler_A001.npy', np.array([400.0, 250.0]))
+    registry = ModelRegistry(str(tmp_path))
+
+    def load_engine(key, path, features=3):
+        engine = DirectEngine() if 'lstm_direct_' in path else RolloutEngine()
+        return None, engine, key
+
+    monkeypatch.setattr(registry, '_load_engine', load_engine)
+    store = ConsumptionStore.from_frame(make_readings())
+    horizon = DirectEngine.horizon
+    direct, rolled = ForecastRequest(1, 1, horizon), ForecastRequest(1, 1, horizon + 5)
+
+    DirectEngine.calls = 0
+    forecast_batch([direct, rolled], registry, store)
+
+    # The first call revealed the horizon at load time, the second served `direct`
+    assert DirectEngine.calls == 2
+    assert registry.get(1, 1).direct.scale == 400.0
+    assert registry.get(1, 1).direct.offset == 250.0
+    np.testing.assert_allclose(direct.predictions, rolled.predictions[:horizon])
+    # Both are served on the min-max scale the models were trained on
+    window = store.recent(1, 1, 7)[None]
+    scaled = window.copy()
+    scaled[:, :, 0] = (scaled[:, :, 0] - 250.0) / 400.0
+    np.testing.assert_allclose(rolled.predictions,
+                               rollout(damped_predict, scaled, horizon + 5)[0] * 400.0 + 250.0)
@@ -0,0 +1,93 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.data_store import ConsumptionStore
+from utils.forecasting import ForecastRequest
+from utils.global_forecaster import GLOBAL_META_FILE, GLOBAL_MODEL_FILE, GlobalForecaster
+from tests.conftest import make_readings
+
+
+@pytest.fixture(scope='module')
+def store():
+    # Unit 2's readings stop ten days before unit 1's
+    frame = make_readings(units=((1, 1),), days=40)
+    other = make_readings(units=((1, 2),), days=30, seed=1)
+    return ConsumptionStore.from_frame(pd.concat([frame, other], ignore_index=True))
+
+
+@pytest.fixture(scope='module')
+def models_dir(tmp_path_factory):
+    global_model = pytest.importorskip('global_model')
+
+    path = tmp_path_factory.mktemp('models')
+    global_model.create_global_model(7, 2).save(os.path.join(path, GLOBAL_MODEL_FILE))
+    meta = {'sequence_length': 7, 'units': [[1, 1], [1, 2]], 'usage_scale': [700.0, 650.0],
+            'residents_scale': 2.0, 'unit_size_scale': 102.0}
+    with open(os.path.join(path, GLOBAL_META_FILE), 'w') as f:
+        json.dump(meta, f)
+    return str(path)
+
+
+def test_forecasts_start_after_each_units_last_reading(store, models_dir):
+    forecaster = GlobalForecaster(models_dir)
+    requests = [ForecastRequest(1, 1, 5), ForecastRequest(1, 2, 5)]
+    forecaster.forecast_requests(requests, store)
+    assert [req.error for req in requests] == [None, None]
+
+    windows = np.stack([store.recent(1, 1, 7), store.recent(1, 2, 7)])
+    starts = np.array(['2024-02-10', '2024-01-31'], dtype='datetime64[D]')
+    expected = forecaster.forecast([(1, 1), (1, 2)], windows, 5, starts)
+    np.testing.assert_allclose([req.predictions for req in requests], expected, rtol=1e-5)
+    # The calendar features do reach the model, so the start date matters
+    later = forecaster.forecast([(1, 1), (1, 2)], windows, 5, starts + 45)
+    assert not np.allclose(later, expected)
+
+
+def test_one_start_date_applies_to_every_unit(store, models_dir):
+    forecaster = GlobalForecaster(models_dir)
+    windows = np.stack([store.recent(1, 1, 7), store.recent(1, 2, 7)])
+    shared = forecaster.forecast([(1, 1), (1, 2)], windows, 3, '2024-02-10')
+    per_unit = forecaster.forecast([(1, 1), (1, 2)], windows, 3,
+                                   np.array(['2024-02-10'] * 2, dtype='datetime64[D]'))
+    np.testing.assert_allclose(shared, per_unit, rtol=1e-6)
+
+
+def test_unknown_unit_is_reported_on_its_request(store, models_dir):
+    requests = [ForecastRequest(1, 1, 3), ForecastRequest(9, 9, 3)]
+    GlobalForecaster(models_dir).forecast_requests(requests, store)
+    assert requests[0].error is None and len(requests[0].predictions) == 3
+    assert 'not trained' in requests[1].error
+
+
+def test_failing_unit_does_not_fail_the_batch(store, models_dir, monkeypatch):
+    forecaster = GlobalForecaster(models_dir)
+    forecast = forecaster.forecast
+
+    def fail_unit_2(units, windows, days, start_date):
+        if (1, 2) in units:
+            raise RuntimeError('bad input for Floor 1 Unit 2')
+        return forecast(units, windows, days, start_date)
+
+    monkeypatch.setattr(forecaster, 'forecast', fail_unit_2)
+    requests = [ForecastRequest(1, 1, 3), ForecastRequest(1, 2, 3)]
+    forecaster.forecast_requests(requests, store)
+    assert requests[0].error is None and len(requests[0].predictions) == 3
+    assert requests[1].predictions is None
+    assert requests[1].error == 'bad input for Floor 1 Unit 2'
+
+
+def test_missing_model_fails_each_request_instead_of_raising(store, tmp_path):
+    requests = [ForecastRequest(1, 1, 3), ForecastRequest(1, 2, 3)]
+    GlobalForecaster(str(tmp_path)).forecast_requests(requests, store)
+    assert all(req.predictions is None for req in requests)
+    assert all('Global model unavailable' in req.error for req in requests)
+
+
+def test_store_last_date(store):
+    assert store.last_date(1, 2) == np.datetime64('2024-01-30')
+    with pytest.raises(ValueError):
+        store.last_date(9, 9)
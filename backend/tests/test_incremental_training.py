@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+
+from tests.conftest import make_readings, build_keras_model
+from utils.panel import ConsumptionPanel
+
+incremental_training = pytest.importorskip('incremental_training')
+from training_meta import read_training_meta, write_training_meta
+
+KEY = 'A001'
+DAYS, SEQUENCE_LENGTH, HOLDOUT_DAYS = 40, 7, 7
+
+
+@pytest.fixture(scope='module')
+def panel():
+    return ConsumptionPanel.from_frame(make_readings(units=((1, 1),), days=DAYS))
+
+
+def fitted_scaler(panel):
+    """[range, minimum] of every day before the first holdout target"""
+    usage = panel.unit_usage(1, 1).astype(np.float64)[:DAYS - HOLDOUT_DAYS]
+    return np.array([np.ptp(usage), usage.min()])
+
+
+@pytest.fixture
+def models_dir(tmp_path, panel):
+    """A trained unit whose record ends on day 20, with a matching scaler"""
+    build_keras_model(SEQUENCE_LENGTH).save(str(tmp_path / f'lstm_model_{KEY}.keras'))
+    np.save(tmp_path / f'lstm_scaler_{KEY}.npy', fitted_scaler(panel))
+    write_training_meta(KEY, panel.dates[19], str(tmp_path), architecture='simple_lstm')
+    return tmp_path
+
+
+def update(panel, models_dir, **options):
+    options = {'epochs': 1, 'holdout_days': HOLDOUT_DAYS, 'models_dir': str(models_dir), **options}
+    return incremental_training.incremental_update(panel, 1, 1, **options)
+
+
+def artifacts(models_dir):
+    return {path.name: path.read_bytes() for path in models_dir.iterdir()}
+
+
+def test_accepted_update_keeps_the_saved_scaler(panel, models_dir):
+    scaler = (models_dir / f'lstm_scaler_{KEY}.npy').read_bytes()
+    result = update(panel, models_dir, tolerance=10.0)
+
+    assert result['status'] == 'updated'
+    assert [result['scale'], result['offset']] == pytest.approx(fitted_scaler(panel))
+    assert (models_dir / f'lstm_scaler_{KEY}.npy').read_bytes() == scaler
+    # The cutoff advances to the last window before the holdout
+    meta = read_training_meta(KEY, str(models_dir))
+    assert meta['mode'] == 'incremental'
+    assert meta['trained_until'] == str(panel.dates[DAYS - HOLDOUT_DAYS - 1])
+
+
+def test_rejected_update_leaves_the_model_alone(panel, models_dir):
+    before = artifacts(models_dir)
+    result = update(panel, models_dir, tolerance=-1.0)
+
+    assert result['status'] == 'rejected'
+    assert artifacts(models_dir) == before
+
+
+def test_up_to_date_and_waiting_units_are_not_trained(panel, models_dir):
+    write_training_meta(KEY, panel.dates[-1], str(models_dir), architecture='simple_lstm')
+    assert update(panel, models_dir)['status'] == 'up_to_date'
+
+    # Every window after day 35 is in the holdout
+    write_training_meta(KEY, panel.dates[35], str(models_dir), architecture='simple_lstm')
+    assert update(panel, models_dir)['status'] == 'waiting'
+
+
+def test_missing_scaler_is_reported(panel, models_dir):
+    (models_dir / f'lstm_scaler_{KEY}.npy').unlink()
+    assert update(panel, models_dir)['status'] == 'no_scaler'
+
+
+def test_changed_range_is_only_reported_without_retrain(panel, models_dir):
+    np.save(models_dir / f'lstm_scaler_{KEY}.npy', fitted_scaler(panel) * [2, 1])
+    before = artifacts(models_dir)
+    result = update(panel, models_dir, retrain=False)
+
+    assert result['status'] == 'range_changed'
+    assert [result['new_scale'], result['new_offset']] == pytest.approx(fitted_scaler(panel))
+    assert artifacts(models_dir) == before
+
+
+def test_range_only_scaler_counts_as_changed(panel, models_dir):
+    np.save(models_dir / f'lstm_scaler_{KEY}.npy', fitted_scaler(panel)[:1])
+    result = update(panel, models_dir, retrain=False)
+
+    assert result['status'] == 'range_changed'
+    assert result['offset'] == 0.0
+
+
+def test_changed_range_retrains_and_replaces_the_scaler(panel, models_dir):
+    old_scale = 2 * fitted_scaler(panel)[0]
+    np.save(models_dir / f'lstm_scaler_{KEY}.npy', fitted_scaler(panel) * [2, 1])
+    result = update(panel, models_dir, retrain_epochs=1, tolerance=10.0)
+
+    assert result['status'] == 'retrained'
+    saved = np.load(models_dir / f'lstm_scaler_{KEY}.npy')
+    np.testing.assert_allclose(saved, fitted_scaler(panel))
+    meta = read_training_meta(KEY, str(models_dir))
+    assert meta['mode'] == 'retrained'
+    assert meta['previous_scale'] == pytest.approx(old_scale)
@@ -0,0 +1,26 @@
+import numpy as np
+
+from utils.forecasting import keras_predict_fn, rollout
+from utils.inference import CompiledModel
+
+
+def test_predict_matches_keras(keras_model):
+    sequences = np.random.default_rng(0).uniform(size=(4, 7, 3)).astype(np.float32)
+    engine = CompiledModel(keras_model)
+    expected = keras_model.predict(sequences, verbose=0)[:, 0]
+    np.testing.assert_allclose(engine.predict(sequences), expected, rtol=1e-5, atol=1e-6)
+
+
+def test_rollout_graph_matches_the_python_loop(keras_model):
+    sequences = np.random.default_rng(1).uniform(size=(3, 7, 3)).astype(np.float32)
+    engine = CompiledModel(keras_model)
+    expected = rollout(keras_predict_fn(keras_model), sequences, 10)
+    np.testing.assert_allclose(engine.rollout(sequences, 10), expected, rtol=1e-4, atol=1e-5)
+
+
+def test_rollout_length_is_not_baked_into_the_trace(keras_model):
+    engine = CompiledModel(keras_model)
+    engine.warm()
+    sequences = np.zeros((2, 7, 3), dtype=np.float32)
+    assert engine.rollout(sequences, 1).shape == (2, 1)
+    assert engine.rollout(sequences, 30).shape == (2, 30)
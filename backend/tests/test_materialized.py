@@ -0,0 +1,92 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from utils.data_store import ConsumptionStore
+from utils.materialized import MATERIALIZED_FILE, MaterializedForecasts, unit_fingerprint
+from tests.conftest import make_readings
+
+ARTIFACTS = ('A001', 1, 2, None, None)
+
+
+@pytest.fixture(scope='module')
+def store():
+    return ConsumptionStore.from_frame(make_readings(units=((1, 1), (1, 2))))
+
+
+def write(models_dir, store, units, max_days=30, direct_horizons=None, mtime=None):
+    """Write the file materialize_forecasts.py would, one constant row per unit"""
+    windows = [store.recent(f, u, 7) for f, u in units]
+    path = os.path.join(models_dir, MATERIALIZED_FILE)
+    np.savez_compressed(
+        path,
+        units=np.array(units, dtype=np.int32).reshape(-1, 2),
+        values=np.array([np.full(max_days, 100 * f + u) for f, u in units], dtype=np.float32),
+        windows=np.array(windows, dtype=np.float64),
+        fingerprints=np.array([unit_fingerprint(ARTIFACTS, w) for w in windows], dtype='<U40'),
+        direct_horizons=np.array(direct_horizons or [0] * len(units), dtype=np.int32),
+        max_days=np.array(max_days),
+        generated_at=np.array('2024-01-31T00:00:00')
+    )
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+def test_serves_fresh_rows(tmp_path, store):
+    write(tmp_path, store, [(1, 1), (1, 2)])
+    materialized = MaterializedForecasts(str(tmp_path))
+
+    values, window = materialized.lookup(1, 2, 7, ARTIFACTS, store)
+    np.testing.assert_array_equal(values, np.full(7, 102.0))
+    np.testing.assert_array_equal(window, store.recent(1, 2, 7))
+    assert materialized.lookup(1, 1, 31, ARTIFACTS, store) is None
+    assert materialized.lookup(1, 1, 7, ('A001', 9, 2, None, None), store) is None
+    assert materialized.lookup(3, 3, 7, ARTIFACTS, store) is None
+    assert (materialized.hits, materialized.misses) == (1, 3)
+
+
+def test_concurrent_lookups_are_all_counted(tmp_path, store):
+    write(tmp_path, store, [(1, 1)])
+    materialized = MaterializedForecasts(str(tmp_path))
+
+    def lookups(_):
+        for _ in range(50):
+            materialized.lookup(1, 1, 7, ARTIFACTS, store)
+            materialized.lookup(3, 3, 7, ARTIFACTS, store)
+
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lookups, range(8)))
+    stats = materialized.stats()
+    assert (stats['hits'], stats['misses']) == (400, 400)
+
+
+def test_new_readings_make_a_row_stale(tmp_path, store):
+    write(tmp_path, store, [(1, 1)])
+    newer = ConsumptionStore.from_frame(make_readings(units=((1, 1),), days=31))
+    assert MaterializedForecasts(str(tmp_path)).lookup(1, 1, 7, ARTIFACTS, newer) is None
+
+
+def test_direct_horizon_splits_what_a_row_covers(tmp_path, store):
+    write(tmp_path, store, [(1, 1)], direct_horizons=[10])
+    materialized = MaterializedForecasts(str(tmp_path))
+    # The row was rolled out; live serving would use the direct model up to 10 days
+    assert materialized.lookup(1, 1, 10, ARTIFACTS, store) is None
+    assert materialized.lookup(1, 1, 11, ARTIFACTS, store) is not None
+
+
+def test_replaced_file_swaps_rows_and_index_together(tmp_path, store):
+    write(tmp_path, store, [(1, 1), (1, 2)], mtime=1_000_000_000)
+    materialized = MaterializedForecasts(str(tmp_path))
+    assert materialized.stats()['units'] == 2
+
+    # The same units in the other order: a stale index would pick the wrong row
+    write(tmp_path, store, [(1, 2), (1, 1)], max_days=14, mtime=2_000_000_000)
+    values, _ = materialized.lookup(1, 1, 7, ARTIFACTS, store)
+    np.testing.assert_array_equal(values, np.full(7, 101.0))
+    assert materialized.stats()['max_days'] == 14
+
+    os.remove(tmp_path / MATERIALIZED_FILE)
+    assert materialized.lookup(1, 1, 7, ARTIFACTS, store) is None
+    assert materialized.stats()['available'] is False
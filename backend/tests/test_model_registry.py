@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pytest
+
+from utils.model_registry import ModelRegistry, get_model_key
+
+
+class StubEngine:
+    def warm(self):
+        pass
+
+
+def touch(path):
+    with open(path, 'wb') as f:
+        f.write(b'model')
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    for key in ('A001', 'A002', 'A003'):
+        touch(tmp_path / f'lstm_model_{key}.keras')
+        np.save(tmp_path / f'lstm_scaler_{key}.npy', np.array([500.0]))
+    registry = ModelRegistry(str(tmp_path), max_size=2)
+    loads = []
+
+    def load_engine(key, path, features=3):
+        loads.append(key)
+        return None, StubEngine(), key
+
+    monkeypatch.setattr(registry, '_load_engine', load_engine)
+    registry.loads = loads
+    return registry
+
+
+def test_model_key():
+    assert get_model_key(4, 4) == 'A304'
+    assert get_model_key(1, 12) == 'A012'
+
+
+def test_hit_returns_resident_entry(registry):
+    first = registry.get(1, 1)
+    assert registry.get(1, 1) is first
+    assert registry.loads == ['A001']
+    assert first.scaler[0] == 500.0
+    # A scaler file holding only the range has no offset
+    assert (first.usage_scale, first.usage_offset) == (500.0, 0.0)
+
+
+def test_evicts_least_recently_used(registry):
+    registry.get(1, 1)
+    registry.get(1, 2)
+    registry.get(1, 1)
+    registry.get(1, 3)
+    assert registry.resident() == ['A001', 'A003']
+    registry.get(1, 2)
+    assert registry.loads == ['A001', 'A002', 'A003', 'A002']
+
+
+def test_reloads_when_a_file_changes(registry, tmp_path):
+    first = registry.get(1, 1)
+    scaler_path = tmp_path / 'lstm_scaler_A001.npy'
+    np.save(scaler_path, np.array([800.0]))
+    stat = os.stat(scaler_path)
+    os.utime(scaler_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    second = registry.get(1, 1)
+    assert second is not first
+    assert second.scaler[0] == 800.0
+    assert registry.loads == ['A001', 'A001']
+
+
+def test_fingerprint_tracks_artifacts(registry, tmp_path):
+    before = registry.fingerprint(1, 1)
+    (tmp_path / 'architecture_A001.txt').write_text('simple_lstm')
+    assert registry.fingerprint(1, 1) != before
+
+
+def test_missing_model(registry):
+    with pytest.raises(FileNotFoundError):
+        registry.get(2, 1)
+
+
+def test_available_keys_ignores_other_files(registry, tmp_path):
+    (tmp_path / '.lstm_model_A009.123.tmp.keras').write_bytes(b'')
+    assert registry.available_keys() == ['A001', 'A002', 'A003']
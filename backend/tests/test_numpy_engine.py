@@ -0,0 +1,97 @@
+import numpy as np
+import pytest
+
+from utils.forecasting import keras_predict_fn, rollout
+from utils.numpy_engine import NumpyModel, export_model
+from tests.conftest import build_keras_model
+
+
+def exported(model, tmp_path, name='model', architecture=None):
+    path = str(tmp_path / f'{name}.npz')
+    export_model(model, path, architecture)
+    return NumpyModel.load(path)
+
+
+@pytest.fixture(scope='module')
+def architectures():
+    import keras
+    from advanced_training import ARCHITECTURES
+
+    # cnn_lstm's second convolution needs more than 7 days to fit
+    models = {}
+    for name, create in ARCHITECTURES.items():
+        keras.utils.set_random_seed(0)
+        models[name] = create(14, 3)
+    return models
+
+
+@pytest.mark.parametrize('name', ['simple_lstm', 'bidirectional_lstm', 'cnn_lstm',
+                                  'attention_lstm', 'gru_lstm_hybrid'])
+def test_forward_matches_keras(architectures, tmp_path, name):
+    model = architectures[name]
+    sequences = np.random.default_rng(0).uniform(size=(8, 14, 3)).astype(np.float32)
+    engine = exported(model, tmp_path, name, name)
+
+    expected = model.predict(sequences, verbose=0).reshape(8, -1)
+    np.testing.assert_allclose(engine.outputs(sequences), expected, atol=1e-5)
+    np.testing.assert_allclose(engine.rollout(sequences, 5),
+                               rollout(keras_predict_fn(model), sequences, 5), atol=1e-4)
+    assert engine.architecture == name
+
+
+def test_stack_runs_each_window_with_its_own_weights(tmp_path):
+    models = [build_keras_model(seed=seed) for seed in range(3)]
+    engines = [exported(model, tmp_path, f'unit{i}') for i, model in enumerate(models)]
+    assert len({engine.signature for engine in engines}) == 1
+
+    sequences = np.random.default_rng(2).uniform(size=(3, 7, 3)).astype(np.float32)
+    stacked = NumpyModel.stack(engines)
+    expected = np.stack([model.predict(sequences[i:i + 1], verbose=0)[0, 0]
+                         for i, model in enumerate(models)])
+    np.testing.assert_allclose(stacked.predict(sequences), expected, atol=1e-5)
+    np.testing.assert_allclose(
+        stacked.rollout(sequences, 4),
+        np.concatenate([engine.rollout(sequences[i:i + 1], 4) for i, engine in enumerate(engines)]),
+        atol=1e-5)
+
+
+def test_stack_rejects_different_architectures(tmp_path):
+    small = exported(build_keras_model(), tmp_path, 'small')
+    other = exported(build_keras_model(features=1), tmp_path, 'other')
+    with pytest.raises(ValueError):
+        NumpyModel.stack([small, other])
+
+
+def test_stateful_rollout_starts_at_predict_and_stays_close(tmp_path):
+    engine = exported(build_keras_model(), tmp_path)
+    sequences = np.random.default_rng(3).uniform(size=(4, 7, 3)).astype(np.float32)
+    assert engine.streamable
+
+    windowed = engine.rollout(sequences, 7)
+    engine.stateful = True
+    stateful = engine.rollout(sequences, 7)
+
+    np.testing.assert_allclose(stateful[:, 0], engine.predict(sequences), atol=1e-6)
+    # Later steps see more history than the window, so they only stay near it
+    assert np.abs(stateful - windowed).max() < 0.15
+
+
+def test_stateful_mode_survives_stacking(tmp_path):
+    engines = [exported(build_keras_model(seed=seed), tmp_path, f'unit{seed}') for seed in range(2)]
+    for engine in engines:
+        engine.stateful = True
+    sequences = np.random.default_rng(4).uniform(size=(2, 7, 3)).astype(np.float32)
+
+    stacked = NumpyModel.stack(engines)
+    assert stacked.stateful
+    np.testing.assert_allclose(
+        stacked.rollout(sequences, 5),
+        np.concatenate([engine.rollout(sequences[i:i + 1], 5) for i, engine in enumerate(engines)]),
+        atol=1e-5)
+
+
+def test_stateful_rollout_needs_a_streamable_model(architectures, tmp_path):
+    engine = exported(architectures['bidirectional_lstm'], tmp_path, 'bi', 'bidirectional_lstm')
+    assert not engine.streamable
+    with pytest.raises(ValueError):
+        engine.rollout_stateful(np.zeros((1, 14, 3), dtype=np.float32), 3)
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.panel import ConsumptionPanel, load_panel
+from tests.conftest import make_readings
+
+
+@pytest.fixture
+def frame():
+    """Unit (1, 1) from Jan 1 with Jan 4-5 missing, unit (2, 3) only Jan 3-6"""
+    late = make_readings(units=((2, 3),), days=4, start='2024-01-03', seed=1)
+    early = make_readings(units=((1, 1),), days=8)
+    early = early[~early['date'].isin(['2024-01-04', '2024-01-05'])]
+    return pd.concat([late, early], ignore_index=True)
+
+
+def test_layout(frame):
+    panel = ConsumptionPanel.from_frame(frame)
+    assert panel.units == [(1, 1), (2, 3)]
+    assert panel.usage.shape == (8, 2) and panel.usage.dtype == np.float32
+    assert str(panel.dates[0]) == '2024-01-01' and str(panel.dates[-1]) == '2024-01-08'
+    assert panel.residents.tolist() == [2, 3] and panel.unit_size.tolist() == [101, 103]
+    assert (1, 1) in panel and (5, 5) not in panel
+    with pytest.raises(ValueError):
+        panel.column(5, 5)
+
+
+def test_gaps_are_forward_filled_from_the_previous_reading(frame):
+    panel = ConsumptionPanel.from_frame(frame)
+    usage = panel.unit_usage(1, 1)
+    jan_3 = frame[(frame['unit'] == 1) & (frame['date'] == '2024-01-03')]['water_usage'].item()
+
+    assert usage[3] == usage[4] == np.float32(jan_3)
+    assert panel.observed[:, 0].tolist() == [True, True, True, False, False, True, True, True]
+    assert not np.isnan(usage).any()
+
+
+def test_unit_spans_stop_at_their_own_first_and_last_readings(frame):
+    panel = ConsumptionPanel.from_frame(frame)
+    assert panel.unit_rows(2, 3) == slice(2, 6)
+    assert panel.unit_dates(2, 3).astype(str).tolist() == [
+        '2024-01-03', '2024-01-04', '2024-01-05', '2024-01-06']
+    late = frame[frame['unit'] == 3].sort_values('date')['water_usage'].values
+    np.testing.assert_allclose(panel.unit_usage(2, 3), late, rtol=1e-6)
+    # The rows outside the span are not part of the unit, filled or not
+    assert np.isnan(panel.usage[:2, 1]).all()
+
+
+def test_unit_frame_has_the_csv_columns(frame):
+    unit = ConsumptionPanel.from_frame(frame).unit_frame(2, 3)
+    assert list(unit.columns) == ['date', 'floor', 'unit', 'water_usage', 'num_residents', 'unit_size']
+    assert len(unit) == 4 and set(unit['num_residents']) == {3}
+
+
+def test_static_features_take_the_latest_reading(frame):
+    frame.loc[(frame['unit'] == 1) & (frame['date'] == '2024-01-08'), 'num_residents'] = 5
+    assert ConsumptionPanel.from_frame(frame).residents.tolist() == [5, 3]
+
+
+def test_empty_frame():
+    panel = ConsumptionPanel.from_frame(make_readings().iloc[:0])
+    assert panel.units == [] and panel.usage.shape == (0, 0)
+
+
+def test_load_panel_for_one_unit(tmp_path, frame):
+    path = str(tmp_path / 'consumption.csv')
+    frame.to_csv(path, index=False)
+    assert load_panel(path).units == [(1, 1), (2, 3)]
+    assert load_panel(path, 2, 3).units == [(2, 3)]
@@ -0,0 +1,40 @@
+import math
+import os
+
+import pytest
+
+from parallel import atomic_write, run_in_pool
+
+
+def test_atomic_write_replaces_the_file(tmp_path):
+    path = tmp_path / 'scaler.npy'
+    path.write_text('old')
+
+    def write(tmp):
+        assert tmp != str(path) and tmp.endswith('.npy')
+        with open(tmp, 'w') as f:
+            f.write('new')
+
+    atomic_write(str(path), write)
+    assert path.read_text() == 'new'
+    assert os.listdir(tmp_path) == ['scaler.npy']
+
+
+def test_atomic_write_keeps_the_old_file_on_failure(tmp_path):
+    path = tmp_path / 'model.keras'
+    path.write_text('old')
+
+    def write(tmp):
+        with open(tmp, 'w') as f:
+            f.write('partial')
+        raise RuntimeError('disk full')
+
+    with pytest.raises(RuntimeError):
+        atomic_write(str(path), write)
+    assert path.read_text() == 'old'
+    assert os.listdir(tmp_path) == ['model.keras']
+
+
+def test_run_in_pool_skips_failed_tasks():
+    results = run_in_pool(math.sqrt, [(4,), (-1,), (9,)], workers=2)
+    assert sorted(results) == [2.0, 3.0]
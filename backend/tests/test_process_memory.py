@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from utils.process_memory import SMAPS_FIELDS, child_pids, process_memory
+
+linux_only = pytest.mark.skipif(not os.path.exists('/proc/self/smaps_rollup'),
+                                reason='needs /proc/<pid>/smaps_rollup')
+
+
+@linux_only
+def test_reports_every_field_for_this_process():
+    memory = process_memory()
+    assert memory['pid'] == os.getpid()
+    assert set(SMAPS_FIELDS.values()) <= set(memory)
+    assert 0 < memory['pss_mb'] <= memory['rss_mb']
+
+
+@linux_only
+def test_lists_children():
+    child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])
+    try:
+        assert child.pid in child_pids(os.getpid())
+        assert process_memory(child.pid)['pid'] == child.pid
+    finally:
+        child.kill()
+        child.wait()
+
+
+def test_missing_process_gives_none():
+    assert process_memory(2 ** 31 - 1) is None
+    assert child_pids(2 ** 31 - 1) == []
@@ -0,0 +1,153 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.data_store import ConsumptionStore, UnitSeries
+from utils.readings import parse_readings, validate_readings
+from utils.segment_store import SegmentStore
+from tests.conftest import make_readings
+
+TODAY = '2024-03-01'
+
+
+def batch(dates, floor_no=1, unit_no=1, usage=500.0):
+    dates = np.array(dates, dtype='datetime64[D]')
+    return {
+        'date': dates,
+        'floor': np.full(len(dates), floor_no, dtype=np.int64),
+        'unit': np.full(len(dates), unit_no, dtype=np.int64),
+        'values': np.tile([usage, 2.0, 101.0], (len(dates), 1))
+    }
+
+
+@pytest.fixture
+def store():
+    return ConsumptionStore.from_frame(make_readings(days=30))
+
+
+def test_segments_are_numbered_and_read_back_in_order(tmp_path):
+    first, other_process = SegmentStore(str(tmp_path)), SegmentStore(str(tmp_path))
+    assert first.mtime() is not None and list(first.read_after()) == []
+
+    assert first.append(batch(['2024-02-01'])) == 1
+    # A second writer sharing the directory moves past numbers already taken
+    assert other_process.append(batch(['2024-02-02'])) == 2
+    assert first.append(batch(['2024-02-03'])) == 3
+
+    segments = list(first.read_after())
+    assert [seq for seq, _ in segments] == [1, 2, 3]
+    assert [str(b['date'][0]) for _, b in segments] == ['2024-02-01', '2024-02-02', '2024-02-03']
+    assert [seq for seq, _ in first.read_after(2)] == [3]
+    assert sorted(os.listdir(tmp_path)) == [f'segment_{seq:08d}.npz' for seq in (1, 2, 3)]
+
+
+def test_missing_directory_has_no_segments(tmp_path):
+    segments = SegmentStore(str(tmp_path / 'readings'))
+    assert segments.mtime() is None
+    assert list(segments.read_after()) == []
+
+
+def test_store_applies_segments_from_other_writers(tmp_path):
+    csv_path = str(tmp_path / 'consumption.csv')
+    make_readings(days=30).to_csv(csv_path, index=False)
+    readings_dir = str(tmp_path / 'readings')
+    writer = ConsumptionStore(csv_path, SegmentStore(readings_dir))
+    reader = ConsumptionStore(csv_path, SegmentStore(readings_dir))
+    reader.refresh()
+    before = reader.unit_version(1, 2)
+
+    assert writer.append(batch(['2024-01-31', '2024-02-01'], unit_no=2)) == [(1, 2)]
+    assert len(reader.series(1, 2)) == 32
+    assert reader.unit_version(1, 2) != before
+    assert reader.unit_version(1, 1) == (reader.version, 0)
+
+
+def test_unit_series_appends_in_place_and_merges_earlier_dates():
+    dates = np.array(['2024-01-02', '2024-01-03'], dtype='datetime64[D]')
+    series = UnitSeries(dates, np.array([[2.0], [3.0]]))
+
+    assert series.extend(np.array(['2024-01-04'], dtype='datetime64[D]'), np.array([[4.0]])) == 1
+    # Full buffers double, and the spare row takes the next append without a copy
+    grown = series._state[0]
+    assert len(grown) == 4
+    series.extend(np.array(['2024-01-05'], dtype='datetime64[D]'), np.array([[5.0]]))
+    assert series._state[0] is grown
+
+    added = series.extend(np.array(['2024-01-01', '2024-01-03', '2024-01-01'], dtype='datetime64[D]'),
+                          np.array([[1.0], [30.0], [10.0]]))
+    assert added == 1
+    assert series.values[:4, 0].tolist() == [1.0, 2.0, 3.0, 4.0]
+    assert np.all(np.diff(series.dates) > np.timedelta64(0, 'D'))
+    assert series.tail(2)[:, 0].tolist() == series.values[-2:, 0].tolist()
+
+
+def test_published_rows_are_not_changed_by_later_appends():
+    series = UnitSeries(np.array(['2024-01-01'], dtype='datetime64[D]'), np.array([[1.0]]))
+    series.extend(np.array(['2024-01-02'], dtype='datetime64[D]'), np.array([[2.0]]))
+    snapshot = series.values
+    series.extend(np.array(['2024-01-03', '2024-01-04'], dtype='datetime64[D]'), np.array([[3.0], [4.0]]))
+    assert snapshot.tolist() == [[1.0], [2.0]]
+
+
+def rules(frame, store):
+    batch, _, errors = validate_readings(frame, store, today=TODAY)
+    assert batch is None
+    return {(error['row'], error['error']) for error in errors}
+
+
+def test_validate_rejects_each_bad_field(store):
+    frame = pd.DataFrame({
+        'date': ['2024-02-01', '02/02/2024', '2024-04-01', '2024-02-04', '2024-02-05', '2024-02-06'],
+        'floor': ['1', '1', '1', '0', '1', '1'],
+        'unit': ['1', '1', '1', '1', '1.5', '1'],
+        'water_usage': ['500', '500', '500', '500', '500', '-1'],
+    })
+    assert rules(frame, store) == {
+        (1, 'date must be YYYY-MM-DD'),
+        (2, 'date is in the future'),
+        (3, 'floor must be a positive integer'),
+        (4, 'unit must be a positive integer'),
+        (5, 'water_usage must be a non-negative number'),
+    }
+
+
+def test_validate_rejects_repeats_and_unknown_units_without_features(store):
+    frame = pd.DataFrame({
+        'date': ['2024-02-01', '2024-02-01', '2024-02-01'],
+        'floor': [1, 1, 5],
+        'unit': [1, 1, 5],
+        'water_usage': [500, 510, 400],
+    })
+    assert rules(frame, store) == {
+        (0, 'reading repeated in this batch'),
+        (1, 'reading repeated in this batch'),
+        (2, 'num_residents is required for a unit with no readings'),
+        (2, 'unit_size is required for a unit with no readings'),
+    }
+
+
+def test_validate_reports_missing_columns_and_empty_batches(store):
+    _, _, errors = validate_readings(pd.DataFrame({'date': ['2024-02-01']}), store, today=TODAY)
+    assert errors == [{'row': None, 'error': 'Missing columns: floor, unit, water_usage'}]
+    empty = pd.DataFrame(columns=['date', 'floor', 'unit', 'water_usage'])
+    assert validate_readings(empty, store, today=TODAY)[2] == [{'row': None, 'error': 'No readings'}]
+
+
+def test_validate_carries_features_and_skips_known_readings(store):
+    body = b'date,floor,unit,water_usage\n2024-01-30,1,1,1\n2024-02-01,1,1,450.5\n'
+    batch, duplicates, errors = validate_readings(parse_readings(body, 'text/csv'), store, today=TODAY)
+
+    assert errors == [] and duplicates == 1
+    assert batch['date'].tolist() == [np.datetime64('2024-02-01')]
+    # Residents and unit size come from the unit's latest reading
+    assert batch['values'].tolist() == [[450.5, 2.0, 101.0]]
+
+
+def test_parse_readings_accepts_rows_and_columns():
+    rows = parse_readings(b'{"readings": [{"date": "2024-02-01", "floor": 1}]}', 'application/json')
+    columns = parse_readings(b'{"date": ["2024-02-01"], "floor": [1]}', 'application/json')
+    assert rows.to_dict('records') == columns.to_dict('records')
+    with pytest.raises(ValueError):
+        parse_readings(b'3', 'application/json')
@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.data_prep import prepare_prediction_data
+from utils.data_store import ConsumptionStore
+from utils.readings_repository import ReadingsRepository
+from tests.conftest import make_readings
+
+
+@pytest.fixture
+def frame():
+    return make_readings(units=((1, 1), (1, 2), (2, 1)), days=30)
+
+
+@pytest.fixture
+def repository(tmp_path, frame):
+    repository = ReadingsRepository.from_url(f"sqlite:///{tmp_path / 'readings.db'}")
+    repository.create_schema()
+    assert repository.load_frame(frame, batch_size=25) == len(frame)
+    return repository
+
+
+def test_unknown_engine_and_url_are_rejected():
+    with pytest.raises(ValueError):
+        ReadingsRepository(None, engine='oracle')
+    with pytest.raises(ValueError):
+        ReadingsRepository.from_url('postgres://localhost/readings')
+
+
+def test_upsert_replaces_a_day_instead_of_duplicating_it(repository, frame):
+    repository.load_frame(frame.iloc[:1].assign(water_usage=1.5, num_residents=9))
+    dates, values = repository.window(1, 1, '2024-01-01', '2024-01-01')
+
+    assert dates.tolist() == [np.datetime64('2024-01-01')]
+    assert values.tolist() == [[1.5, 9.0, 101.0]]
+    assert len(repository.frame()) == len(frame)
+
+
+def test_recent_matches_the_in_memory_store(repository, frame):
+    store = ConsumptionStore.from_frame(frame)
+    for floor_no, unit_no in store.units():
+        np.testing.assert_allclose(repository.recent(floor_no, unit_no, 7),
+                                   store.recent(floor_no, unit_no, 7))
+        np.testing.assert_allclose(prepare_prediction_data(repository, floor_no, unit_no),
+                                   prepare_prediction_data(store, floor_no, unit_no))
+    assert repository.last_date(2, 1) == store.last_date(2, 1)
+    with pytest.raises(ValueError):
+        repository.recent(1, 1, 31)
+    with pytest.raises(ValueError):
+        repository.last_date(9, 9)
+
+
+def test_range_queries(repository, frame):
+    dates, values = repository.last_n(1, 2, 3)
+    assert dates.tolist() == list(np.arange('2024-01-28', '2024-01-31', dtype='datetime64[D]'))
+    unit = frame[(frame['floor'] == 1) & (frame['unit'] == 2)]
+    np.testing.assert_allclose(values[:, 0], unit['water_usage'].values[-3:])
+
+    dates, _ = repository.window(1, 2, '2024-01-10', '2024-01-14')
+    assert len(dates) == 5 and str(dates[0]) == '2024-01-10'
+    assert len(repository.window(9, 9, '2024-01-01', '2024-01-31')[0]) == 0
+
+
+def test_floor_rollup(repository, frame):
+    rollup = repository.floor_rollup(1, '2024-01-05', '2024-01-06')
+    day = frame[(frame['floor'] == 1) & (frame['date'] == '2024-01-05')]['water_usage']
+
+    assert rollup['dates'].tolist() == [np.datetime64('2024-01-05'), np.datetime64('2024-01-06')]
+    assert rollup['units'].tolist() == [2, 2]
+    assert rollup['total'][0] == pytest.approx(day.sum())
+    assert rollup['mean'][0] == pytest.approx(day.mean())
+
+
+def test_units_and_frame(repository, frame):
+    assert repository.units() == [(1, 1), (1, 2), (2, 1)]
+    one = repository.frame(1, 2)
+    assert len(one) == 30 and set(one['unit']) == {2}
+    assert pd.api.types.is_datetime64_any_dtype(one['date'])
+    assert list(one.columns) == list(frame.columns)
+
+
+def test_load_csv_creates_the_table(tmp_path, frame):
+    csv_path = tmp_path / 'consumption.csv'
+    frame.to_csv(csv_path, index=False)
+    repository = ReadingsRepository.from_url(f"sqlite:///{tmp_path / 'fresh.db'}")
+    assert repository.load_csv(str(csv_path), batch_size=40) == len(frame)
+    assert len(repository.frame()) == len(frame)
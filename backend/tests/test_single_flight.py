@@ -0,0 +1,82 @@
+import threading
+import time
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+
+def run_followers(flight, key, count, results):
+    """Start `count` callers of key and wait until they are all waiting"""
+    threads = []
+    for _ in range(count):
+        def follow():
+            try:
+                results.append(flight.do(key, lambda: 'follower ran'))
+            except Exception as e:
+                results.append(e)
+        threads.append(threading.Thread(target=follow))
+    shared = flight.shared
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 5
+    while flight.shared < shared + count and time.monotonic() < deadline:
+        time.sleep(0.001)
+    return threads
+
+
+def test_concurrent_callers_share_one_execution():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    results = []
+
+    def slow():
+        started.set()
+        release.wait(timeout=5)
+        return 'leader ran'
+
+    leader = threading.Thread(target=lambda: results.append(flight.do('A001', slow)))
+    leader.start()
+    assert started.wait(timeout=5)
+    followers = run_followers(flight, 'A001', 3, results)
+    assert flight.stats()['in_flight'] == 1
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(timeout=5)
+
+    assert results == ['leader ran'] * 4
+    assert flight.stats() == {'in_flight': 0, 'executions': 1, 'shared': 3}
+
+
+def test_waiting_callers_see_the_error_and_the_next_call_retries():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    results = []
+
+    def failing():
+        started.set()
+        release.wait(timeout=5)
+        raise RuntimeError('load failed')
+
+    def lead():
+        with pytest.raises(RuntimeError):
+            flight.do('A001', failing)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    assert started.wait(timeout=5)
+    followers = run_followers(flight, 'A001', 2, results)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join(timeout=5)
+
+    assert [str(result) for result in results] == ['load failed'] * 2
+    assert flight.do('A001', lambda: 'retried') == 'retried'
+    assert flight.stats()['executions'] == 2
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight()
+    assert flight.do('a', lambda: 1) == 1
+    assert flight.do('b', lambda: 2) == 2
+    assert flight.stats() == {'in_flight': 0, 'executions': 2, 'shared': 0}
@@ -0,0 +1,36 @@
+import json
+import os
+import subprocess
+import sys
+
+from tests.conftest import BACKEND_DIR
+
+PROBE = """
+import json, sys
+import app
+response = app.app.test_client().get('/api/health')
+print(json.dumps({'status': response.status_code, 'ready': response.get_json()['ready'],
+                  'heavy': [m for m in ('tensorflow', 'keras', 'pandas') if m in sys.modules]}))
+"""
+
+
+def test_health_is_served_without_heavy_imports(tmp_path):
+    env = {**os.environ, 'DB_ENGINE': 'sqlite', 'DB_NAME': str(tmp_path / 'users.db')}
+    result = subprocess.run([sys.executable, '-c', PROBE], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True)
+    stats = json.loads(result.stdout.strip().splitlines()[-1])
+    assert stats == {'status': 200, 'ready': False, 'heavy': []}
+
+
+def test_readiness_follows_startup(api):
+    client = api.app.test_client()
+    was_ready = api.ready.is_set()
+    try:
+        api.ready.clear()
+        assert client.get('/api/ready').status_code == 503
+        assert client.get('/api/health').status_code == 200
+        api.ready.set()
+        assert client.get('/api/ready').get_json() == {'status': 'ready', 'ready': True}
+    finally:
+        if not was_ready:
+            api.ready.clear()
@@ -0,0 +1,100 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.db import ConnectionPool, SQLiteConnection
+from utils.users import (UserImportError, insert_users, iter_user_pages, page_params,
+                         parse_bulk_users, stream_users)
+
+
+@pytest.fixture
+def pool(tmp_path):
+    database = str(tmp_path / 'users.db')
+    return ConnectionPool(lambda: SQLiteConnection(database), size=2)
+
+
+def emails(count):
+    return [(None, None, None, f'user{i}@example.com', None) for i in range(count)]
+
+
+def test_page_params():
+    assert page_params('20', '5', 100) == (20, 5)
+    assert page_params('5000', 0, 100) == (100, 0)
+    assert page_params('0', 0, 100) == (1, 0)
+    for limit, after in (('ten', 0), ('10', 'x'), ('1.5', 0), (None, 0)):
+        with pytest.raises(ValueError):
+            page_params(limit, after, 100)
+    with pytest.raises(ValueError):
+        page_params('10', '-1', 100)
+
+
+def test_parse_bulk_users_from_json_and_csv():
+    body = json.dumps({'users': [{'name': 'Ann', 'flatNo': 'A101', 'email': 'ann@example.com'}]})
+    assert parse_bulk_users(body.encode(), 'application/json') == [
+        ('Ann', 'A101', None, 'ann@example.com', None)]
+
+    csv_body = b'name,flat_no,email\nBo,B202,bo@example.com\nNo Email,C303,\n'
+    assert parse_bulk_users(csv_body, 'text/csv') == [('Bo', 'B202', None, 'bo@example.com', None)]
+
+    messages = b'sender,receiver\na@example.com,b@example.com\nb@example.com,c@example.com\n'
+    assert [row[3] for row in parse_bulk_users(messages, 'text/csv', ['sender', 'receiver'])] == [
+        'a@example.com', 'b@example.com', 'c@example.com']
+
+
+@pytest.mark.parametrize('body, content_type', [
+    (b'{"users": 3}', 'application/json'),
+    (b'[1, 2]', 'application/json'),
+    (b'name,flat_no\nAnn,A101\n', 'text/csv'),
+])
+def test_parse_bulk_users_rejects(body, content_type):
+    with pytest.raises(ValueError):
+        parse_bulk_users(body, content_type)
+
+
+def test_insert_and_page_through_users(pool):
+    assert insert_users(pool.connection, emails(7), batch_size=3) == 7
+
+    pages = list(iter_user_pages(pool.connection, page_size=3))
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert [user['email'] for user in pages[1]] == [f'user{i}@example.com' for i in (3, 4, 5)]
+    assert list(iter_user_pages(pool.connection, page_size=3, after_id=pages[-1][-1]['id'])) == []
+
+
+def test_failed_import_reports_committed_rows(pool):
+    rows = emails(4) + [('too', 'few', 'columns')]
+    with pytest.raises(UserImportError) as error:
+        insert_users(pool.connection, rows, batch_size=4)
+    assert error.value.imported == 4
+    assert sum(len(page) for page in iter_user_pages(pool.connection)) == 4
+
+
+def test_streamed_body_is_the_listing_json(pool):
+    insert_users(pool.connection, emails(5))
+    pages = iter_user_pages(pool.connection, page_size=2)
+    body = json.loads(''.join(stream_users(pages)))
+    assert body['success'] is True
+    assert [user['id'] for user in body['users']] == [1, 2, 3, 4, 5]
+
+    lines = ''.join(stream_users(iter_user_pages(pool.connection, page_size=2), ndjson=True))
+    assert [json.loads(line)['id'] for line in lines.splitlines()] == [1, 2, 3, 4, 5]
+    assert json.loads(''.join(stream_users([]))) == {'success': True, 'users': []}
+
+
+@pytest.mark.parametrize('query', ['limit=ten', 'limit=10&after=x', 'limit=10&after=-3'])
+def test_users_endpoint_rejects_bad_paging_with_400(api, query):
+    response = api.app.test_client().get(f'/api/users?{query}')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+def test_asgi_users_endpoint_rejects_bad_paging_with_400(api, monkeypatch):
+    starlette = pytest.importorskip('starlette.testclient')
+    import asgi_app
+
+    monkeypatch.setattr(api, '_startup_started', True)
+    monkeypatch.setattr(asgi_app, 'executor', ThreadPoolExecutor(max_workers=1))
+    with starlette.TestClient(asgi_app.app) as client:
+        response = client.get('/api/users', params={'limit': 'ten'})
+    assert response.status_code == 400
+    assert response.json()['success'] is False
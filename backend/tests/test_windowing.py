@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from windowing import make_windows
+
+
+def loop_windows(data, sequence_length, target_index=None):
+    """The per-window loop make_windows replaced"""
+    sequences, targets = [], []
+    for i in range(len(data) - sequence_length):
+        sequences.append(data[i:(i + sequence_length)])
+        target = data[i + sequence_length]
+        targets.append(target if target_index is None else target[target_index])
+    return np.array(sequences), np.array(targets)
+
+
+@pytest.mark.parametrize('shape', [(30,), (30, 1), (30, 3)])
+def test_matches_the_loop(shape):
+    data = np.random.default_rng(0).uniform(size=shape)
+    windows, targets = make_windows(data, 7)
+    expected_windows, expected_targets = loop_windows(data, 7)
+    np.testing.assert_array_equal(windows, expected_windows)
+    np.testing.assert_array_equal(targets, expected_targets)
+
+
+def test_target_column_matches_the_loop():
+    data = np.random.default_rng(1).uniform(size=(20, 3))
+    windows, targets = make_windows(data, 5, target_index=0)
+    expected_windows, expected_targets = loop_windows(data, 5, target_index=0)
+    np.testing.assert_array_equal(windows, expected_windows)
+    np.testing.assert_array_equal(targets, expected_targets)
+
+
+def test_multi_horizon_targets():
+    data = np.arange(20.0)
+    windows, targets = make_windows(data, 7, horizon=3)
+    assert windows.shape == (11, 7) and targets.shape == (11, 3)
+    np.testing.assert_array_equal(targets[0], [7, 8, 9])
+    np.testing.assert_array_equal(targets[-1], [17, 18, 19])
+
+
+def test_windows_are_read_only_views():
+    data = np.arange(20.0)
+    windows, _ = make_windows(data, 7)
+    assert np.shares_memory(windows, data)
+    assert not windows.flags.writeable
+
+
+def test_too_short_for_a_window():
+    windows, targets = make_windows(np.arange(5.0).reshape(5, 1), 7)
+    assert windows.shape == (0, 7, 1) and targets.shape == (0, 1)
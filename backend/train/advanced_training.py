@@ -1,3 +1,4 @@
+import sys
 import pandas as pd
 import numpy as np
 import tensorflow as tf
@@ -10,8 +11,17 @@ from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
 from sklearn.preprocessing import MinMaxScaler
 from sklearn.model_selection import TimeSeriesSplit
 import os
+import argparse
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from functools import partial
+from parallel import atomic_write, run_in_pool
+from windowing import make_windows
+from training_meta import write_training_meta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.panel import load_panel
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -83,52 +93,102 @@ class ModelArchitectures:
         outputs = Dense(1)(dense1)
         model = Model(inputs=inputs, outputs=outputs)
         return model
-
-def prepare_sequences(data, sequence_length=7):
-    """Prepare sequences for training with additional features"""
-    sequences = []
-    targets = []
-    
-    # Add day of week and month as features
-    data['day_of_week'] = data['date'].dt.dayofweek
-    data['month'] = data['date'].dt.month
     
-    # Normalize additional features
-    scaler_dow = MinMaxScaler()
-    scaler_month = MinMaxScaler()
-    
-    dow_normalized = scaler_dow.fit_transform(data['day_of_week'].values.reshape(-1, 1))
-    month_normalized = scaler_month.fit_transform(data['month'].values.reshape(-1, 1))
+    @staticmethod
+    def create_direct_multi_horizon(sequence_length, features=1, horizon=30):
+        """LSTM that outputs the whole forecast horizon in one pass"""
+        model = Sequential([
+            LSTM(64, input_shape=(sequence_length, features), return_sequences=True),
+            Dropout(0.2),
+            LSTM(32),
+            Dropout(0.2),
+            Dense(32, activation='relu'),
+            Dense(horizon)
+        ])
+        return model
+
+def min_max_scale(values):
+    """Scale values to [0, 1] the way MinMaxScaler does, constant columns to 0"""
+    low, high = values.min(), values.max()
+    return (values - low) / (high - low if high > low else 1)
+
+def prepare_sequences(dates, usage, sequence_length=7):
+    """Prepare sequences for training with additional features
+
+    dates: datetime64[D] dates of the usage values
+    """
+    # Add day of week and month as features, normalized
+    days = dates.astype(np.int64)
+    day_of_week = (days + 3) % 7  # 1970-01-01 was a Thursday, Monday is 0
+    month = dates.astype('datetime64[M]').astype(np.int64) % 12 + 1
     
     # Combine features
     features = np.column_stack([
-        data['water_usage'].values,
-        dow_normalized,
-        month_normalized
+        usage,
+        min_max_scale(day_of_week.astype(np.float64)),
+        min_max_scale(month.astype(np.float64))
     ])
     
-    for i in range(len(features) - sequence_length):
-        sequences.append(features[i:(i + sequence_length)])
-        targets.append(features[i + sequence_length, 0])  # Only predict water usage
-    
-    return np.array(sequences), np.array(targets)
+    # Only predict water usage
+    return make_windows(features, sequence_length, target_index=0)
 
-def train_with_cross_validation(data, model_fn, floor_no, unit_no, 
-                              sequence_length=7, n_splits=5):
-    """Train model with time series cross-validation"""
-    # Prepare data
-    unit_data = data[(data['floor'] == floor_no) & 
-                     (data['unit'] == unit_no)].copy()
-    unit_data['date'] = pd.to_datetime(unit_data['date'])
-    unit_data = unit_data.sort_values('date')
+def unit_sequences(panel, floor_no, unit_no, scale, sequence_length=7, offset=0.0):
+    """A unit's windows with usage scaled to (usage - offset) / scale
+
+    scale and offset are the range and minimum its lstm_scaler file
+    holds, which serving applies the same way (see forecast_batch).
+    """
+    usage = panel.unit_usage(floor_no, unit_no).astype(np.float64)
+    return prepare_sequences(panel.unit_dates(floor_no, unit_no), (usage - offset) / scale,
+                             sequence_length)
+
+def prepare_unit_data(panel, floor_no, unit_no, sequence_length=7):
+    """Scale one unit's water usage and build its training windows"""
+    usage = panel.unit_usage(floor_no, unit_no).astype(np.float64)
     
     # Scale the data
-    scaler = MinMaxScaler()
-    water_usage_scaled = scaler.fit_transform(unit_data['water_usage'].values.reshape(-1, 1))
-    unit_data['water_usage'] = water_usage_scaled
+    scaler = MinMaxScaler().fit(usage.reshape(-1, 1))
+    X, y = unit_sequences(panel, floor_no, unit_no, scaler.data_range_[0], sequence_length,
+                          offset=scaler.data_min_[0])
+    return X, y, scaler
+
+def train_fold(model_fn, X, y, train_idx, val_idx, sequence_length=7, epochs=100):
+    """Fit a fresh model on one CV fold and return (validation MAE, model)"""
+    X_train, X_val = X[train_idx], X[val_idx]
+    y_train, y_val = y[train_idx], y[val_idx]
+    
+    # Create and compile model
+    model = model_fn(sequence_length, X.shape[-1])
+    model.compile(optimizer=Adam(learning_rate=0.001),
+                 loss='mse',
+                 metrics=['mae'])
+    
+    # Callbacks
+    callbacks = [
+        EarlyStopping(monitor='val_loss', patience=10, 
+                     restore_best_weights=True),
+        ReduceLROnPlateau(monitor='val_loss', factor=0.5, 
+                         patience=5, min_lr=0.0001)
+    ]
+    
+    # Train model
+    history = model.fit(
+        X_train, y_train,
+        epochs=epochs,
+        batch_size=32,
+        validation_data=(X_val, y_val),
+        callbacks=callbacks,
+        verbose=1
+    )
     
-    # Prepare sequences
-    X, y = prepare_sequences(unit_data, sequence_length)
+    # Evaluate
+    _, mae = model.evaluate(X_val, y_val, verbose=0)
+    return mae, model
+
+def train_with_cross_validation(panel, model_fn, floor_no, unit_no, 
+                              sequence_length=7, n_splits=5):
+    """Train model with time series cross-validation"""
+    X, y, scaler = prepare_unit_data(panel, floor_no, unit_no, sequence_length)
     
     # Time series cross-validation
     tscv = TimeSeriesSplit(n_splits=n_splits)
@@ -136,118 +196,289 @@ def train_with_cross_validation(data, model_fn, floor_no, unit_no,
     
     for fold, (train_idx, val_idx) in enumerate(tscv.split(X)):
         logger.info(f"Training fold {fold + 1}/{n_splits}")
-        
-        X_train, X_val = X[train_idx], X[val_idx]
-        y_train, y_val = y[train_idx], y[val_idx]
-        
-        # Create and compile model
-        model = model_fn(sequence_length, X.shape[-1])
-        model.compile(optimizer=Adam(learning_rate=0.001),
-                     loss='mse',
-                     metrics=['mae'])
-        
-        # Callbacks
-        callbacks = [
-            EarlyStopping(monitor='val_loss', patience=10, 
-                         restore_best_weights=True),
-            ReduceLROnPlateau(monitor='val_loss', factor=0.5, 
-                             patience=5, min_lr=0.0001)
-        ]
-        
-        # Train model
-        history = model.fit(
-            X_train, y_train,
-            epochs=100,
-            batch_size=32,
-            validation_data=(X_val, y_val),
-            callbacks=callbacks,
-            verbose=1
-        )
-        
-        # Evaluate
-        _, mae = model.evaluate(X_val, y_val, verbose=0)
+        mae, model = train_fold(model_fn, X, y, train_idx, val_idx, sequence_length)
         cv_scores.append(mae)
     
     return np.mean(cv_scores), np.std(cv_scores), model, scaler
 
-def train_unit_models(data, floor_no, unit_no):
-    """Train all model architectures for a unit"""
-    architectures = {
-        'simple_lstm': ModelArchitectures.create_simple_lstm,
-        'bidirectional_lstm': ModelArchitectures.create_bidirectional_lstm,
-        'cnn_lstm': ModelArchitectures.create_cnn_lstm,
-        'attention_lstm': ModelArchitectures.create_attention_lstm,
-        'gru_lstm_hybrid': ModelArchitectures.create_gru_lstm_hybrid
-    }
+def successive_halving_search(panel, architectures, floor_no, unit_no,
+                              sequence_length=7, n_splits=5, eta=2, workers=1):
+    """Cross-validate architectures fold by fold, pruning the weakest early
+
+    Every candidate trains the first fold; after each fold only the best
+    1/eta (by mean validation MAE so far) go on to the next one, until a
+    single survivor completes all folds. Candidates in the same fold train
+    one after another, or on up to `workers` threads when workers > 1.
+    Threads share one TensorFlow runtime, so only the single-process path
+    of train_all_units (--halving-threads) should ask for more than one.
+
+    Returns (results, best_model, scaler, best_architecture); each result
+    records how many folds the candidate used out of the full budget.
+    """
+    X, y, scaler = prepare_unit_data(panel, floor_no, unit_no, sequence_length)
+    folds = list(TimeSeriesSplit(n_splits=n_splits).split(X))
+    
+    scores = {name: [] for name in architectures}
+    models = {}
+    pruned_at = {}
+    failed = set()
+    survivors = list(architectures)
+    
+    for fold, (train_idx, val_idx) in enumerate(folds):
+        logger.info(f"Fold {fold + 1}/{n_splits}: training {', '.join(survivors)}")
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    name: pool.submit(train_fold, architectures[name], X, y,
+                                      train_idx, val_idx, sequence_length)
+                    for name in survivors
+                }
+            outcomes = {name: future.result for name, future in futures.items()}
+        else:
+            outcomes = {
+                name: partial(train_fold, architectures[name], X, y,
+                              train_idx, val_idx, sequence_length)
+                for name in survivors
+            }
+        for name, outcome in outcomes.items():
+            try:
+                mae, models[name] = outcome()
+                scores[name].append(mae)
+            except Exception as e:
+                logger.error(f"Error training {name}: {e}")
+                survivors.remove(name)
+                failed.add(name)
+        
+        if not survivors:
+            break
+        
+        # Keep the best 1/eta of the candidates for the next fold
+        if fold < n_splits - 1 and len(survivors) > 1:
+            survivors.sort(key=lambda name: np.mean(scores[name]))
+            keep = max(1, int(np.ceil(len(survivors) / eta)))
+            for name in survivors[keep:]:
+                logger.info(f"Pruned {name} after fold {fold + 1} "
+                            f"(mean MAE {np.mean(scores[name]):.4f})")
+                pruned_at[name] = fold + 1
+            survivors = survivors[:keep]
     
-    results = []
-    best_mae = float('inf')
-    best_model = None
-    best_scaler = None
     best_architecture = None
+    if survivors:
+        best_architecture = min(survivors, key=lambda name: np.mean(scores[name]))
     
-    for name, model_fn in architectures.items():
-        logger.info(f"\nTraining {name} for Floor {floor_no} Unit {unit_no}")
-        try:
-            mae, mae_std, model, scaler = train_with_cross_validation(
-                data, model_fn, floor_no, unit_no
-            )
-            
-            results.append({
-                'architecture': name,
-                'mae_mean': mae,
-                'mae_std': mae_std
-            })
-            
-            if mae < best_mae:
-                best_mae = mae
-                best_model = model
-                best_scaler = scaler
-                best_architecture = name
+    results = []
+    for name in architectures:
+        if not scores[name]:
+            continue
+        if name in failed:
+            status = 'failed'
+        elif name in pruned_at:
+            status = 'pruned'
+        else:
+            status = 'selected' if name == best_architecture else 'survived'
+        results.append({
+            'architecture': name,
+            'mae_mean': np.mean(scores[name]),
+            'mae_std': np.std(scores[name]),
+            'folds_trained': len(scores[name]),
+            'folds_budget': n_splits,
+            'status': status
+        })
+    
+    if best_architecture is None:
+        return results, None, scaler, None
+    return results, models[best_architecture], scaler, best_architecture
+
+ARCHITECTURES = {
+    'simple_lstm': ModelArchitectures.create_simple_lstm,
+    'bidirectional_lstm': ModelArchitectures.create_bidirectional_lstm,
+    'cnn_lstm': ModelArchitectures.create_cnn_lstm,
+    'attention_lstm': ModelArchitectures.create_attention_lstm,
+    'gru_lstm_hybrid': ModelArchitectures.create_gru_lstm_hybrid
+}
+
+def train_direct_model(panel, floor_no, unit_no, horizon=30, sequence_length=7,
+                       epochs=100, val_fraction=0.2):
+    """Train and save a direct multi-horizon model for a unit
+
+    Inputs are the last sequence_length days of usage min-max scaled
+    like the rollout model's, with the range and minimum
+    lstm_scaler_<key>.npy holds, and targets are the following `horizon`
+    days on the same scale. Serving applies that one scaler to both.
+    """
+    usage = panel.unit_usage(floor_no, unit_no).astype(np.float64)
+    scaler = MinMaxScaler().fit(usage.reshape(-1, 1))
+    X, y = make_windows(scaler.transform(usage.reshape(-1, 1)).ravel(), sequence_length,
+                        horizon=horizon)
+    X = X[..., None]
+    
+    # Chronological split, validation on the most recent windows
+    split = int(len(X) * (1 - val_fraction))
+    X_train, X_val = X[:split], X[split:]
+    y_train, y_val = y[:split], y[split:]
+    
+    model = ModelArchitectures.create_direct_multi_horizon(sequence_length, 1, horizon)
+    model.compile(optimizer=Adam(learning_rate=0.001),
+                 loss='mse',
+                 metrics=['mae'])
+    
+    callbacks = [
+        EarlyStopping(monitor='val_loss', patience=10, 
+                     restore_best_weights=True),
+        ReduceLROnPlateau(monitor='val_loss', factor=0.5, 
+                         patience=5, min_lr=0.0001)
+    ]
+    model.fit(
+        X_train, y_train,
+        epochs=epochs,
+        batch_size=32,
+        validation_data=(X_val, y_val),
+        callbacks=callbacks,
+        verbose=1
+    )
+    _, mae = model.evaluate(X_val, y_val, verbose=0)
+    
+    model_key = f"A{(floor_no-1):01d}{unit_no:02d}"
+    atomic_write(f'models/lstm_direct_{model_key}.keras', model.save)
+    
+    return {
+        'architecture': f'direct_multi_horizon_{horizon}',
+        'mae_mean': mae,
+        'mae_std': 0.0
+    }
+
+def train_unit_models(panel, floor_no, unit_no, search='full', workers=1,
+                      direct_horizon=None):
+    """Train all model architectures for a unit
+
+    search: 'full' cross-validates every architecture on every fold,
+    'halving' prunes losing architectures early (see successive_halving_search)
+    workers: threads for the halving search's candidates in each fold
+    direct_horizon: also train a direct multi-horizon model of this length
+    """
+    architectures = ARCHITECTURES
+    
+    if search == 'halving':
+        results, best_model, best_scaler, best_architecture = successive_halving_search(
+            panel, architectures, floor_no, unit_no, workers=workers
+        )
+    else:
+        results = []
+        best_mae = float('inf')
+        best_model = None
+        best_scaler = None
+        best_architecture = None
+        
+        for name, model_fn in architectures.items():
+            logger.info(f"\nTraining {name} for Floor {floor_no} Unit {unit_no}")
+            try:
+                mae, mae_std, model, scaler = train_with_cross_validation(
+                    panel, model_fn, floor_no, unit_no
+                )
                 
-        except Exception as e:
-            logger.error(f"Error training {name}: {e}")
+                results.append({
+                    'architecture': name,
+                    'mae_mean': mae,
+                    'mae_std': mae_std
+                })
+                
+                if mae < best_mae:
+                    best_mae = mae
+                    best_model = model
+                    best_scaler = scaler
+                    best_architecture = name
+                    
+            except Exception as e:
+                logger.error(f"Error training {name}: {e}")
     
     # Save best model
     if best_model is not None:
         model_key = f"A{(floor_no-1):01d}{unit_no:02d}"
-        best_model.save(f'models/lstm_model_{model_key}.keras')
-        np.save(f'models/lstm_scaler_{model_key}.npy', best_scaler.data_range_)
-        
-        # Save architecture info
-        with open(f'models/architecture_{model_key}.txt', 'w') as f:
-            f.write(best_architecture)
+        save_artifacts(model_key, best_model, best_scaler, best_architecture,
+                       trained_until=panel.unit_dates(floor_no, unit_no)[-1])
+    
+    if direct_horizon:
+        try:
+            results.append(train_direct_model(panel, floor_no, unit_no, direct_horizon))
+        except Exception as e:
+            logger.error(f"Error training direct model: {e}")
     
     return results
 
-def train_all_units():
-    """Train models for all units"""
+def save_artifacts(model_key, model, scaler, architecture, trained_until=None):
+    """Write a unit's model, scaler and architecture files atomically
+
+    Each file is renamed into place only once fully written, so parallel
+    workers and a running API never see a half-written artifact. With
+    trained_until, the training cutoff is recorded after the model.
+    """
+    def write_architecture(path):
+        with open(path, 'w') as f:
+            f.write(architecture)
+    
+    # The range first, as the scaler file always held, then the minimum
+    atomic_write(f'models/lstm_scaler_{model_key}.npy',
+                 lambda path: np.save(path, np.r_[scaler.data_range_, scaler.data_min_]))
+    atomic_write(f'models/architecture_{model_key}.txt', write_architecture)
+    atomic_write(f'models/lstm_model_{model_key}.keras', model.save)
+    if trained_until is not None:
+        write_training_meta(model_key, trained_until, architecture=architecture, mode='full')
+
+_worker_panels = {}
+
+def train_unit_task(data_path, floor_no, unit_no, search='full', direct_horizon=None):
+    """Process pool entry point: train one unit and tag its results"""
+    if data_path not in _worker_panels:
+        _worker_panels[data_path] = load_panel(data_path)
+    
+    # One unit per process already fills the CPUs; candidates train in turn
+    results = train_unit_models(_worker_panels[data_path], floor_no, unit_no, search,
+                                workers=1, direct_horizon=direct_horizon)
+    return [{'floor': floor_no, 'unit': unit_no, **result} for result in results]
+
+def train_all_units(workers=1, tf_threads=1, search='full', direct_horizon=None,
+                    data_path='../water_consumption_data.csv', halving_threads=1):
+    """Train models for all units, optionally spread over a process pool
+
+    halving_threads: with a single process, train the halving search's
+    candidates on this many threads instead of in turn. Keras fits on
+    threads share global TensorFlow state, so this is opt-in and never
+    used inside pool workers.
+    """
     # Create directories
     os.makedirs('models', exist_ok=True)
     os.makedirs('logs', exist_ok=True)
     
     # Load data
     try:
-        data = pd.read_csv('../water_consumption_data.csv')
+        panel = load_panel(data_path)
     except Exception as e:
         logger.error(f"Error loading data: {e}")
         return
     
-    # Get unique units
-    units = data[['floor', 'unit']].drop_duplicates().values
+    units = panel.units
     
     all_results = []
-    for floor_no, unit_no in units:
-        try:
-            results = train_unit_models(data, floor_no, unit_no)
-            for result in results:
-                all_results.append({
-                    'floor': floor_no,
-                    'unit': unit_no,
-                    **result
-                })
-        except Exception as e:
-            logger.error(f"Error training models for Floor {floor_no} Unit {unit_no}: {e}")
+    if workers > 1:
+        tasks = [(data_path, floor_no, unit_no, search, direct_horizon)
+                 for floor_no, unit_no in units]
+        for results in run_in_pool(train_unit_task, tasks, workers, tf_threads):
+            all_results.extend(results)
+        all_results.sort(key=lambda result: (result['floor'], result['unit']))
+    else:
+        for floor_no, unit_no in units:
+            try:
+                results = train_unit_models(panel, floor_no, unit_no, search,
+                                            workers=halving_threads,
+                                            direct_horizon=direct_horizon)
+                for result in results:
+                    all_results.append({
+                        'floor': floor_no,
+                        'unit': unit_no,
+                        **result
+                    })
+            except Exception as e:
+                logger.error(f"Error training models for Floor {floor_no} Unit {unit_no}: {e}")
     
     # Save results
     results_df = pd.DataFrame(all_results)
@@ -258,6 +489,27 @@ def train_all_units():
     print("\nTraining Summary:")
     summary = results_df.groupby('architecture')[['mae_mean', 'mae_std']].mean()
     print(summary)
+    
+    if 'folds_trained' in results_df:
+        trained = results_df['folds_trained'].sum()
+        budget = results_df['folds_budget'].sum()
+        print(f"\nTrained {trained} of {budget} architecture folds "
+              f"({1 - trained / budget:.0%} of the full search saved)")
 
 if __name__ == "__main__":
-    train_all_units() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Train all unit models')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of units trained in parallel processes')
+    parser.add_argument('--tf-threads', type=int, default=1,
+                        help='TensorFlow intra-op threads per worker')
+    parser.add_argument('--search', choices=['full', 'halving'], default='full',
+                        help='cross-validate every architecture, or prune losers early')
+    parser.add_argument('--direct-horizon', type=int, default=None,
+                        help='also train a direct multi-horizon model per unit')
+    parser.add_argument('--data', default='../water_consumption_data.csv',
+                        help='consumption CSV, or a readings table: sqlite:///<file> or mysql')
+    parser.add_argument('--halving-threads', type=int, default=1,
+                        help='threads for halving candidates when --workers is 1')
+    args = parser.parse_args()
+    train_all_units(args.workers, args.tf_threads, args.search, args.direct_horizon, args.data,
+                    args.halving_threads) 
\ No newline at end of file
@@ -1,3 +1,4 @@
+import sys
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
@@ -5,6 +6,10 @@ import seaborn as sns
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 from tensorflow.keras.models import load_model
 import os
+from windowing import make_windows
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.panel import load_panel
 
 def evaluate_predictions(true_values, predictions, title, save_path):
     """Evaluate and visualize model predictions"""
@@ -55,8 +60,9 @@ def plot_training_history(history, model_key):
     plt.savefig(f'plots/training_history_{model_key}.png')
     plt.close()
 
-def evaluate_model(floor_no, unit_no, sequence_length=7):
-    """Evaluate model performance for a specific unit"""
+def evaluate_model(floor_no, unit_no, sequence_length=7, data_path='../water_consumption_data.csv',
+                   panel=None):
+    """Evaluate model performance for a specific unit, from panel if given"""
     model_key = f"A{(floor_no-1):01d}{unit_no:02d}"
     
     # Load model and scaler
@@ -64,9 +70,9 @@ def evaluate_model(floor_no, unit_no, sequence_length=7):
     scaler = np.load(f'models/lstm_scaler_{model_key}.npy')
     
     # Load data
-    data = pd.read_csv('../water_consumption_data.csv')
-    unit_data = data[(data['floor'] == floor_no) & 
-                     (data['unit'] == unit_no)]['water_usage'].values
+    if panel is None:
+        panel = load_panel(data_path, floor_no, unit_no)
+    unit_data = panel.unit_usage(floor_no, unit_no)
     
     # Scale data
     scaler_min = 0
@@ -74,14 +80,7 @@ def evaluate_model(floor_no, unit_no, sequence_length=7):
     unit_data_scaled = (unit_data - scaler_min) / (scaler_max - scaler_min)
     
     # Prepare sequences
-    sequences = []
-    targets = []
-    for i in range(len(unit_data_scaled) - sequence_length):
-        sequences.append(unit_data_scaled[i:i+sequence_length])
-        targets.append(unit_data_scaled[i+sequence_length])
-    
-    sequences = np.array(sequences)
-    targets = np.array(targets)
+    sequences, targets = make_windows(unit_data_scaled, sequence_length)
     
     # Make predictions
     predictions_scaled = model.predict(sequences.reshape(-1, sequence_length, 1))
@@ -106,13 +105,12 @@ if __name__ == "__main__":
         os.makedirs('plots')
     
     # Evaluate all models
-    df = pd.read_csv('../water_consumption_data.csv')
-    units = df[['floor', 'unit']].drop_duplicates().values
+    panel = load_panel('../water_consumption_data.csv')
     
     results = []
-    for floor_no, unit_no in units:
+    for floor_no, unit_no in panel.units:
         print(f"\nEvaluating model for Floor {floor_no} Unit {unit_no}")
-        metrics = evaluate_model(floor_no, unit_no)
+        metrics = evaluate_model(floor_no, unit_no, panel=panel)
         results.append({
             'floor': floor_no,
             'unit': unit_no,
@@ -0,0 +1,162 @@
+import os
+import sys
+import json
+import logging
+import argparse
+
+import numpy as np
+import pandas as pd
+from tensorflow.keras.models import Model
+from tensorflow.keras.layers import (LSTM, Dense, Dropout, Input, Embedding,
+                                     Flatten, concatenate)
+from tensorflow.keras.optimizers import Adam
+from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from parallel import atomic_write
+from windowing import make_windows
+
+# Feature helpers are shared with the serving side in backend/utils
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.global_forecaster import (GLOBAL_MODEL_FILE, GLOBAL_META_FILE,
+                                     calendar_features, static_features)
+from utils.panel import load_panel
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def create_global_model(sequence_length, n_units, static_size=4, embedding_dim=8):
+    """One LSTM shared by all units, conditioned on a learned unit embedding"""
+    window = Input(shape=(sequence_length, 1), name='window')
+    unit = Input(shape=(1,), dtype='int32', name='unit')
+    static = Input(shape=(static_size,), name='static')
+
+    lstm_out = LSTM(64, return_sequences=True)(window)
+    lstm_out = Dropout(0.2)(lstm_out)
+    lstm_out = LSTM(32)(lstm_out)
+    embedding = Flatten()(Embedding(n_units, embedding_dim)(unit))
+
+    combined = concatenate([lstm_out, embedding, static])
+    dense1 = Dense(32, activation='relu')(combined)
+    outputs = Dense(1)(dense1)
+    return Model(inputs=[window, unit, static], outputs=outputs)
+
+def build_global_dataset(panel, sequence_length=7, val_fraction=0.2):
+    """Windows for every unit, split chronologically within each unit
+
+    Usage is scaled per unit by its maximum so one model can serve flats
+    with very different consumption levels; the scales are returned in the
+    metadata so serving can undo them.
+    """
+    meta = {
+        'sequence_length': sequence_length,
+        'units': [list(unit) for unit in panel.units],
+        'usage_scale': [],
+        'residents_scale': float(panel.residents.max()),
+        'unit_size_scale': float(panel.unit_size.max()),
+        'trained_until': str(panel.dates[-1])
+    }
+
+    splits = {'train': [], 'val': []}
+    for index, (floor_no, unit_no) in enumerate(panel.units):
+        usage = panel.unit_usage(floor_no, unit_no)
+        scale = float(usage.max())
+        meta['usage_scale'].append(scale)
+
+        windows, targets = make_windows(usage / scale, sequence_length)
+        target_dates = panel.unit_dates(floor_no, unit_no)[sequence_length:]
+        unit_static = static_features(panel.residents[index], panel.unit_size[index], meta)
+        static = np.concatenate([
+            np.broadcast_to(unit_static, (len(target_dates), len(unit_static))),
+            calendar_features(target_dates)
+        ], axis=1)
+
+        split = int(len(windows) * (1 - val_fraction))
+        for name, rows in (('train', slice(None, split)), ('val', slice(split, None))):
+            splits[name].append({
+                'window': windows[rows, :, None],
+                'unit': np.full((len(windows[rows]), 1), index, dtype=np.int32),
+                'static': static[rows],
+                'target': targets[rows],
+                'scale': np.full(len(windows[rows]), scale, dtype=np.float32)
+            })
+
+    dataset = {
+        name: {key: np.concatenate([part[key] for part in parts]) for key in parts[0]}
+        for name, parts in splits.items()
+    }
+    return dataset, meta
+
+def evaluate_global_model(model, dataset, meta, baseline_path='models/evaluation_results.csv'):
+    """Per-unit validation metrics, side by side with the per-unit models"""
+    val = dataset['val']
+    predictions = model.predict([val['window'], val['unit'], val['static']], verbose=0).ravel()
+    predictions = predictions * val['scale']
+    targets = val['target'] * val['scale']
+
+    results = []
+    for index, (floor_no, unit_no) in enumerate(meta['units']):
+        rows = val['unit'].ravel() == index
+        results.append({
+            'floor': floor_no,
+            'unit': unit_no,
+            'mae': mean_absolute_error(targets[rows], predictions[rows]),
+            'rmse': np.sqrt(mean_squared_error(targets[rows], predictions[rows])),
+            'r2': r2_score(targets[rows], predictions[rows])
+        })
+    results_df = pd.DataFrame(results)
+
+    if os.path.exists(baseline_path):
+        baseline = pd.read_csv(baseline_path)[['floor', 'unit', 'mae', 'rmse', 'r2']]
+        results_df = results_df.merge(baseline, on=['floor', 'unit'], how='left',
+                                      suffixes=('', '_per_unit'))
+        print("\nGlobal model vs per-unit models (MAE, litres):")
+        print(results_df[['floor', 'unit', 'mae', 'mae_per_unit']].to_string(index=False))
+        print(f"\nMean MAE: global {results_df['mae'].mean():.2f}, "
+              f"per-unit {results_df['mae_per_unit'].mean():.2f}")
+
+    return results_df
+
+def train_global_model(data_path='../water_consumption_data.csv', sequence_length=7,
+                       epochs=100, val_fraction=0.2):
+    """Fit one model across all units and save it next to the per-unit models"""
+    os.makedirs('models', exist_ok=True)
+    panel = load_panel(data_path)
+    dataset, meta = build_global_dataset(panel, sequence_length, val_fraction)
+    train, val = dataset['train'], dataset['val']
+
+    model = create_global_model(sequence_length, len(meta['units']))
+    model.compile(optimizer=Adam(learning_rate=0.001), loss='mse', metrics=['mae'])
+
+    callbacks = [
+        EarlyStopping(monitor='val_loss', patience=10, restore_best_weights=True),
+        ReduceLROnPlateau(monitor='val_loss', factor=0.5, patience=5, min_lr=0.0001)
+    ]
+    model.fit(
+        [train['window'], train['unit'], train['static']], train['target'],
+        epochs=epochs,
+        batch_size=64,
+        validation_data=([val['window'], val['unit'], val['static']], val['target']),
+        callbacks=callbacks,
+        verbose=1
+    )
+
+    def write_meta(path):
+        with open(path, 'w') as f:
+            json.dump(meta, f, indent=2)
+
+    atomic_write(os.path.join('models', GLOBAL_META_FILE), write_meta)
+    atomic_write(os.path.join('models', GLOBAL_MODEL_FILE), model.save)
+
+    results_df = evaluate_global_model(model, dataset, meta)
+    results_df.to_csv('models/global_evaluation_results.csv', index=False)
+    print("\nEvaluation results saved to models/global_evaluation_results.csv")
+    return model, meta
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Train one forecasting model for all units')
+    parser.add_argument('--epochs', type=int, default=100)
+    parser.add_argument('--data', default='../water_consumption_data.csv',
+                        help='consumption CSV, or a readings table: sqlite:///<file> or mysql')
+    args = parser.parse_args()
+    train_global_model(data_path=args.data, epochs=args.epochs)
@@ -0,0 +1,231 @@
+import os
+import sys
+import time
+import logging
+import argparse
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+import pandas as pd
+from tensorflow.keras.models import load_model
+from tensorflow.keras.optimizers import Adam
+
+from parallel import atomic_write, run_in_pool
+from windowing import make_windows
+from advanced_training import ARCHITECTURES, train_fold, unit_sequences
+from training_meta import read_training_meta, write_training_meta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.panel import load_panel
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def unit_windows(panel, floor_no, unit_no, features, scale, offset, sequence_length=7):
+    """(X, y, target_dates) in the layout the unit's model was trained on
+
+    Three-feature models come from advanced_training.py (usage, day of week,
+    month), one-feature models from train_model.py (usage only). Usage is
+    scaled to (usage - offset) / scale, as serving does.
+    """
+    if features == 3:
+        X, y = unit_sequences(panel, floor_no, unit_no, scale, sequence_length, offset=offset)
+    else:
+        usage = panel.unit_usage(floor_no, unit_no).astype(np.float64)
+        X, y = make_windows(((usage - offset) / scale).reshape(-1, 1), sequence_length)
+    return X, y, panel.unit_dates(floor_no, unit_no)[sequence_length:]
+
+def fitted_range(usage, dates, cutoff, fit_rows):
+    """(low, high) of the usage the scaler may be fitted to
+
+    That is every day before the holdout, plus any later days the model
+    was already trained on before the cutoff.
+    """
+    seen = max(fit_rows, int(np.searchsorted(dates, np.datetime64(cutoff, 'D'), side='right')))
+    return float(usage[:seen].min()), float(usage[:seen].max())
+
+def incremental_update(panel, floor_no, unit_no, epochs=5, holdout_days=7,
+                       learning_rate=1e-4, tolerance=0.0, since=None, models_dir='models',
+                       retrain=True, retrain_epochs=100):
+    """Fine-tune a unit's saved model on the days after its training cutoff
+
+    The last holdout_days windows are held out. The model is fitted only to
+    the windows whose target is newer than the cutoff and older than the
+    holdout, and replaces the saved one only if its holdout MAE is no worse
+    than the saved model's (within tolerance, a fraction). Windows still in
+    the holdout are picked up by a later run, as the cutoff only advances
+    to the last window actually trained on.
+
+    Inputs are scaled with the unit's saved lstm_scaler range and minimum,
+    which the model was trained and is served with. If the data before the
+    holdout no longer has that range and minimum, fine-tuning on a new
+    scale would shift every input, so the unit is instead retrained from
+    scratch on the refitted scaler (or only reported, with retrain=False).
+    The new scaler is saved only together with a retrained model that
+    passes the holdout.
+
+    since: cutoff date to use when the model has no training record
+    """
+    model_key = f"A{(floor_no-1):01d}{unit_no:02d}"
+    model_path = os.path.join(models_dir, f'lstm_model_{model_key}.keras')
+    scaler_path = os.path.join(models_dir, f'lstm_scaler_{model_key}.npy')
+    result = {'floor': floor_no, 'unit': unit_no, 'status': None}
+    if not os.path.exists(model_path):
+        return {**result, 'status': 'no_model'}
+    if not os.path.exists(scaler_path):
+        logger.warning(f"{model_key} has no saved scaler; retrain it with advanced_training.py")
+        return {**result, 'status': 'no_scaler'}
+
+    meta = read_training_meta(model_key, models_dir) or {}
+    cutoff = meta.get('trained_until') or since
+    if cutoff is None:
+        logger.warning(f"{model_key} has no recorded training cutoff; pass --since to update it")
+        return {**result, 'status': 'no_cutoff'}
+
+    start = time.perf_counter()
+    scaler = np.load(scaler_path)
+    # Scaler files written before the minimum was kept hold only the range
+    scale, offset = float(scaler[0]), float(scaler[1]) if len(scaler) > 1 else 0.0
+    model = load_model(model_path)
+    sequence_length, features = model.input_shape[1], model.input_shape[-1]
+    X, y, target_dates = unit_windows(panel, floor_no, unit_no, features, scale, offset,
+                                      sequence_length)
+
+    holdout_start = len(X) - holdout_days
+    new = np.flatnonzero(target_dates > np.datetime64(cutoff, 'D'))
+    train_idx = new[new < holdout_start]
+    result.update({'cutoff': cutoff, 'new_windows': len(new), 'trained_windows': len(train_idx)})
+    if len(new) == 0:
+        return {**result, 'status': 'up_to_date'}
+    if len(train_idx) == 0 or holdout_start <= 0:
+        # Everything new is still in the holdout; wait for more days
+        return {**result, 'status': 'waiting'}
+
+    usage = panel.unit_usage(floor_no, unit_no).astype(np.float64)
+    low, high = fitted_range(usage, panel.unit_dates(floor_no, unit_no), cutoff,
+                             holdout_start + sequence_length)
+    held_out = usage[holdout_start + sequence_length:]
+    outside = int(((held_out < low) | (held_out > high)).sum())
+    if outside:
+        logger.info(f"{model_key}: {outside} holdout days outside the scaler's range "
+                    f"[{low:.2f}, {high:.2f}]")
+
+    X_hold, y_hold = X[holdout_start:], y[holdout_start:]
+    model.compile(optimizer=Adam(learning_rate=learning_rate), loss='mse', metrics=['mae'])
+    _, previous_mae = model.evaluate(X_hold, y_hold, verbose=0)
+    # MAE in litres, comparable across scales
+    result.update({'previous_mae': previous_mae * scale, 'scale': scale, 'offset': offset})
+
+    architecture = meta.get('architecture')
+    architecture_path = os.path.join(models_dir, f'architecture_{model_key}.txt')
+    if architecture is None and os.path.exists(architecture_path):
+        with open(architecture_path, 'r') as f:
+            architecture = f.read().strip()
+
+    new_scale = high - low
+    if not np.allclose([new_scale, low], [scale, offset], rtol=1e-6):
+        logger.warning(f"{model_key}: usage range changed from {offset:.2f} + {scale:.2f} "
+                       f"to {low:.2f} + {new_scale:.2f}")
+        result.update({'new_scale': new_scale, 'new_offset': low})
+        if not retrain or architecture not in ARCHITECTURES:
+            result.update({'status': 'range_changed', 'seconds': time.perf_counter() - start})
+            return result
+
+        # A new scale moves every input, so start from fresh weights
+        X, y, _ = unit_windows(panel, floor_no, unit_no, features, new_scale, low,
+                               sequence_length)
+        mae, model = train_fold(ARCHITECTURES[architecture], X, y, np.arange(holdout_start),
+                                np.arange(holdout_start, len(X)), sequence_length, retrain_epochs)
+        mae *= new_scale
+        mode, trained_until = 'retrained', target_dates[holdout_start - 1]
+    else:
+        model.fit(X[train_idx], y[train_idx], epochs=epochs, batch_size=32, verbose=0)
+        _, mae = model.evaluate(X_hold, y_hold, verbose=0)
+        mae *= scale
+        mode, trained_until = 'incremental', target_dates[train_idx[-1]]
+
+    result['mae'] = mae
+    if mae > previous_mae * scale * (1 + tolerance):
+        result.update({'status': 'rejected', 'seconds': time.perf_counter() - start})
+        return result
+
+    if mode == 'retrained':
+        logger.info(f"{model_key}: replacing scaler {offset:.2f} + {scale:.2f} "
+                    f"with {low:.2f} + {new_scale:.2f}")
+        atomic_write(scaler_path, lambda path: np.save(path, np.array([new_scale, low])))
+    atomic_write(model_path, model.save)
+    write_training_meta(model_key, trained_until, models_dir,
+                        architecture=architecture, mode=mode,
+                        previous_cutoff=cutoff, holdout_mae=mae,
+                        previous_holdout_mae=previous_mae * scale,
+                        scale=new_scale if mode == 'retrained' else scale,
+                        offset=low if mode == 'retrained' else offset,
+                        previous_scale=scale, previous_offset=offset)
+    result.update({'status': 'retrained' if mode == 'retrained' else 'updated',
+                   'trained_until': str(trained_until),
+                   'seconds': time.perf_counter() - start})
+    return result
+
+_worker_panels = {}
+
+def incremental_task(data_path, floor_no, unit_no, **options):
+    """Process pool entry point: update one unit"""
+    if data_path not in _worker_panels:
+        _worker_panels[data_path] = load_panel(data_path)
+    return incremental_update(_worker_panels[data_path], floor_no, unit_no, **options)
+
+def update_all_units(workers=1, tf_threads=1, data_path='../water_consumption_data.csv', **options):
+    """Incrementally update every unit's model and log the outcome per unit"""
+    os.makedirs('logs', exist_ok=True)
+    _worker_panels[data_path] = load_panel(data_path)
+    units = _worker_panels[data_path].units
+
+    if workers > 1:
+        task = partial(incremental_task, **options)
+        results = run_in_pool(task, [(data_path, floor_no, unit_no) for floor_no, unit_no in units],
+                              workers, tf_threads)
+    else:
+        results = []
+        for floor_no, unit_no in units:
+            try:
+                results.append(incremental_task(data_path, floor_no, unit_no, **options))
+            except Exception as e:
+                logger.error(f"Error updating Floor {floor_no} Unit {unit_no}: {e}")
+
+    results_df = pd.DataFrame(results).sort_values(['floor', 'unit'])
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    results_df.to_csv(f'logs/incremental_results_{timestamp}.csv', index=False)
+
+    print("\nIncremental update summary:")
+    print(results_df['status'].value_counts().to_string())
+    if 'seconds' in results_df:
+        print(f"Mean time per fine-tuned unit: {results_df['seconds'].mean():.1f}s")
+    return results_df
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Fine-tune saved unit models on the days since they were trained')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of units updated in parallel processes')
+    parser.add_argument('--tf-threads', type=int, default=1,
+                        help='TensorFlow intra-op threads per worker')
+    parser.add_argument('--data', default='../water_consumption_data.csv',
+                        help='consumption CSV, or a readings table: sqlite:///<file> or mysql')
+    parser.add_argument('--epochs', type=int, default=5)
+    parser.add_argument('--holdout-days', type=int, default=7,
+                        help='most recent windows kept back to accept or reject an update')
+    parser.add_argument('--learning-rate', type=float, default=1e-4)
+    parser.add_argument('--tolerance', type=float, default=0.0,
+                        help='accepted relative holdout MAE increase')
+    parser.add_argument('--since', default=None,
+                        help='training cutoff (YYYY-MM-DD) for models without a training record')
+    parser.add_argument('--no-retrain', dest='retrain', action='store_false',
+                        help='only report units whose usage range changed instead of retraining them')
+    parser.add_argument('--retrain-epochs', type=int, default=100,
+                        help='epochs for units retrained on a refitted scaler')
+    args = parser.parse_args()
+
+    update_all_units(args.workers, args.tf_threads, args.data, epochs=args.epochs,
+                     holdout_days=args.holdout_days, learning_rate=args.learning_rate,
+                     tolerance=args.tolerance, since=args.since, retrain=args.retrain,
+                     retrain_epochs=args.retrain_epochs)
@@ -0,0 +1,116 @@
+import os
+import sys
+import time
+import logging
+import argparse
+from datetime import datetime
+
+import numpy as np
+
+from parallel import atomic_write
+
+# Serving components are shared with the API in backend/utils
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.data_store import ConsumptionStore
+from utils.segment_store import SegmentStore
+from utils.forecasting import ForecastRequest, forecast_batch
+from utils.materialized import MATERIALIZED_FILE, unit_fingerprint
+from utils.model_registry import ModelRegistry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def load_previous(path, max_days):
+    """Rows of an earlier run keyed by (floor, unit), if it used the same horizon"""
+    if not os.path.exists(path):
+        return {}
+    with np.load(path, allow_pickle=False) as archive:
+        if int(archive['max_days']) != max_days:
+            logger.info("Horizon changed, recomputing every unit")
+            return {}
+        return {
+            (int(f), int(u)): {
+                'fingerprint': str(archive['fingerprints'][i]),
+                'values': archive['values'][i],
+                'window': archive['windows'][i],
+                'direct_horizon': int(archive['direct_horizons'][i])
+            }
+            for i, (f, u) in enumerate(archive['units'])
+        }
+
+def materialize_forecasts(max_days=30, models_dir='models', data_path='../water_consumption_data.csv',
+                          backend='keras', stateful=False, full=False, sequence_length=7,
+                          readings_dir='../readings'):
+    """Forecast every unit up to max_days and write them for the API to serve
+
+    Meant to run nightly after new readings arrive. Only units whose model
+    files or recent readings changed since the previous run are forecast
+    again, all of them in one forecast_batch call. The backend and stateful
+    settings should match the API's so its fingerprints agree.
+    """
+    start = time.perf_counter()
+    # Include readings posted to the API since the CSV was written
+    store = ConsumptionStore(data_path, segments=SegmentStore(readings_dir))
+    units = store.units()
+    registry = ModelRegistry(models_dir, max_size=max(len(units), 1),
+                             backend=backend, stateful=stateful)
+    path = os.path.join(models_dir, MATERIALIZED_FILE)
+    previous = {} if full else load_previous(path, max_days)
+
+    rows = {}
+    pending = []
+    reused = 0
+    for floor_no, unit_no in units:
+        try:
+            artifacts = registry.fingerprint(floor_no, unit_no)
+            window = store.recent(floor_no, unit_no, sequence_length)
+        except Exception as e:
+            logger.warning(f"Skipping Floor {floor_no} Unit {unit_no}: {e}")
+            continue
+        fingerprint = unit_fingerprint(artifacts, window, stateful)
+        row = previous.get((floor_no, unit_no))
+        if row is not None and row['fingerprint'] == fingerprint:
+            rows[(floor_no, unit_no)] = row
+            reused += 1
+        else:
+            pending.append((ForecastRequest(floor_no, unit_no, max_days), fingerprint))
+
+    forecast_batch([req for req, _ in pending], registry, store, sequence_length)
+    for req, fingerprint in pending:
+        if req.error is not None:
+            logger.error(f"Error forecasting Floor {req.floor} Unit {req.unit}: {req.error}")
+            continue
+        direct = registry.get(req.floor, req.unit).direct
+        rows[(req.floor, req.unit)] = {
+            'fingerprint': fingerprint,
+            'values': req.predictions,
+            'window': req.input_data,
+            'direct_horizon': direct.horizon if direct is not None else 0
+        }
+
+    keys = [unit for unit in units if unit in rows]
+    arrays = {
+        'units': np.array(keys, dtype=np.int32).reshape(-1, 2),
+        'values': np.array([rows[k]['values'] for k in keys], dtype=np.float32).reshape(-1, max_days),
+        'windows': np.array([rows[k]['window'] for k in keys], dtype=np.float64),
+        'fingerprints': np.array([rows[k]['fingerprint'] for k in keys], dtype='<U40'),
+        'direct_horizons': np.array([rows[k]['direct_horizon'] for k in keys], dtype=np.int32),
+        'max_days': np.array(max_days),
+        'generated_at': np.array(datetime.now().isoformat())
+    }
+    atomic_write(path, lambda tmp_path: np.savez_compressed(tmp_path, **arrays))
+
+    print(f"\nMaterialized {len(keys)} units up to {max_days} days in {path}")
+    print(f"Recomputed {len(keys) - reused}, reused {reused}, "
+          f"took {time.perf_counter() - start:.2f}s")
+    return arrays
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Precompute forecasts for every unit')
+    parser.add_argument('--max-days', type=int, default=30)
+    parser.add_argument('--backend', default=os.environ.get('INFERENCE_BACKEND', 'keras'))
+    parser.add_argument('--stateful', action='store_true',
+                        default=os.environ.get('INFERENCE_STATEFUL', '0') == '1')
+    parser.add_argument('--full', action='store_true', help='recompute every unit')
+    args = parser.parse_args()
+    materialize_forecasts(args.max_days, backend=args.backend, stateful=args.stateful, full=args.full)
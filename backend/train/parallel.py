@@ -0,0 +1,61 @@
+import os
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+def atomic_write(path, write_fn):
+    """Write a file through a temporary sibling and rename it into place
+
+    write_fn(tmp_path) does the actual writing. The temporary name keeps the
+    extension (Keras and NumPy both insist on it) and starts with a dot so
+    it is never picked up as an artifact by the models directory scanners.
+    """
+    directory, name = os.path.split(path)
+    root, ext = os.path.splitext(name)
+    tmp_path = os.path.join(directory, f'.{root}.{os.getpid()}.tmp{ext}')
+    try:
+        write_fn(tmp_path)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def _init_worker(tf_threads):
+    """Limit TensorFlow threading so workers do not oversubscribe the CPU"""
+    os.environ['OMP_NUM_THREADS'] = str(tf_threads)
+    os.environ['TF_NUM_INTRAOP_THREADS'] = str(tf_threads)
+    os.environ['TF_NUM_INTEROP_THREADS'] = '1'
+
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(tf_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+def default_workers(tf_threads=1):
+    return max(1, (os.cpu_count() or 1) // tf_threads)
+
+def run_in_pool(task, args_list, workers=None, tf_threads=1):
+    """Run task(*args) for every args tuple across a pool of processes
+
+    Workers are spawned rather than forked because TensorFlow state does not
+    survive a fork. Results are returned in completion order; failures are
+    logged and skipped so one unit cannot abort the whole run.
+    """
+    workers = workers or default_workers(tf_threads)
+    context = multiprocessing.get_context('spawn')
+    results = []
+
+    logger.info(f"Running {len(args_list)} tasks on {workers} workers "
+                f"({tf_threads} TensorFlow threads each)")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(tf_threads,)) as pool:
+        futures = {pool.submit(task, *args): args for args in args_list}
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                logger.error(f"Task {futures[future]} failed: {e}")
+
+    return results
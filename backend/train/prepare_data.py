@@ -1,36 +1,29 @@
+import os
+import sys
 import pandas as pd
 import numpy as np
 from sklearn.preprocessing import MinMaxScaler
 import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
+from windowing import make_windows
 
-def load_and_prepare_data(file_path, floor_no, unit_no):
-    """Load and prepare data for a specific unit"""
-    # Read the data
-    df = pd.read_csv(file_path)
-    
-    # Filter for specific floor and unit
-    unit_data = df[(df['floor'] == floor_no) & (df['unit'] == unit_no)].copy()
-    
-    # Convert date to datetime
-    unit_data['date'] = pd.to_datetime(unit_data['date'])
-    
-    # Sort by date
-    unit_data = unit_data.sort_values('date')
-    
-    # Check for missing dates
-    date_range = pd.date_range(start=unit_data['date'].min(), end=unit_data['date'].max())
-    missing_dates = date_range.difference(unit_data['date'])
-    
-    if len(missing_dates) > 0:
-        print(f"Warning: Found {len(missing_dates)} missing dates")
-        # Fill missing dates with forward fill then backward fill
-        unit_data = unit_data.set_index('date').reindex(date_range)
-        unit_data['water_usage'] = unit_data['water_usage'].fillna(method='ffill').fillna(method='bfill')
-        unit_data = unit_data.reset_index().rename(columns={'index': 'date'})
-    
-    return unit_data
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.panel import ConsumptionPanel, load_panel
+
+def load_and_prepare_data(source, floor_no, unit_no):
+    """Load and prepare data for a specific unit
+
+    source: a ConsumptionPanel, or a consumption source to load one from;
+    the unit's rows are a slice of the panel, already gap-filled.
+    """
+    panel = source if isinstance(source, ConsumptionPanel) else load_panel(source, floor_no, unit_no)
+    rows = panel.unit_rows(floor_no, unit_no)
+    missing = int((~panel.observed[rows, panel.column(floor_no, unit_no)]).sum())
+    if missing > 0:
+        print(f"Warning: Found {missing} missing dates")
+    
+    return panel.unit_frame(floor_no, unit_no)
 
 def analyze_data(data):
     """Analyze the water consumption patterns"""
@@ -79,16 +72,7 @@ def analyze_data(data):
 
 def prepare_sequences(data, sequence_length=7):
     """Prepare sequences for LSTM training"""
-    sequences = []
-    targets = []
-    
-    for i in range(len(data) - sequence_length):
-        sequence = data[i:(i + sequence_length)]
-        target = data[i + sequence_length]
-        sequences.append(sequence)
-        targets.append(target)
-    
-    return np.array(sequences), np.array(targets)
+    return make_windows(data, sequence_length)
 
 if __name__ == "__main__":
     # Example usage
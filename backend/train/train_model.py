@@ -1,3 +1,4 @@
+import sys
 import numpy as np
 import tensorflow as tf
 import pandas as pd
@@ -7,8 +8,15 @@ from tensorflow.keras.optimizers import Adam
 from sklearn.model_selection import train_test_split
 from prepare_data import load_and_prepare_data, prepare_sequences
 from sklearn.preprocessing import MinMaxScaler
+from parallel import atomic_write, run_in_pool
+from training_meta import write_training_meta
+from datetime import datetime
+import argparse
 import os
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from utils.panel import load_panel
+
 
 def create_lstm_model(sequence_length):
     """Create LSTM model architecture"""
@@ -29,14 +37,15 @@ def create_lstm_model(sequence_length):
     
     return model
 
-def train_model(floor_no, unit_no, epochs=100, sequence_length=7):
-    """Train LSTM model for a specific unit"""
+def train_model(floor_no, unit_no, epochs=100, sequence_length=7,
+                data_path='../water_consumption_data.csv', panel=None):
+    """Train LSTM model for a specific unit, from panel if given"""
     # Create models directory if it doesn't exist
     if not os.path.exists('models'):
         os.makedirs('models')
     
     # Load and prepare data
-    data = load_and_prepare_data('../water_consumption_data.csv', floor_no, unit_no)
+    data = load_and_prepare_data(panel if panel is not None else data_path, floor_no, unit_no)
     water_usage = data['water_usage'].values
     
     # Scale the data
@@ -46,7 +55,9 @@ def train_model(floor_no, unit_no, epochs=100, sequence_length=7):
     # Save scaler
     model_key = f"A{(floor_no-1):01d}{unit_no:02d}"
     scaler_filename = f'models/lstm_scaler_{model_key}.npy'
-    np.save(scaler_filename, scaler.data_range_)
+    # The range first, as the scaler file always held, then the minimum
+    atomic_write(scaler_filename,
+                 lambda path: np.save(path, np.r_[scaler.data_range_, scaler.data_min_]))
     
     # Prepare sequences
     sequences, targets = prepare_sequences(water_usage_scaled, sequence_length)
@@ -78,19 +89,53 @@ def train_model(floor_no, unit_no, epochs=100, sequence_length=7):
     
     # Save model
     model_filename = f'models/lstm_model_{model_key}.keras'
-    model.save(model_filename)
+    atomic_write(model_filename, model.save)
     
     # Evaluate model
     test_loss, test_mae = model.evaluate(X_test, y_test, verbose=0)
     print(f"\nTest MAE: {test_mae:.4f}")
+    write_training_meta(model_key, data['date'].iloc[-1].date(), mode='full', test_mae=test_mae)
     
     return model, scaler, history
 
+_worker_panels = {}
+
+def train_model_task(floor_no, unit_no, data_path='../water_consumption_data.csv'):
+    """Process pool entry point: train one unit and summarise the run"""
+    if data_path not in _worker_panels:
+        _worker_panels[data_path] = load_panel(data_path)
+    
+    print(f"\nTraining model for Floor {floor_no} Unit {unit_no}")
+    model, scaler, history = train_model(floor_no, unit_no, data_path=data_path,
+                                         panel=_worker_panels[data_path])
+    return {
+        'floor': floor_no,
+        'unit': unit_no,
+        'epochs': len(history.history['loss']),
+        'val_mae': min(history.history['val_mae'])
+    }
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Train the LSTM model for every unit')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='number of units trained in parallel processes')
+    parser.add_argument('--tf-threads', type=int, default=1,
+                        help='TensorFlow intra-op threads per worker')
+    parser.add_argument('--data', default='../water_consumption_data.csv',
+                        help='consumption CSV, or a readings table: sqlite:///<file> or mysql')
+    args = parser.parse_args()
+    
     # Train models for all units
-    df = pd.read_csv('../water_consumption_data.csv')
-    units = df[['floor', 'unit']].drop_duplicates().values
+    _worker_panels[args.data] = load_panel(args.data)
+    units = [(floor_no, unit_no, args.data) for floor_no, unit_no in _worker_panels[args.data].units]
+    
+    if args.workers > 1:
+        results = run_in_pool(train_model_task, units, args.workers, args.tf_threads)
+    else:
+        results = [train_model_task(*unit) for unit in units]
     
-    for floor_no, unit_no in units:
-        print(f"\nTraining model for Floor {floor_no} Unit {unit_no}")
-        model, scaler, history = train_model(floor_no, unit_no) 
\ No newline at end of file
+    # Save results
+    os.makedirs('logs', exist_ok=True)
+    results_df = pd.DataFrame(results).sort_values(['floor', 'unit'])
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    results_df.to_csv(f'logs/training_results_{timestamp}.csv', index=False)
\ No newline at end of file
@@ -0,0 +1,35 @@
+import os
+import json
+from datetime import datetime
+
+from parallel import atomic_write
+
+def training_meta_path(model_key, models_dir='models'):
+    return os.path.join(models_dir, f'training_{model_key}.json')
+
+def write_training_meta(model_key, trained_until, models_dir='models', **fields):
+    """Record what a unit's model was trained on next to its other artifacts
+
+    trained_until is the date of the last reading the model was fitted to;
+    incremental_training.py fine-tunes only on windows after it.
+    """
+    meta = {
+        'trained_until': str(trained_until),
+        'updated_at': datetime.now().isoformat(timespec='seconds'),
+        **fields
+    }
+
+    def write(path):
+        with open(path, 'w') as f:
+            json.dump(meta, f, indent=2, default=float)
+
+    atomic_write(training_meta_path(model_key, models_dir), write)
+    return meta
+
+def read_training_meta(model_key, models_dir='models'):
+    """The unit's training record, or None for models trained before it was kept"""
+    try:
+        with open(training_meta_path(model_key, models_dir), 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
@@ -0,0 +1,37 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+def make_windows(data, sequence_length=7, horizon=1, target_index=None):
+    """Build sliding training windows and targets as strided views
+
+    data: (n,) or (n, features) array ordered by date
+    horizon: number of steps after each window to use as targets
+    target_index: feature column to predict, or None for all columns
+
+    Returns (windows, targets) with N = n - sequence_length - horizon + 1:
+    windows is (N, sequence_length[, features]); targets is the row(s)
+    following each window, (N[, features]) for horizon 1 and
+    (N, horizon[, features]) otherwise. Both are read-only views on data,
+    so no window is copied until a caller indexes into them.
+    """
+    data = np.asarray(data)
+    targets = data if target_index is None else data[:, target_index]
+    count = len(data) - sequence_length - horizon + 1
+
+    if count <= 0:
+        target_shape = (horizon,) if horizon > 1 else ()
+        return (np.empty((0, sequence_length) + data.shape[1:], dtype=data.dtype),
+                np.empty((0,) + target_shape + targets.shape[1:], dtype=data.dtype))
+
+    windows = sliding_window_view(data, sequence_length, axis=0)[:count]
+    if data.ndim > 1:
+        windows = np.moveaxis(windows, -1, 1)
+
+    if horizon == 1:
+        targets = targets[sequence_length:sequence_length + count]
+    else:
+        targets = sliding_window_view(targets[sequence_length:], horizon, axis=0)[:count]
+        if targets.ndim > 2:
+            targets = np.moveaxis(targets, -1, 1)
+
+    return windows, targets
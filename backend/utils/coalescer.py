@@ -0,0 +1,125 @@
+import time
+import queue
+import logging
+import threading
+from collections import deque
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the batch size histogram buckets
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class _Pending:
+    __slots__ = ('request', 'enqueued', 'done')
+
+    def __init__(self, request):
+        self.request = request
+        self.enqueued = time.monotonic()
+        self.done = threading.Event()
+
+
+class ForecastCoalescer:
+    """Merges concurrent ForecastRequests into shared batches
+
+    Callers block in submit() while a worker thread collects requests for
+    up to max_wait seconds after the first one arrives, or until max_batch
+    are queued, and hands them to run_batch in one call. With
+    forecast_batch that is one stacked forward pass per model group and
+    step instead of one tiny pass per HTTP request. While a batch runs the
+    next one fills up, so the wait only costs latency when the server is
+    idle.
+    """
+
+    def __init__(self, run_batch, max_wait=0.005, max_batch=64, name='coalescer'):
+        self.run_batch = run_batch
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self.name = name
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+        self.max_batch_seen = 0
+        self._histogram = [0] * (len(BATCH_BUCKETS) + 1)
+        self._waits = deque(maxlen=1000)
+
+    def _ensure_worker(self):
+        # Started on first use so forking servers start it in each worker
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._worker.start()
+
+    def submit(self, requests):
+        """Queue requests and wait until a batch has filled them in"""
+        self._ensure_worker()
+        pending = [_Pending(req) for req in requests]
+        for item in pending:
+            self._queue.put(item)
+        for item in pending:
+            item.done.wait()
+        return requests
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = batch[0].enqueued + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+        return batch
+
+    def _record(self, batch, started):
+        size = len(batch)
+        bucket = next((i for i, bound in enumerate(BATCH_BUCKETS) if size <= bound), len(BATCH_BUCKETS))
+        with self._stats_lock:
+            self.batches += 1
+            self.requests += size
+            self.max_batch_seen = max(self.max_batch_seen, size)
+            self._histogram[bucket] += 1
+            self._waits.extend(started - item.enqueued for item in batch)
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+            self._record(batch, started)
+            try:
+                self.run_batch([item.request for item in batch])
+            except Exception as e:
+                logger.error(f"Coalesced batch of {len(batch)} failed: {e}", exc_info=True)
+                for item in batch:
+                    if item.request.error is None and item.request.predictions is None:
+                        item.request.error = str(e)
+            finally:
+                for item in batch:
+                    item.done.set()
+
+    def stats(self):
+        with self._stats_lock:
+            waits = np.array(self._waits) * 1000
+            labels = [f'<={bound}' for bound in BATCH_BUCKETS] + [f'>{BATCH_BUCKETS[-1]}']
+            return {
+                'max_wait_ms': self.max_wait * 1000,
+                'max_batch': self.max_batch,
+                'batches': self.batches,
+                'requests': self.requests,
+                'mean_batch_size': round(self.requests / self.batches, 2) if self.batches else None,
+                'max_batch_size': self.max_batch_seen,
+                'batch_size_histogram': dict(zip(labels, self._histogram)),
+                'queue_wait_ms': {
+                    'mean': round(float(waits.mean()), 3) if len(waits) else None,
+                    'p50': round(float(np.percentile(waits, 50)), 3) if len(waits) else None,
+                    'p95': round(float(np.percentile(waits, 95)), 3) if len(waits) else None
+                }
+            }
@@ -0,0 +1,186 @@
+import os
+import json
+import shutil
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 2
+META_FILE = 'meta.json'
+# On-disk dtype of each column; rows are grouped by unit and date-sorted.
+# water_usage keeps the CSV's float64, so forecasts and their fingerprints
+# don't depend on whether a columnar copy exists (format 1 stored float32)
+COLUMN_DTYPES = {
+    'date': 'datetime64[D]',
+    'water_usage': 'float64',
+    'num_residents': 'int32',
+    'unit_size': 'int32'
+}
+
+
+def columnar_path(csv_path):
+    """Where the columnar copy of a CSV lives: next to it, .columnar instead of .csv"""
+    return os.path.splitext(csv_path)[0] + '.columnar'
+
+
+def _source_stamp(csv_path):
+    stat = os.stat(csv_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def convert_csv(csv_path, out_path=None):
+    """Write the consumption CSV as per-unit contiguous .npy columns
+
+    Layout of the output directory:
+      units.npy     int32 (units, 2) floor and unit, in first-seen order
+      offsets.npy   int64 (units + 1,) row range of each unit in the columns
+      date.npy      datetime64[D] date index, sorted within each unit
+      <feature>.npy one array per feature, dtypes from COLUMN_DTYPES
+      meta.json     format version, row count and the source CSV's size
+                    and mtime, so a stale copy is detected
+    The directory is built under a temporary name and swapped in, so a
+    reader never maps a half-written set of columns.
+    """
+    import pandas as pd
+
+    out_path = out_path or columnar_path(csv_path)
+    df = pd.read_csv(csv_path)
+    dates = pd.to_datetime(df['date']).values.astype('datetime64[D]')
+    floors = df['floor'].values.astype(np.int32)
+    units = df['unit'].values.astype(np.int32)
+
+    # Units keep the order they first appear in, like ConsumptionStore
+    keys = floors.astype(np.int64) * 100000 + units
+    _, first_rows, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    unit_rank = np.argsort(np.argsort(first_rows))[inverse.ravel()]
+    first_rows = np.sort(first_rows)
+    order = np.lexsort((dates, unit_rank))
+    counts = np.bincount(unit_rank, minlength=len(first_rows))
+
+    columns = {'date': dates[order]}
+    for name in ('water_usage', 'num_residents', 'unit_size'):
+        columns[name] = df[name].values[order].astype(COLUMN_DTYPES[name])
+
+    tmp_path = f'{out_path}.{os.getpid()}.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, 'units.npy'), np.column_stack((floors[first_rows], units[first_rows])))
+    np.save(os.path.join(tmp_path, 'offsets.npy'), np.concatenate(([0], np.cumsum(counts))).astype(np.int64))
+    for name, values in columns.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), values)
+    with open(os.path.join(tmp_path, META_FILE), 'w') as f:
+        json.dump({'format': FORMAT_VERSION, 'rows': int(len(df)),
+                   'source': _source_stamp(csv_path)}, f)
+
+    # Readers holding maps of the old files keep them until they close
+    old_path = f'{out_path}.{os.getpid()}.old'
+    if os.path.exists(out_path):
+        os.rename(out_path, old_path)
+    os.rename(tmp_path, out_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    logger.info(f"Converted {len(df)} readings for {len(first_rows)} units to {out_path}")
+    return out_path
+
+
+class ColumnarReadings:
+    """Read-only, memory-mapped view of a convert_csv directory
+
+    Opening maps the files without reading them; a unit's slice is paged
+    in when it is first touched, and processes mapping the same files
+    share those pages through the OS page cache.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE), 'r') as f:
+            self.meta = json.load(f)
+        if self.meta.get('format') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported columnar format in {path}: {self.meta.get('format')}")
+        self.units = np.load(os.path.join(path, 'units.npy'))
+        self.offsets = np.load(os.path.join(path, 'offsets.npy'))
+        self.columns = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r')
+                        for name in COLUMN_DTYPES}
+        self._index = {(int(floor), int(unit)): i for i, (floor, unit) in enumerate(self.units)}
+
+    @classmethod
+    def for_csv(cls, csv_path):
+        """The columnar copy of csv_path if it exists and matches the CSV, else None"""
+        path = columnar_path(csv_path)
+        try:
+            readings = cls(path)
+        except FileNotFoundError:
+            return None
+        except ValueError as e:
+            logger.warning(f"{e}; reading the CSV instead until it is converted again")
+            return None
+        if os.path.exists(csv_path) and readings.meta['source'] != _source_stamp(csv_path):
+            logger.warning(f"{path} is older than {csv_path}; reading the CSV instead")
+            return None
+        return readings
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def unit_keys(self):
+        return list(self._index)
+
+    def unit_rows(self, floor_no, unit_no):
+        """(start, end) row range of a unit, or None if it has no readings"""
+        i = self._index.get((int(floor_no), int(unit_no)))
+        if i is None:
+            return None
+        return int(self.offsets[i]), int(self.offsets[i + 1])
+
+    def unit_column(self, floor_no, unit_no, name):
+        """A unit's column as a zero-copy view of the mapped file"""
+        rows = self.unit_rows(floor_no, unit_no)
+        if rows is None:
+            return None
+        return self.columns[name][rows[0]:rows[1]]
+
+    def frame(self, floor_no=None, unit_no=None):
+        """Readings as a DataFrame with the CSV's columns, optionally for one unit"""
+        import pandas as pd
+
+        if floor_no is not None:
+            rows = self.unit_rows(floor_no, unit_no) or (0, 0)
+            units = np.array([[floor_no, unit_no]], dtype=np.int32)
+            counts = [rows[1] - rows[0]]
+        else:
+            rows = (0, len(self))
+            units = self.units
+            counts = np.diff(self.offsets)
+        return pd.DataFrame({
+            'date': self.columns['date'][rows[0]:rows[1]].astype('datetime64[ns]'),
+            'floor': np.repeat(units[:, 0], counts),
+            'unit': np.repeat(units[:, 1], counts),
+            **{name: np.asarray(self.columns[name][rows[0]:rows[1]])
+               for name in ('water_usage', 'num_residents', 'unit_size')}
+        })
+
+
+def read_consumption(source, floor_no=None, unit_no=None):
+    """The consumption readings as a DataFrame, optionally for one unit
+
+    source is the CSV path, read from its columnar copy when fresh, or a
+    ReadingsRepository URL ('sqlite:///<file>', 'mysql'), where one unit
+    is an indexed range query. Drop-in for pd.read_csv in the training
+    and analysis scripts, except that 'date' is already parsed.
+    """
+    if source == 'mysql' or source.startswith('sqlite:///'):
+        from utils.readings_repository import ReadingsRepository
+
+        return ReadingsRepository.from_url(source).frame(floor_no, unit_no)
+
+    readings = ColumnarReadings.for_csv(source)
+    if readings is not None:
+        return readings.frame(floor_no, unit_no)
+
+    import pandas as pd
+
+    df = pd.read_csv(source, parse_dates=['date'])
+    if floor_no is not None:
+        df = df[(df['floor'] == floor_no) & (df['unit'] == unit_no)]
+    return df
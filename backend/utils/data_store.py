@@ -0,0 +1,289 @@
+import os
+import logging
+import threading
+
+import numpy as np
+
+from utils.columnar import ColumnarReadings
+
+logger = logging.getLogger(__name__)
+
+FEATURES = ['water_usage', 'num_residents', 'unit_size']
+
+# Guards the first load of deferred series
+_load_lock = threading.Lock()
+
+
+class UnitSeries:
+    """Date-sorted readings for one (floor, unit)
+
+    Rows live at the front of buffers with spare capacity, so appending
+    newer readings writes into the spare rows instead of copying the
+    unit's history. Readers see (dates, values, length) swapped in as one
+    tuple, and rows below a published length are never written again.
+    """
+
+    def __init__(self, dates, values):
+        self._state = (dates, values, len(dates))
+        self._load = None
+
+    @classmethod
+    def deferred(cls, load, length):
+        """A series whose (dates, values) arrays are read by load() on first use"""
+        series = cls.__new__(cls)
+        series._state = None
+        series._load = load
+        series._length = length
+        return series
+
+    def _current(self):
+        state = self._state
+        if state is None:
+            with _load_lock:
+                if self._state is None:
+                    dates, values = self._load()
+                    self._state = (dates, values, len(dates))
+                state = self._state
+        return state
+
+    @property
+    def dates(self):
+        dates, _, n = self._current()
+        return dates[:n]      # datetime64[D], shape (n,)
+
+    @property
+    def values(self):
+        _, values, n = self._current()
+        return values[:n]     # float64, shape (n, len(FEATURES))
+
+    def __len__(self):
+        state = self._state
+        return self._length if state is None else state[2]
+
+    def tail(self, n):
+        _, values, length = self._current()
+        return values[max(length - n, 0):length]
+
+    def extend(self, dates, values):
+        """Add readings; returns how many were new
+
+        Readings for dates the unit already has are skipped. Later dates
+        are appended in place, doubling capacity when full; earlier ones
+        are merged into a fresh, sorted copy.
+        """
+        current_dates, current_values, n = self._current()
+        dates, first = np.unique(dates, return_index=True)
+        values = values[first]
+        if n and dates[0] <= current_dates[n - 1]:
+            keep = ~np.isin(dates, current_dates[:n])
+            dates, values = dates[keep], values[keep]
+        if len(dates) == 0:
+            return 0
+
+        if n == 0 or dates[0] > current_dates[n - 1]:
+            if n + len(dates) > len(current_dates):
+                capacity = max(2 * len(current_dates), n + len(dates))
+                grown_dates = np.empty(capacity, dtype=current_dates.dtype)
+                grown_values = np.empty((capacity, current_values.shape[1]), dtype=current_values.dtype)
+                grown_dates[:n], grown_values[:n] = current_dates[:n], current_values[:n]
+                current_dates, current_values = grown_dates, grown_values
+            current_dates[n:n + len(dates)] = dates
+            current_values[n:n + len(dates)] = values
+            self._state = (current_dates, current_values, n + len(dates))
+        else:
+            merged_dates = np.concatenate((current_dates[:n], dates))
+            merged_values = np.concatenate((current_values[:n], values))
+            order = np.argsort(merged_dates, kind='stable')
+            self._state = (merged_dates[order], merged_values[order], len(order))
+        return len(dates)
+
+
+class ConsumptionStore:
+    """In-memory index of the consumption CSV, keyed by (floor, unit)
+
+    The CSV is parsed once and re-read only when its mtime changes, or
+    mapped instead when utils.columnar has a fresh copy of it. Each
+    unit's rows are kept as contiguous, date-sorted NumPy arrays so the
+    most recent window is a slice rather than a scan of the whole frame.
+
+    Readings posted after the CSV was written go to an optional
+    SegmentStore. New segments are applied to the affected units only,
+    whether this process or another one wrote them, and each unit carries
+    a version that changes when its readings do.
+    """
+
+    def __init__(self, csv_path=None, segments=None):
+        self.csv_path = csv_path
+        self.segments = segments
+        self.version = 0
+        self._mtime = None
+        self._segments_mtime = None
+        self._segment_seq = 0
+        self._series = {}
+        self._order = []
+        self._unit_versions = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_frame(cls, df):
+        """Build a store from an already loaded DataFrame"""
+        store = cls()
+        store._index(df)
+        return store
+
+    def _index(self, df):
+        import pandas as pd
+
+        dates = pd.to_datetime(df['date']).values.astype('datetime64[D]')
+        floors = df['floor'].values
+        units = df['unit'].values
+        values = df[FEATURES].values.astype(np.float64)
+
+        # Group rows by unit, date-sorted within each unit
+        order = np.lexsort((dates, units, floors))
+        dates, floors, units, values = dates[order], floors[order], units[order], values[order]
+        boundaries = np.flatnonzero((np.diff(floors) != 0) | (np.diff(units) != 0)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(order)]))
+
+        series = {}
+        first_seen = {}
+        for start, end in zip(starts, ends):
+            key = (int(floors[start]), int(units[start]))
+            series[key] = UnitSeries(dates[start:end], values[start:end])
+            first_seen[key] = order[start:end].min()
+
+        # Keep units in the order they first appear in the file, floor by floor
+        floor_first_seen = {}
+        for (floor, _), position in first_seen.items():
+            floor_first_seen[floor] = min(position, floor_first_seen.get(floor, position))
+        self._order = sorted(series, key=lambda k: (floor_first_seen[k[0]], first_seen[k]))
+        self._series = series
+        self._unit_versions = {}
+        self._segment_seq = 0
+        self.version += 1
+
+    def _index_columnar(self, readings):
+        """Index a ColumnarReadings copy; each unit is read on first use"""
+        def loader(floor_no, unit_no):
+            def load():
+                dates = readings.unit_column(floor_no, unit_no, 'date')
+                values = np.column_stack([readings.unit_column(floor_no, unit_no, feature)
+                                          for feature in FEATURES]).astype(np.float64)
+                return dates, values
+            return load
+
+        series = {}
+        for floor_no, unit_no in readings.unit_keys():
+            start, end = readings.unit_rows(floor_no, unit_no)
+            series[(floor_no, unit_no)] = UnitSeries.deferred(loader(floor_no, unit_no), end - start)
+
+        # Units are stored in first-seen order; group them floor by floor as _index does
+        floor_rank = {}
+        for floor_no, _ in series:
+            floor_rank.setdefault(floor_no, len(floor_rank))
+        self._order = [key for _, key in sorted(
+            ((floor_rank[key[0]], position), key) for position, key in enumerate(series))]
+        self._series = series
+        self._unit_versions = {}
+        self._segment_seq = 0
+        self.version += 1
+
+    def _apply(self, batch):
+        """Merge one batch of readings into the index; returns the units it changed"""
+        floors, units = batch['floor'], batch['unit']
+        order = np.lexsort((units, floors))
+        floors, units = floors[order], units[order]
+        dates, values = batch['date'][order], batch['values'][order]
+        boundaries = np.flatnonzero((np.diff(floors) != 0) | (np.diff(units) != 0)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(order)]))
+
+        changed = []
+        for start, end in zip(starts, ends):
+            key = (int(floors[start]), int(units[start]))
+            series = self._series.get(key)
+            if series is None:
+                series = UnitSeries(dates[:0].copy(), values[:0].copy())
+                self._series[key] = series
+                self._order.append(key)
+            if series.extend(dates[start:end], values[start:end]):
+                self._unit_versions[key] = self._unit_versions.get(key, 0) + 1
+                changed.append(key)
+        return changed
+
+    def _catch_up(self):
+        """Apply segments written since the last call; caller holds the lock"""
+        changed = set()
+        for seq, batch in self.segments.read_after(self._segment_seq):
+            changed.update(self._apply(batch))
+            self._segment_seq = seq
+        return changed
+
+    def refresh(self):
+        """Reload the CSV if it changed on disk, then apply any new segments"""
+        if self.csv_path is None:
+            return
+        mtime = os.stat(self.csv_path).st_mtime_ns
+        segments_mtime = self.segments.mtime() if self.segments is not None else None
+        if mtime == self._mtime and segments_mtime == self._segments_mtime:
+            return
+        with self._lock:
+            reindexed = mtime != self._mtime
+            if reindexed:
+                readings = ColumnarReadings.for_csv(self.csv_path)
+                if readings is not None:
+                    logger.info(f"Mapping consumption data from {readings.path}")
+                    self._index_columnar(readings)
+                else:
+                    import pandas as pd
+
+                    logger.info(f"Loading consumption data from {self.csv_path}")
+                    self._index(pd.read_csv(self.csv_path))
+                self._mtime = mtime
+            if self.segments is not None and (reindexed or segments_mtime != self._segments_mtime):
+                # The mtime was read first, so a segment landing mid-scan is seen next time
+                self._catch_up()
+                self._segments_mtime = segments_mtime
+
+    def append(self, batch):
+        """Persist a validated batch as a segment and index it
+
+        batch: dict with 'date' (datetime64[D]), 'floor' and 'unit' (int)
+        and 'values' (float64, (n, len(FEATURES))) arrays. Returns the
+        (floor, unit) pairs whose readings changed.
+        """
+        self.refresh()
+        with self._lock:
+            if self.segments is None:
+                return self._apply(batch)
+            self.segments.append(batch)
+            return sorted(self._catch_up())
+
+    def series(self, floor_no, unit_no):
+        """Return the UnitSeries for a unit, or None if it has no readings"""
+        self.refresh()
+        return self._series.get((int(floor_no), int(unit_no)))
+
+    def unit_version(self, floor_no, unit_no):
+        """Changes when the unit's readings do, or when the CSV is reloaded"""
+        return (self.version, self._unit_versions.get((int(floor_no), int(unit_no)), 0))
+
+    def recent(self, floor_no, unit_no, n):
+        """Return the last n readings of a unit as an (n, features) array"""
+        series = self.series(floor_no, unit_no)
+        if series is None or len(series) < n:
+            raise ValueError(f"Insufficient data for Floor {floor_no} Unit {unit_no}")
+        return series.tail(n)
+
+    def last_date(self, floor_no, unit_no):
+        """Date of a unit's most recent reading"""
+        series = self.series(floor_no, unit_no)
+        if series is None or len(series) == 0:
+            raise ValueError(f"No readings for Floor {floor_no} Unit {unit_no}")
+        return series.dates[-1]
+
+    def units(self):
+        """All (floor, unit) pairs present in the data"""
+        self.refresh()
+        return list(self._order)
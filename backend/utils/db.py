@@ -0,0 +1,291 @@
+import os
+import time
+import logging
+import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Tables the SQLite stand-in creates on connect; MySQL already has them
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT,
+    flat_no TEXT,
+    phone_number TEXT,
+    email TEXT,
+    password_hash TEXT
+);
+"""
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool's timeout"""
+
+
+def db_config_from_env():
+    """Connection settings from DB_* environment variables
+
+    DB_ENGINE=sqlite uses DB_NAME as the database file, for running the
+    user endpoints without a MySQL server.
+    """
+    engine = os.environ.get('DB_ENGINE', 'mysql')
+    if engine == 'sqlite':
+        return {'engine': 'sqlite', 'database': os.environ.get('DB_NAME', 'smart_water_management.db')}
+    if engine != 'mysql':
+        raise ValueError(f"Unknown DB_ENGINE: {engine}")
+    return {
+        'engine': 'mysql',
+        'host': os.environ.get('DB_HOST', '127.0.0.1'),
+        'port': int(os.environ.get('DB_PORT', 3306)),
+        'user': os.environ.get('DB_USER', 'root'),
+        'password': os.environ.get('DB_PASSWORD', ''),
+        'database': os.environ.get('DB_NAME', 'smart_water_management')
+    }
+
+
+class SQLiteCursor:
+    """sqlite3 cursor taking mysql.connector's %s placeholders"""
+
+    def __init__(self, cursor, dictionary=False):
+        self._cursor = cursor
+        self._dictionary = dictionary
+
+    @staticmethod
+    def _sql(query):
+        return query.replace('%s', '?')
+
+    def execute(self, query, params=()):
+        self._cursor.execute(self._sql(query), params)
+
+    def executemany(self, query, seq_params):
+        self._cursor.executemany(self._sql(query), seq_params)
+
+    def _row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self._cursor.description, row)}
+
+    def fetchone(self):
+        return self._row(self._cursor.fetchone())
+
+    def fetchmany(self, size=1):
+        return [self._row(row) for row in self._cursor.fetchmany(size)]
+
+    def fetchall(self):
+        return [self._row(row) for row in self._cursor.fetchall()]
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """Local stand-in with the parts of mysql.connector's connection the app uses"""
+
+    def __init__(self, database):
+        self._conn = sqlite3.connect(database, check_same_thread=False)
+        self._conn.executescript(SQLITE_SCHEMA)
+
+    def cursor(self, dictionary=False):
+        return SQLiteCursor(self._conn.cursor(), dictionary=dictionary)
+
+    def ping(self, reconnect=False):
+        self._conn.execute('SELECT 1')
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        self._conn.close()
+
+
+def connect(config):
+    """Open one connection for a db_config_from_env() style config"""
+    config = dict(config)
+    engine = config.pop('engine', 'mysql')
+    if engine == 'sqlite':
+        return SQLiteConnection(config['database'])
+
+    import mysql.connector
+
+    return mysql.connector.connect(**config)
+
+
+class ConnectionPool:
+    """Bounded pool of reusable database connections
+
+    Connections are opened lazily up to size and handed out by
+    connection(). One that has been idle for ping_after seconds is pinged
+    before reuse, one older than recycle seconds is replaced, and one that
+    raised while checked out is closed rather than returned, so a dropped
+    server connection costs one reconnect instead of a failed request.
+    Every connection is rolled back on release, so the next borrower never
+    inherits uncommitted writes or a stale read snapshot.
+    Callers wait up to timeout seconds for a free connection.
+    """
+
+    def __init__(self, connect, size=10, timeout=5.0, recycle=3600.0, ping_after=10.0, name='db'):
+        self.connect = connect
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.ping_after = ping_after
+        self.name = name
+        self._idle = []  # (connection, opened at, released at), most recent last
+        self._open = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+        self._created = time.monotonic()
+        self._busy_seconds = 0.0
+        self._waits = deque(maxlen=1000)
+        self.acquisitions = 0
+        self.timeouts = 0
+        self.opened = 0
+        self.recycled = 0
+        self.failed_pings = 0
+        self.discarded = 0
+        self.peak_in_use = 0
+
+    def _checkout(self):
+        """Reserve an idle connection or a slot to open one"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        with self._cond:
+            while not self._idle and self._open >= self.size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeout(f"No {self.name} connection free after {self.timeout}s "
+                                      f"({self.size} in use)")
+                self._cond.wait(remaining)
+            if self._idle:
+                entry = self._idle.pop()
+            else:
+                entry = None
+                self._open += 1
+            self._in_use += 1
+            self.acquisitions += 1
+            self.peak_in_use = max(self.peak_in_use, self._in_use)
+            self._waits.append(time.monotonic() - started)
+        return entry
+
+    def _usable(self, entry):
+        conn, opened_at, released_at = entry
+        now = time.monotonic()
+        if now - opened_at > self.recycle:
+            self.recycled += 1
+            return False
+        if now - released_at > self.ping_after:
+            try:
+                conn.ping(reconnect=False)
+            except Exception as e:
+                logger.warning(f"Discarding {self.name} connection that failed its health check: {e}")
+                self.failed_pings += 1
+                return False
+        return True
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _release_slot(self):
+        with self._cond:
+            self._open -= 1
+            self._in_use -= 1
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of a with block"""
+        entry = self._checkout()
+        try:
+            if entry is not None and not self._usable(entry):
+                self._close(entry[0])
+                entry = None
+            if entry is None:
+                entry = (self.connect(), time.monotonic(), None)
+                self.opened += 1
+        except Exception:
+            self._release_slot()
+            raise
+
+        conn, opened_at, _ = entry
+        checked_out = time.monotonic()
+        try:
+            yield conn
+        except Exception:
+            # The connection may be mid-transaction or dead; do not reuse it
+            self._close(conn)
+            with self._cond:
+                self.discarded += 1
+                self._busy_seconds += time.monotonic() - checked_out
+            self._release_slot()
+            raise
+        else:
+            try:
+                # End whatever transaction the caller left open, committed or not
+                conn.rollback()
+            except Exception as e:
+                logger.warning(f"Discarding {self.name} connection that failed to roll back: {e}")
+                self._close(conn)
+                with self._cond:
+                    self.discarded += 1
+                    self._busy_seconds += time.monotonic() - checked_out
+                self._release_slot()
+                return
+            with self._cond:
+                now = time.monotonic()
+                self._busy_seconds += now - checked_out
+                self._idle.append((conn, opened_at, now))
+                self._in_use -= 1
+                self._cond.notify()
+
+    def close(self):
+        """Close the idle connections, e.g. at shutdown"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+        for conn, _, _ in idle:
+            self._close(conn)
+
+    def stats(self):
+        with self._cond:
+            waits = np.array(self._waits) * 1000
+            elapsed = time.monotonic() - self._created
+            return {
+                'size': self.size,
+                'open': self._open,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'peak_in_use': self.peak_in_use,
+                # Share of the pool's capacity that was checked out since it was created
+                'utilisation': round(self._busy_seconds / (self.size * elapsed), 4) if elapsed > 0 else None,
+                'acquisitions': self.acquisitions,
+                'timeouts': self.timeouts,
+                'opened': self.opened,
+                'recycled': self.recycled,
+                'failed_health_checks': self.failed_pings,
+                'discarded': self.discarded,
+                'wait_ms': {
+                    'mean': round(float(waits.mean()), 3) if len(waits) else None,
+                    'p95': round(float(np.percentile(waits, 95)), 3) if len(waits) else None,
+                    'max': round(float(waits.max()), 3) if len(waits) else None
+                }
+            }
@@ -0,0 +1,107 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Rough per-entry cost of the key, tuple and bookkeeping beyond the arrays
+ENTRY_OVERHEAD = 256
+
+
+class ForecastCache:
+    """LRU cache of forecast values bounded by a memory budget
+
+    Entries live in a slot, e.g. (model type, floor, unit, days), and are
+    stored with a version: the model artifact fingerprint and the data
+    version they were computed from. A lookup with a different version
+    drops the stale entry, so retraining a model or changing the CSV
+    invalidates exactly the forecasts that depended on it. Only values are
+    cached; dates are attached per request.
+    """
+
+    def __init__(self, max_bytes=16 * 1024 * 1024, ttl=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _drop(self, slot):
+        _, _, _, size = self._entries.pop(slot)
+        self._bytes -= size
+
+    def get(self, slot, version):
+        """Cached value for slot if it was stored for this version and is fresh"""
+        with self._lock:
+            entry = self._entries.get(slot)
+            if entry is not None:
+                entry_version, value, stored_at, _ = entry
+                if entry_version != version:
+                    self._drop(slot)
+                    self.invalidations += 1
+                elif self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                    self._drop(slot)
+                    self.expirations += 1
+                else:
+                    self._entries.move_to_end(slot)
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            return None
+
+    def put(self, slot, version, arrays):
+        """Store a tuple of arrays, copied and made read-only"""
+        value = []
+        for array in arrays:
+            array = np.array(array, copy=True)
+            array.setflags(write=False)
+            value.append(array)
+        value = tuple(value)
+        size = sum(array.nbytes for array in value) + ENTRY_OVERHEAD
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            if slot in self._entries:
+                self._drop(slot)
+            self._entries[slot] = (version, value, time.monotonic(), size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                evicted = next(iter(self._entries))
+                self._drop(evicted)
+                self.evictions += 1
+
+    def invalidate(self, predicate=None):
+        """Drop every entry, or those whose slot matches predicate(slot)"""
+        with self._lock:
+            slots = [slot for slot in self._entries if predicate is None or predicate(slot)]
+            for slot in slots:
+                self._drop(slot)
+            self.invalidations += len(slots)
+        if slots:
+            logger.info(f"Invalidated {len(slots)} cached forecasts")
+        return len(slots)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,149 @@
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.data_prep import prepare_prediction_data
+
+logger = logging.getLogger(__name__)
+
+
+def next_day_values(output):
+    """First output value per sample, whatever the model's output rank"""
+    output = np.asarray(output)
+    return output.reshape(len(output), -1)[:, 0]
+
+
+def rollout(predict_fn, sequences, days):
+    """Autoregressive forecast for a stack of input windows
+
+    predict_fn: maps a (N, timesteps, features) array to model outputs
+    sequences: (N, timesteps, features) input windows, one per forecast
+    Returns an (N, days) array. Each step is a single call for all N windows.
+    """
+    current = np.array(sequences, copy=True)
+    predictions = np.empty((len(current), days))
+
+    for step in range(days):
+        next_day = next_day_values(predict_fn(current))
+        predictions[:, step] = next_day
+
+        # Update sequences for next prediction
+        current[:, :-1] = current[:, 1:]  # Shift data
+        current[:, -1, 0] = next_day  # Add new prediction
+
+    return predictions
+
+
+def keras_predict_fn(model):
+    return lambda x: model.predict(x, verbose=0)
+
+
+class DirectForecaster:
+    """Serves a direct multi-horizon model, the whole forecast in one pass
+
+    engine: CompiledModel or NumpyModel mapping (N, timesteps, 1) windows of
+    (usage - offset) / scale to (N, horizon) forecasts on the same scale.
+    scale and offset are scalars, or one value per window once models are
+    stacked.
+    """
+
+    def __init__(self, engine, scale, horizon, batch_key, offset=0.0):
+        self.engine = engine
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.offset = np.asarray(offset, dtype=np.float64)
+        self.horizon = horizon
+        self.batch_key = batch_key
+
+    @classmethod
+    def stack(cls, forecasters):
+        first = forecasters[0]
+        engine = first.engine.stack([f.engine for f in forecasters])
+        scale = np.array([float(f.scale) for f in forecasters])
+        offset = np.array([float(f.offset) for f in forecasters])
+        return cls(engine, scale, first.horizon, first.batch_key, offset)
+
+    def rollout(self, sequences, days):
+        """Forecast `days` <= horizon steps for each window, shape (N, days)"""
+        if days > self.horizon:
+            raise ValueError(f"Direct model only forecasts {self.horizon} days")
+        sequences = np.asarray(sequences, dtype=np.float32)
+        scale = np.broadcast_to(self.scale, (len(sequences),))[:, None]
+        offset = np.broadcast_to(self.offset, (len(sequences),))[:, None]
+        windows = (sequences[:, :, :1] - offset[..., None]) / scale[..., None]
+        return self.engine.outputs(windows)[:, :days].astype(np.float64) * scale + offset
+
+
+def _stackable(engine):
+    """Whether engines like this one can be combined with stack()"""
+    if isinstance(engine, DirectForecaster):
+        engine = engine.engine
+    return hasattr(engine, 'stack')
+
+
+class ForecastRequest:
+    """One (floor, unit, days) item of a batch forecast"""
+
+    def __init__(self, floor, unit, days):
+        self.floor = floor
+        self.unit = unit
+        self.days = days
+        self.input_data = None
+        self.predictions = None
+        self.error = None
+
+
+def forecast_batch(requests, registry, store, sequence_length=7):
+    """Forecast several units, one stacked model call per step and group
+
+    Requests whose models share a batch key (the same weights, or with the
+    NumPy backend the same architecture) are stacked into a single
+    (N, timesteps, features) tensor and rolled out together for the longest
+    horizon in the group. Usage is min-max scaled with each unit's saved
+    scaler on the way in and mapped back on the way out, as in training.
+    Units with a direct model covering the request are grouped separately
+    and served without a rollout; DirectForecaster applies the same scaler
+    itself. Failures are recorded on the individual request instead of
+    aborting the batch.
+    """
+    groups = OrderedDict()
+    for req in requests:
+        try:
+            req.input_data = prepare_prediction_data(store, req.floor, req.unit, sequence_length)
+            entry = registry.get(req.floor, req.unit)
+        except Exception as e:
+            req.error = str(e)
+            continue
+        engine = entry.forecaster(req.days)
+        if engine is entry.direct:
+            batch_key = ('direct', engine.batch_key)
+            scale = (0.0, 1.0)
+        else:
+            batch_key = ('rollout', entry.batch_key)
+            scale = (entry.usage_offset, entry.usage_scale)
+        if not _stackable(engine):
+            # A reload mid-batch leaves two engines under one key, and
+            # CompiledModel cannot combine them; roll each out on its own
+            batch_key += (id(engine),)
+        groups.setdefault(batch_key, []).append((req, entry.key, engine, scale))
+
+    for members in groups.values():
+        try:
+            engines = [engine for _, _, engine, _ in members]
+            engine = engines[0]
+            if any(other is not engine for other in engines[1:]):
+                engine = engine.stack(engines)
+
+            offsets, scales = np.array([scale for _, _, _, scale in members]).T[..., None]
+            sequences = np.stack([req.input_data for req, _, _, _ in members]).astype(np.float64)
+            sequences[:, :, 0] = (sequences[:, :, 0] - offsets) / scales
+            days = max(req.days for req, _, _, _ in members)
+            predictions = engine.rollout(sequences, days) * scales + offsets
+            for (req, _, _, _), values in zip(members, predictions):
+                req.predictions = values[:req.days]
+        except Exception as e:
+            logger.error(f"Batch forecast error for model {members[0][1]}: {e}", exc_info=True)
+            for req, _, _, _ in members:
+                req.error = str(e)
+
+    return requests
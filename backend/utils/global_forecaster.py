@@ -0,0 +1,160 @@
+import os
+import json
+import logging
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+GLOBAL_MODEL_FILE = 'global_model.keras'
+GLOBAL_META_FILE = 'global_model_meta.json'
+
+
+def calendar_features(dates):
+    """Day of week and month of datetime64[D] dates, each scaled to [0, 1]"""
+    days = np.asarray(dates, dtype='datetime64[D]').astype(np.int64)
+    day_of_week = (days + 3) % 7  # 1970-01-01 was a Thursday, Monday is 0
+    month = np.asarray(dates, dtype='datetime64[M]').astype(np.int64) % 12
+    return np.stack([day_of_week / 6.0, month / 11.0], axis=-1).astype(np.float32)
+
+
+def static_features(residents, unit_size, meta):
+    """Per-unit features scaled by the ranges seen in training"""
+    return np.stack([
+        np.asarray(residents, dtype=np.float32) / meta['residents_scale'],
+        np.asarray(unit_size, dtype=np.float32) / meta['unit_size_scale']
+    ], axis=-1)
+
+
+class GlobalForecaster:
+    """Serves the single multi-unit model trained by train/global_model.py
+
+    The model is conditioned on a unit embedding, so forecasts for any set
+    of units are one batched forward pass per step regardless of how many
+    units are requested.
+    """
+
+    def __init__(self, models_dir):
+        self.models_dir = models_dir
+        self.model_path = os.path.join(models_dir, GLOBAL_MODEL_FILE)
+        self.meta_path = os.path.join(models_dir, GLOBAL_META_FILE)
+        self._mtimes = None
+        self._model = None
+        self._forward = None
+        self._meta = None
+        self._unit_index = {}
+        self._lock = threading.Lock()
+
+    def available(self):
+        return os.path.exists(self.model_path) and os.path.exists(self.meta_path)
+
+    def fingerprint(self):
+        """Identifies the model and metadata files currently on disk"""
+        return (os.stat(self.model_path).st_mtime_ns, os.stat(self.meta_path).st_mtime_ns)
+
+    def _refresh(self):
+        mtimes = self.fingerprint()
+        if mtimes == self._mtimes:
+            return
+        with self._lock:
+            if mtimes == self._mtimes:
+                return
+            import tensorflow as tf
+
+            logger.info(f"Loading global model from {self.model_path}")
+            model = tf.keras.models.load_model(self.model_path)
+            with open(self.meta_path, 'r') as f:
+                meta = json.load(f)
+
+            self._forward = tf.function(lambda inputs: model(inputs, training=False),
+                                        reduce_retracing=True)
+            self._model = model
+            self._meta = meta
+            self._unit_index = {tuple(unit): i for i, unit in enumerate(meta['units'])}
+            self._mtimes = mtimes
+
+    def forecast(self, units, windows, days, start_date):
+        """Forecast `days` values for each unit from its recent readings
+
+        units: list of (floor, unit); windows: (N, sequence_length, 3) raw
+        [water_usage, num_residents, unit_size] rows; start_date: date of
+        the first forecast day, one for all units or one per unit. Returns
+        an (N, days) array in litres.
+        """
+        self._refresh()
+        meta = self._meta
+        index = np.array([self._unit_index[(int(f), int(u))] for f, u in units])
+        scale = np.asarray(meta['usage_scale'], dtype=np.float32)[index]
+
+        current = (np.asarray(windows)[:, :, 0] / scale[:, None]).astype(np.float32)
+        static = static_features(windows[:, -1, 1], windows[:, -1, 2], meta)
+        starts = np.broadcast_to(np.asarray(start_date, dtype='datetime64[D]'), (len(units),))
+        calendar = calendar_features(starts[:, None] + np.arange(days))
+
+        predictions = np.empty((len(units), days), dtype=np.float32)
+        for step in range(days):
+            step_static = np.concatenate([static, calendar[:, step]], axis=1)
+            next_day = self._forward([current[:, :, None], index[:, None], step_static])
+            next_day = np.asarray(next_day).reshape(len(units))
+            predictions[:, step] = next_day
+            current = np.concatenate([current[:, 1:], next_day[:, None]], axis=1)
+
+        return (predictions * scale[:, None]).astype(np.float64)
+
+    def forecast_requests(self, requests, store, sequence_length=7):
+        """Fill in ForecastRequest predictions with one pass for all units
+
+        Each unit's forecast starts the day after its last reading, so the
+        calendar features match the days that follow its window. If the
+        model can't be loaded every request gets the error instead. If the
+        batched pass fails, each unit is retried on its own and only the
+        ones that still fail record the error, as in forecast_batch.
+        """
+        from utils.data_prep import prepare_prediction_data
+
+        try:
+            self._refresh()
+        except Exception as e:
+            logger.error(f"Global model unavailable: {e}")
+            for req in requests:
+                req.error = f"Global model unavailable: {e}"
+            return requests
+
+        valid = []
+        starts = []
+        for req in requests:
+            try:
+                if (int(req.floor), int(req.unit)) not in self._unit_index:
+                    raise ValueError(f"Global model was not trained on Floor {req.floor} Unit {req.unit}")
+                req.input_data = prepare_prediction_data(store, req.floor, req.unit, sequence_length)
+                starts.append(store.last_date(req.floor, req.unit) + np.timedelta64(1, 'D'))
+                valid.append(req)
+            except Exception as e:
+                req.error = str(e)
+
+        if not valid:
+            return requests
+        try:
+            self._forecast_into(valid, starts)
+        except Exception as e:
+            logger.error(f"Global batch forecast error, retrying units one by one: {e}",
+                         exc_info=True)
+            for req, start in zip(valid, starts):
+                try:
+                    self._forecast_into([req], [start])
+                except Exception as e:
+                    req.error = str(e)
+
+        return requests
+
+    def _forecast_into(self, requests, starts):
+        """Forecast requests in one pass and store each one's predictions"""
+        predictions = self.forecast(
+            [(req.floor, req.unit) for req in requests],
+            np.stack([req.input_data for req in requests]),
+            max(req.days for req in requests),
+            np.array(starts)
+        )
+        for req, values in zip(requests, predictions):
+            req.predictions = values[:req.days]
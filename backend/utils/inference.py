@@ -0,0 +1,91 @@
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class CompiledModel:
+    """Traced serving functions around a loaded Keras model
+
+    model.predict builds a data adapter and runs a full predict loop on
+    every call, which dominates the cost for a (1, 7, 3) input. Here the
+    forward pass is a tf.function with a fixed input signature, and the
+    whole autoregressive rollout (predict, shift window, append) runs as a
+    single graph so a forecast of any length is one call.
+    """
+
+    def __init__(self, model, sequence_length=7, features=3, jit_compile=False):
+        import tensorflow as tf
+
+        self.model = model
+        self.sequence_length = sequence_length
+        self.features = features
+
+        window_spec = tf.TensorSpec([None, sequence_length, features], tf.float32)
+        days_spec = tf.TensorSpec([], tf.int32)
+
+        self._predict = tf.function(
+            self._forward, input_signature=[window_spec], jit_compile=jit_compile
+        )
+        self._outputs = tf.function(
+            self._all_outputs, input_signature=[window_spec], jit_compile=jit_compile
+        )
+        self._rollout = tf.function(
+            self._rollout_graph, input_signature=[window_spec, days_spec], jit_compile=jit_compile
+        )
+
+    def _forward(self, sequences):
+        import tensorflow as tf
+
+        output = self.model(sequences, training=False)
+        return tf.reshape(output, [tf.shape(sequences)[0], -1])[:, 0]
+
+    def _all_outputs(self, sequences):
+        import tensorflow as tf
+
+        output = self.model(sequences, training=False)
+        return tf.reshape(output, [tf.shape(sequences)[0], -1])
+
+    def _rollout_graph(self, sequences, days):
+        import tensorflow as tf
+
+        predictions = tf.TensorArray(tf.float32, size=days)
+
+        def step(i, current, predictions):
+            next_day = self._forward(current)
+            predictions = predictions.write(i, next_day)
+
+            # Shift the window and append the prediction, keeping the
+            # remaining features of the last row as they were
+            new_row = tf.concat([next_day[:, None], current[:, -1, 1:]], axis=1)
+            current = tf.concat([current[:, 1:], new_row[:, None, :]], axis=1)
+            return i + 1, current, predictions
+
+        _, _, predictions = tf.while_loop(
+            lambda i, current, predictions: i < days,
+            step,
+            [tf.constant(0), sequences, predictions]
+        )
+        return tf.transpose(predictions.stack())
+
+    def predict(self, sequences):
+        """Next-day value for each (timesteps, features) window, shape (N,)"""
+        sequences = np.asarray(sequences, dtype=np.float32)
+        return self._predict(sequences).numpy()
+
+    def outputs(self, sequences):
+        """All output values per window, shape (N, outputs)"""
+        sequences = np.asarray(sequences, dtype=np.float32)
+        return self._outputs(sequences).numpy()
+
+    def rollout(self, sequences, days):
+        """Forecast `days` steps for each window in one call, shape (N, days)"""
+        sequences = np.asarray(sequences, dtype=np.float32)
+        return self._rollout(sequences, np.int32(days)).numpy().astype(np.float64)
+
+    def warm(self):
+        """Trace both functions so the first request does not pay for it"""
+        sequences = np.zeros((1, self.sequence_length, self.features), dtype=np.float32)
+        self.predict(sequences)
+        self.rollout(sequences, 1)
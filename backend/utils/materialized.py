@@ -0,0 +1,107 @@
+import os
+import hashlib
+import logging
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MATERIALIZED_FILE = 'materialized_forecasts.npz'
+
+
+def unit_fingerprint(artifacts, window, stateful=False):
+    """Hash of everything a per-unit forecast depends on
+
+    artifacts: ModelRegistry.fingerprint for the unit; window: its most
+    recent (sequence_length, features) readings.
+    """
+    digest = hashlib.sha1(repr((artifacts, stateful)).encode())
+    digest.update(np.ascontiguousarray(window, dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+class MaterializedForecasts:
+    """Read side of the forecasts written by train/materialize_forecasts.py
+
+    The file holds one row per unit: forecast values up to max_days, the
+    input window they came from and the unit fingerprint. A row is only
+    served while its fingerprint still matches the unit's current model
+    files and readings, so a retrained model or new data falls back to
+    live inference until the next run.
+    """
+
+    def __init__(self, models_dir):
+        self.path = os.path.join(models_dir, MATERIALIZED_FILE)
+        self._mtime = None
+        # (data, index) swapped in as one tuple, so readers never pair a
+        # new file's arrays with the old file's unit index
+        self._state = (None, {})
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            data, index = None, {}
+            if mtime is not None:
+                logger.info(f"Loading materialized forecasts from {self.path}")
+                with np.load(self.path, allow_pickle=False) as archive:
+                    data = {name: archive[name] for name in archive.files}
+                index = {(int(f), int(u)): i for i, (f, u) in enumerate(data['units'])}
+            self._state, self._mtime = (data, index), mtime
+
+    @staticmethod
+    def _covers(data, row, days):
+        """Whether live serving would have used the same engine for `days`
+
+        The job forecasts max_days with ModelEntry.forecaster(max_days); a
+        unit with a direct model serves shorter horizons from it instead.
+        """
+        max_days = int(data['max_days'])
+        direct_horizon = int(data['direct_horizons'][row])
+        if days > max_days:
+            return False
+        return direct_horizon == 0 or (max_days <= direct_horizon) == (days <= direct_horizon)
+
+    def lookup(self, floor_no, unit_no, days, artifacts, store, stateful=False):
+        """(predictions, input window) if the unit's row is fresh, else None"""
+        self._refresh()
+        data, index = self._state
+        row = index.get((int(floor_no), int(unit_no)))
+        if row is not None and self._covers(data, row, days):
+            window = data['windows'][row]
+            try:
+                current = store.recent(floor_no, unit_no, len(window))
+            except ValueError:
+                current = None
+            if (current is not None and
+                    unit_fingerprint(artifacts, current, stateful) == data['fingerprints'][row]):
+                with self._lock:
+                    self.hits += 1
+                return data['values'][row, :days].astype(np.float64), window
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def stats(self):
+        self._refresh()
+        data, index = self._state
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return {
+            'available': data is not None,
+            'units': len(index),
+            'max_days': int(data['max_days']) if data is not None else None,
+            'generated_at': str(data['generated_at']) if data is not None else None,
+            'hits': hits,
+            'misses': misses
+        }
@@ -0,0 +1,213 @@
+import os
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.forecasting import DirectForecaster
+from utils.inference import CompiledModel
+from utils.numpy_engine import NumpyModel
+
+MODEL_EXTENSIONS = {
+    'keras': '.keras',
+    'numpy': '.npz'
+}
+
+logger = logging.getLogger(__name__)
+
+
+def get_model_key(floor_no, unit_no):
+    """Build the artifact key for a unit (Floor 4 Unit 4 -> A304)"""
+    return f"A{(floor_no-1):01d}{unit_no:02d}"
+
+
+class ModelEntry:
+    """A loaded model together with its scaler and architecture name
+
+    engine serves rollouts; entries with the same batch_key can be run
+    together in one stacked forward pass. direct is a DirectForecaster when
+    the unit also has a direct multi-horizon model, otherwise None.
+    """
+
+    def __init__(self, key, model, engine, batch_key, scaler, architecture, mtimes,
+                 direct=None):
+        self.key = key
+        self.model = model
+        self.engine = engine
+        self.batch_key = batch_key
+        self.scaler = scaler
+        self.architecture = architecture
+        self.mtimes = mtimes
+        self.direct = direct
+
+    @property
+    def usage_scale(self):
+        """The usage range the model's inputs and outputs were divided by"""
+        return float(self.scaler[0]) if self.scaler is not None else 1.0
+
+    @property
+    def usage_offset(self):
+        """The usage minimum subtracted first; 0 for scaler files holding only the range"""
+        return float(self.scaler[1]) if self.scaler is not None and len(self.scaler) > 1 else 0.0
+
+    def forecaster(self, days):
+        """Engine for a `days` forecast, the direct model when it covers it"""
+        if self.direct is not None and days <= self.direct.horizon:
+            return self.direct
+        return self.engine
+
+
+class ModelRegistry:
+    """Process-wide LRU cache of the per-unit models in a models directory"""
+
+    def __init__(self, models_dir, max_size=32, jit_compile=False, backend='keras',
+                 stateful=False):
+        if backend not in MODEL_EXTENSIONS:
+            raise ValueError(f"Unknown inference backend: {backend}")
+        if stateful and backend != 'numpy':
+            raise ValueError("Stateful rollouts need the numpy inference backend")
+        self.models_dir = models_dir
+        self.max_size = max_size
+        self.jit_compile = jit_compile
+        self.backend = backend
+        self.stateful = stateful
+        self.extension = MODEL_EXTENSIONS[backend]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _paths(self, key):
+        return {
+            'model': os.path.join(self.models_dir, f'lstm_model_{key}{self.extension}'),
+            'scaler': os.path.join(self.models_dir, f'lstm_scaler_{key}.npy'),
+            'architecture': os.path.join(self.models_dir, f'architecture_{key}.txt'),
+            'direct': os.path.join(self.models_dir, f'lstm_direct_{key}{self.extension}')
+        }
+
+    def _mtimes(self, paths):
+        """Modification times of the artifacts, None for missing siblings"""
+        mtimes = {}
+        for name, path in paths.items():
+            try:
+                mtimes[name] = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                if name == 'model':
+                    raise FileNotFoundError(f"Model file not found: {path}")
+                mtimes[name] = None
+        return mtimes
+
+    def _load_engine(self, key, path, features=3):
+        """(model, engine, batch_key) for one model file"""
+        if self.backend == 'numpy':
+            engine = NumpyModel.load(path)
+            return None, engine, engine.signature
+
+        import tensorflow as tf
+
+        model = tf.keras.models.load_model(path)
+        engine = CompiledModel(model, features=features, jit_compile=self.jit_compile)
+        return model, engine, key
+
+    def _load_direct(self, key, paths, entry):
+        """DirectForecaster for the unit's direct multi-horizon model
+
+        It shares the unit's scaler with the rollout model, so forecasts
+        don't change level where the direct horizon ends.
+        """
+        logger.info(f"Loading direct model {key} from {paths['direct']}")
+        _, engine, batch_key = self._load_engine(key, paths['direct'], features=1)
+        # One forward pass both traces the model and reveals its horizon
+        horizon = engine.outputs(np.zeros((1, 7, 1), dtype=np.float32)).shape[1]
+        return DirectForecaster(engine, entry.usage_scale, horizon, batch_key,
+                                entry.usage_offset)
+
+    def _load(self, key, paths, mtimes):
+        logger.info(f"Loading model {key} from {paths['model']}")
+        model, engine, batch_key = self._load_engine(key, paths['model'])
+        if self.stateful:
+            # Architectures that cannot carry state keep windowed rollouts
+            engine.stateful = engine.streamable
+        engine.warm()
+        scaler = np.load(paths['scaler']) if mtimes['scaler'] is not None else None
+        if scaler is not None and len(scaler) < 2:
+            logger.warning(f"Scaler for {key} holds no minimum; its forecasts are offset "
+                           f"until the unit is retrained")
+
+        architecture = None
+        if mtimes['architecture'] is not None:
+            with open(paths['architecture'], 'r') as f:
+                architecture = f.read().strip()
+
+        entry = ModelEntry(key, model, engine, batch_key, scaler, architecture, mtimes)
+        if mtimes['direct'] is not None and scaler is not None:
+            try:
+                entry.direct = self._load_direct(key, paths, entry)
+            except Exception as e:
+                logger.error(f"Error loading direct model {key}, using rollouts: {e}")
+        return entry
+
+    def fingerprint(self, floor_no, unit_no):
+        """Identifies the unit's artifacts on disk without loading them
+
+        Changes whenever any of the model, scaler, architecture or direct
+        model files is replaced.
+        """
+        key = get_model_key(floor_no, unit_no)
+        return (key,) + tuple(self._mtimes(self._paths(key)).values())
+
+    def get(self, floor_no, unit_no):
+        """Return the resident entry for a unit, loading or reloading it as needed"""
+        return self.get_by_key(get_model_key(floor_no, unit_no))
+
+    def get_by_key(self, key):
+        paths = self._paths(key)
+        mtimes = self._mtimes(paths)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.mtimes == mtimes:
+                self._entries.move_to_end(key)
+                return entry
+
+        if entry is not None:
+            logger.info(f"Model {key} changed on disk, reloading")
+
+        # Load outside the lock so hits on other units are not blocked
+        entry = self._load(key, paths, mtimes)
+
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                evicted, _ = self._entries.popitem(last=False)
+                logger.info(f"Evicted model {evicted} from registry")
+
+        return entry
+
+    def available_keys(self):
+        """Keys of all models present in the models directory"""
+        if not os.path.exists(self.models_dir):
+            return []
+        return sorted(
+            f[len('lstm_model_'):-len(self.extension)]
+            for f in os.listdir(self.models_dir)
+            if f.startswith('lstm_model_') and f.endswith(self.extension)
+        )
+
+    def warm(self, keys=None):
+        """Load models up front so the first requests do not pay for it"""
+        keys = self.available_keys() if keys is None else keys
+        loaded = 0
+        for key in keys[:self.max_size]:
+            try:
+                self.get_by_key(key)
+                loaded += 1
+            except Exception as e:
+                logger.error(f"Error warming model {key}: {e}")
+        logger.info(f"Warmed {loaded} models into registry")
+        return loaded
+
+    def resident(self):
+        """Keys currently held in memory, least recently used first"""
+        with self._lock:
+            return list(self._entries.keys())
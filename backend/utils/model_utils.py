@@ -1,7 +1,7 @@
 import numpy as np
-import pandas as pd
 from tensorflow.keras.models import load_model
 from datetime import datetime, timedelta
+from utils.data_store import ConsumptionStore
 
 def load_model_and_scaler(floor_no, unit_no):
     """Load the LSTM model and scaler for a specific unit"""
@@ -14,17 +14,26 @@ def load_model_and_scaler(floor_no, unit_no):
         print(f"Error loading model and scaler: {e}")
         return None, None
 
-def get_recent_data(floor_no, unit_no, look_back=7):
-    """Get recent water consumption data for prediction"""
+_stores = {}
+
+def _consumption_store(csv_path='water_consumption_data.csv'):
+    """Shared ConsumptionStore, which maps the columnar copy of the CSV when it is fresh"""
+    if csv_path not in _stores:
+        _stores[csv_path] = ConsumptionStore(csv_path)
+    return _stores[csv_path]
+
+def get_recent_data(floor_no, unit_no, look_back=7, repository=None):
+    """Get recent water consumption data for prediction
+
+    Reads the CSV (or its columnar copy), or a ReadingsRepository if given.
+    """
     try:
-        df = pd.read_csv('water_consumption_data.csv')
-        unit_data = df[(df['floor'] == floor_no) & 
-                      (df['unit'] == unit_no)].copy()
-        
-        unit_data['date'] = pd.to_datetime(unit_data['date'])
-        unit_data = unit_data.sort_values('date')
-        
-        return unit_data['water_usage'].tail(look_back).values
+        if repository is not None:
+            return repository.last_n(floor_no, unit_no, look_back)[1][:, 0]
+        series = _consumption_store().series(floor_no, unit_no)
+        if series is None:
+            return np.array([])
+        return series.tail(look_back)[:, 0].copy()
     except Exception as e:
         print(f"Error getting recent data: {e}")
         return None
@@ -66,22 +75,23 @@ def make_predictions(model, scaler, input_data, num_days=7):
         print(f"Error making predictions: {e}")
         return None
 
-def get_historical_data(floor_no, unit_no, days=30):
+def get_historical_data(floor_no, unit_no, days=30, repository=None):
     """Get historical water consumption data"""
     try:
-        df = pd.read_csv('water_consumption_data.csv')
-        unit_data = df[(df['floor'] == floor_no) & 
-                      (df['unit'] == unit_no)].copy()
-        
-        unit_data['date'] = pd.to_datetime(unit_data['date'])
-        unit_data = unit_data.sort_values('date')
-        
-        historical = unit_data.tail(days)[['date', 'water_usage']]
+        if repository is not None:
+            dates, values = repository.last_n(floor_no, unit_no, days)
+            values = values[:, 0]
+        else:
+            series = _consumption_store().series(floor_no, unit_no)
+            if series is None:
+                return {'dates': [], 'values': []}
+            dates = series.dates[-days:]
+            values = series.tail(days)[:, 0]
         
         return {
-            'dates': historical['date'].dt.strftime('%Y-%m-%d').tolist(),
-            'values': historical['water_usage'].tolist()
+            'dates': np.datetime_as_string(dates, unit='D').tolist(),
+            'values': values.tolist()
         }
     except Exception as e:
         print(f"Error getting historical data: {e}")
-        return None
\ No newline at end of file
+        return None
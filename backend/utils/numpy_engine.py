@@ -0,0 +1,400 @@
+import json
+import logging
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from utils.forecasting import next_day_values, rollout
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+
+def _sigmoid(x):
+    return 0.5 * (np.tanh(0.5 * x) + 1)
+
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    'relu': lambda x: np.maximum(x, 0),
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid
+}
+
+
+# Forward functions. Weights may carry a leading unit axis (see
+# NumpyModel.stack); inputs are then one window per unit and every product
+# is a batched matmul, so the same code serves one model or many.
+
+# Recurrent cells are written as single timesteps over a carry so that a
+# layer can be resumed from an earlier state (see rollout_stateful).
+
+def _lstm_step(x_t, carry, p, c):
+    activation = ACTIVATIONS[c['activation']]
+    recurrent_activation = ACTIVATIONS[c['recurrent_activation']]
+    units = c['units']
+    h, state = carry
+
+    z = x_t + h @ p['recurrent_kernel']
+    i = recurrent_activation(z[..., :units])
+    f = recurrent_activation(z[..., units:2*units])
+    g = activation(z[..., 2*units:3*units])
+    o = recurrent_activation(z[..., 3*units:])
+    state = f * state + i * g
+    h = o * activation(state)
+    return h, (h, state)
+
+
+def _gru_step(x_t, h, p, c):
+    activation = ACTIVATIONS[c['activation']]
+    recurrent_activation = ACTIVATIONS[c['recurrent_activation']]
+    units = c['units']
+
+    h_t = h @ p['recurrent_kernel'] + p['recurrent_bias']
+    z = recurrent_activation(x_t[..., :units] + h_t[..., :units])
+    r = recurrent_activation(x_t[..., units:2*units] + h_t[..., units:2*units])
+    candidate = activation(x_t[..., 2*units:] + r * h_t[..., 2*units:])
+    h = z * h + (1 - z) * candidate
+    return h, h
+
+
+def _zeros(n, units):
+    return np.zeros((n, 1, units), dtype=np.float32)
+
+
+# class -> (input bias name, initial carry, step function)
+RECURRENT_CELLS = {
+    'LSTM': ('bias', lambda n, units: (_zeros(n, units), _zeros(n, units)), _lstm_step),
+    'GRU': ('input_bias', _zeros, _gru_step)
+}
+
+
+def _recurrent(x, p, c, cell, carry=None):
+    """Run a recurrent layer over x from carry (zeros if None)
+
+    Returns (output, carry) where carry is the state after the last timestep.
+    """
+    bias, initial_carry, step = RECURRENT_CELLS[cell]
+    if c['go_backwards']:
+        x = x[:, ::-1]
+
+    projected = x @ p['kernel'] + p[bias]
+    if carry is None:
+        carry = initial_carry(len(x), c['units'])
+    outputs = []
+    for t in range(x.shape[1]):
+        h, carry = step(projected[:, t:t+1], carry, p, c)
+        outputs.append(h)
+
+    if c['return_sequences']:
+        return np.concatenate(outputs, axis=1), carry
+    return h[:, 0], carry
+
+
+def _lstm(x, p, c):
+    return _recurrent(x, p, c, 'LSTM')[0]
+
+
+def _gru(x, p, c):
+    return _recurrent(x, p, c, 'GRU')[0]
+
+
+def _bidirectional(x, p, c):
+    forward_layer, backward_layer = c['forward'], c['backward']
+    forward = LAYERS[forward_layer['class']](
+        x, {k[len('forward/'):]: v for k, v in p.items() if k.startswith('forward/')},
+        forward_layer['config'])
+    backward = LAYERS[backward_layer['class']](
+        x, {k[len('backward/'):]: v for k, v in p.items() if k.startswith('backward/')},
+        backward_layer['config'])
+    if backward_layer['config']['return_sequences']:
+        backward = backward[:, ::-1]
+    return np.concatenate([forward, backward], axis=-1)
+
+
+def _conv1d(x, p, c):
+    kernel = p['kernel']
+    size, channels, filters = kernel.shape[-3:]
+    windows = sliding_window_view(x, size, axis=1)          # (N, T', F, k)
+    windows = np.swapaxes(windows, -1, -2).reshape(len(x), -1, size * channels)
+    kernel = kernel.reshape(kernel.shape[:-3] + (size * channels, filters))
+    return ACTIVATIONS[c['activation']](windows @ kernel + p['bias'])
+
+
+def _max_pooling1d(x, p, c):
+    windows = sliding_window_view(x, c['pool_size'], axis=1)[:, ::c['strides']]
+    return windows.max(axis=-1)
+
+
+def _dense(x, p, c):
+    if x.ndim == 2:
+        output = (x[:, None, :] @ p['kernel'] + p['bias'])[:, 0]
+    else:
+        output = x @ p['kernel'] + p['bias']
+    return ACTIVATIONS[c['activation']](output)
+
+
+def _attention(x, p, c):
+    # Dot-product self-attention, Attention()([x, x]) with default settings
+    scores = x @ np.swapaxes(x, -1, -2)
+    scores = np.exp(scores - scores.max(axis=-1, keepdims=True))
+    weights = scores / scores.sum(axis=-1, keepdims=True)
+    return weights @ x
+
+
+LAYERS = {
+    'LSTM': _lstm,
+    'GRU': _gru,
+    'Bidirectional': _bidirectional,
+    'Conv1D': _conv1d,
+    'MaxPooling1D': _max_pooling1d,
+    'Dense': _dense,
+    'Attention': _attention
+}
+
+
+class NumpyModel:
+    """Forward pass of an exported model using only NumPy
+
+    layers: list of {'class', 'config'} descriptors in execution order
+    params: list of dicts of weight arrays, one per layer
+    """
+
+    def __init__(self, layers, params, input_shape, architecture=None, stacked=False,
+                 stateful=False):
+        self.layers = layers
+        self.params = params
+        self.input_shape = tuple(input_shape)
+        self.architecture = architecture
+        self.stacked = stacked
+        self.stateful = stateful
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as archive:
+            descriptor = json.loads(str(archive['descriptor']))
+            if descriptor['format_version'] != FORMAT_VERSION:
+                raise ValueError(f"Unsupported export format in {path}")
+            params = [{} for _ in descriptor['layers']]
+            for name in archive.files:
+                if name == 'descriptor':
+                    continue
+                index, weight = name.split(':', 1)
+                params[int(index)][weight] = archive[name]
+        return cls(descriptor['layers'], params, descriptor['input_shape'],
+                   descriptor.get('architecture'))
+
+    @property
+    def signature(self):
+        """Identifies models that can be stacked into one batched forward pass"""
+        shapes = [sorted((k, v.shape) for k, v in p.items()) for p in self.params]
+        return json.dumps([self.layers, shapes, self.input_shape], sort_keys=True, default=str)
+
+    @classmethod
+    def stack(cls, models):
+        """Combine same-signature models so window i runs with models[i] weights"""
+        first = models[0]
+        if any(m.signature != first.signature for m in models[1:]):
+            raise ValueError("Only models with the same architecture can be stacked")
+        params = []
+        for i in range(len(first.params)):
+            layer_params = {}
+            for name in first.params[i]:
+                stacked = np.stack([m.params[i][name] for m in models])
+                if name.endswith('bias'):
+                    # Broadcast per-unit biases over the time axis
+                    stacked = stacked[:, None]
+                layer_params[name] = stacked
+            params.append(layer_params)
+        return cls(first.layers, params, first.input_shape, first.architecture, stacked=True,
+                   stateful=first.stateful)
+
+    @property
+    def streamable(self):
+        """True for forward LSTM/GRU layers followed only by Dense layers
+
+        Only these models can carry recurrent state from one forecast step
+        to the next, see rollout_stateful.
+        """
+        classes = [layer['class'] for layer in self.layers]
+        depth = next((i for i, name in enumerate(classes) if name not in RECURRENT_CELLS),
+                     len(classes))
+        if depth == 0 or any(name != 'Dense' for name in classes[depth:]):
+            return False
+        configs = [layer['config'] for layer in self.layers[:depth]]
+        return (not any(c['go_backwards'] for c in configs)
+                and all(c['return_sequences'] for c in configs[:-1])
+                and not configs[-1]['return_sequences'])
+
+    def forward(self, sequences):
+        x = np.asarray(sequences, dtype=np.float32)
+        for layer, p in zip(self.layers, self.params):
+            x = LAYERS[layer['class']](x, p, layer['config'])
+        return x
+
+    def outputs(self, sequences):
+        """All output values per window, shape (N, outputs)"""
+        output = self.forward(sequences)
+        return output.reshape(len(output), -1)
+
+    def predict(self, sequences):
+        """Next-day value for each (timesteps, features) window, shape (N,)"""
+        output = self.forward(sequences)
+        return output.reshape(len(output), -1)[:, 0]
+
+    def rollout(self, sequences, days):
+        """Forecast `days` steps for each window, shape (N, days)"""
+        if self.stateful:
+            return self.rollout_stateful(sequences, days)
+        return rollout(self.predict, np.asarray(sequences, dtype=np.float32), days)
+
+    def rollout_stateful(self, sequences, days):
+        """Forecast by carrying recurrent state instead of re-reading the window
+
+        The window is read once to build the state, which gives the same
+        first value as predict(). Every later step feeds only the new row
+        (the prediction plus the other features of the last row) through
+        the recurrent layers, so a step costs the same whatever the window
+        length. Later steps see all history since the window start rather
+        than exactly the last `timesteps` days, so they drift slightly from
+        rollout().
+        """
+        if not self.streamable:
+            raise ValueError(f"{self.architecture or 'Model'} cannot be rolled out statefully")
+        depth = sum(layer['class'] in RECURRENT_CELLS for layer in self.layers)
+        carries = [None] * depth
+
+        x = np.asarray(sequences, dtype=np.float32)
+        row = x[:, -1:].copy()
+        predictions = np.empty((len(x), days))
+        for step in range(days):
+            for i, (layer, p) in enumerate(zip(self.layers[:depth], self.params[:depth])):
+                x, carries[i] = _recurrent(x, p, layer['config'], layer['class'], carries[i])
+            for layer, p in zip(self.layers[depth:], self.params[depth:]):
+                x = LAYERS[layer['class']](x, p, layer['config'])
+
+            next_day = next_day_values(x)
+            predictions[:, step] = next_day
+            row[:, 0, 0] = next_day
+            x = row
+        return predictions
+
+    def warm(self):
+        self.predict(np.zeros((1,) + self.input_shape, dtype=np.float32))
+
+
+# Export from Keras. Only called by tooling that already has TensorFlow.
+
+def _layer_input_tensors(layer):
+    inputs = layer.input
+    return inputs if isinstance(inputs, (list, tuple)) else [inputs]
+
+
+def _export_recurrent(layer):
+    config = layer.get_config()
+    weights = layer.get_weights()
+    spec = {
+        'units': config['units'],
+        'activation': config['activation'],
+        'recurrent_activation': config['recurrent_activation'],
+        'return_sequences': config['return_sequences'],
+        'go_backwards': config['go_backwards']
+    }
+    if type(layer).__name__ == 'LSTM':
+        return spec, {'kernel': weights[0], 'recurrent_kernel': weights[1], 'bias': weights[2]}
+
+    if not config.get('reset_after', True):
+        raise ValueError(f"GRU layer {layer.name} must use reset_after=True")
+    return spec, {
+        'kernel': weights[0],
+        'recurrent_kernel': weights[1],
+        'input_bias': weights[2][0],
+        'recurrent_bias': weights[2][1]
+    }
+
+
+def _export_layer(layer):
+    """Descriptor and weights for one Keras layer, or None for no-ops"""
+    name = type(layer).__name__
+    config = layer.get_config()
+
+    if name == 'Dropout':
+        return None
+    if name in ('LSTM', 'GRU'):
+        spec, weights = _export_recurrent(layer)
+        return {'class': name, 'config': spec}, weights
+    if name == 'Bidirectional':
+        if config['merge_mode'] != 'concat':
+            raise ValueError(f"Unsupported merge_mode {config['merge_mode']}")
+        forward_spec, forward_weights = _export_recurrent(layer.forward_layer)
+        backward_spec, backward_weights = _export_recurrent(layer.backward_layer)
+        weights = {f'forward/{k}': v for k, v in forward_weights.items()}
+        weights.update({f'backward/{k}': v for k, v in backward_weights.items()})
+        return {'class': name, 'config': {
+            'forward': {'class': type(layer.forward_layer).__name__, 'config': forward_spec},
+            'backward': {'class': type(layer.backward_layer).__name__, 'config': backward_spec}
+        }}, weights
+    if name == 'Conv1D':
+        if config['padding'] != 'valid' or tuple(config['strides']) != (1,) \
+                or tuple(config['dilation_rate']) != (1,):
+            raise ValueError(f"Conv1D layer {layer.name} must be valid/stride 1/undilated")
+        kernel, bias = layer.get_weights()
+        return {'class': name, 'config': {'activation': config['activation']}}, \
+            {'kernel': kernel, 'bias': bias}
+    if name == 'MaxPooling1D':
+        if config['padding'] != 'valid':
+            raise ValueError(f"MaxPooling1D layer {layer.name} must use valid padding")
+        pool_size = config['pool_size'][0] if isinstance(config['pool_size'], (list, tuple)) else config['pool_size']
+        strides = config['strides'] or pool_size
+        strides = strides[0] if isinstance(strides, (list, tuple)) else strides
+        return {'class': name, 'config': {'pool_size': pool_size, 'strides': strides}}, {}
+    if name == 'Dense':
+        kernel, bias = layer.get_weights()
+        return {'class': name, 'config': {'activation': config['activation']}}, \
+            {'kernel': kernel, 'bias': bias}
+    if name == 'Attention':
+        if config.get('use_scale') or config.get('score_mode', 'dot') != 'dot' \
+                or config.get('causal'):
+            raise ValueError(f"Attention layer {layer.name} must be plain dot-product")
+        return {'class': name, 'config': {}}, {}
+
+    raise ValueError(f"Unsupported layer type {name}")
+
+
+def export_model(model, path, architecture=None):
+    """Write a Keras model's weights and layer descriptors to an .npz file
+
+    The model must be a single chain of supported layers (Attention may
+    attend the previous output to itself), which covers every architecture
+    in train/advanced_training.ModelArchitectures.
+    """
+    layers = []
+    arrays = {}
+    previous = None
+    sequential = type(model).__name__ == 'Sequential'
+    for layer in model.layers:
+        if type(layer).__name__ == 'InputLayer':
+            previous = layer
+            continue
+        if not sequential and previous is not None and any(t is not previous.output for t in _layer_input_tensors(layer)):
+            raise ValueError(f"Layer {layer.name} does not follow a single chain")
+        previous = layer
+
+        exported = _export_layer(layer)
+        if exported is None:
+            continue
+        spec, weights = exported
+        index = len(layers)
+        layers.append(spec)
+        for weight_name, value in weights.items():
+            arrays[f'{index}:{weight_name}'] = np.asarray(value, dtype=np.float32)
+
+    descriptor = {
+        'format_version': FORMAT_VERSION,
+        'architecture': architecture,
+        'input_shape': list(model.input_shape[1:]),
+        'layers': layers
+    }
+    np.savez_compressed(path, descriptor=np.array(json.dumps(descriptor)), **arrays)
+    return descriptor
@@ -0,0 +1,123 @@
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ConsumptionPanel:
+    """All units' daily usage as one dense (days, units) float32 matrix
+
+    Row i of usage is dates[i] and column j is units[j], with units in
+    (floor, unit) order. residents and unit_size hold each unit's latest
+    value, aligned with the columns. Days missing inside a unit's span are
+    forward-filled from its previous reading; observed marks the cells that
+    came from a reading and first/last bound each unit's span, so a unit's
+    slice never includes days before or after its own history.
+    """
+
+    def __init__(self, dates, units, usage, observed, residents, unit_size):
+        self.dates = dates
+        self.units = units
+        self.usage = usage
+        self.observed = observed
+        self.residents = residents
+        self.unit_size = unit_size
+        self._columns = {unit: j for j, unit in enumerate(units)}
+
+        rows = np.arange(len(dates))[:, None]
+        has_rows = observed.any(axis=0)
+        # initial= keeps the reductions defined for a panel with no days
+        first = np.where(observed, rows, len(dates)).min(axis=0, initial=len(dates))
+        last = np.where(observed, rows, -1).max(axis=0, initial=-1)
+        self.first = np.where(has_rows, first, 0)
+        self.last = np.where(has_rows, last + 1, 0)
+
+    @classmethod
+    def from_frame(cls, df):
+        """Pivot a DataFrame with the CSV's columns into a panel"""
+        import pandas as pd
+
+        dates = pd.to_datetime(df['date']).values.astype('datetime64[D]')
+        floors = df['floor'].values.astype(np.int64)
+        unit_nos = df['unit'].values.astype(np.int64)
+        if len(dates) == 0:
+            return cls(dates, [], np.empty((0, 0), dtype=np.float32), np.empty((0, 0), dtype=bool),
+                       np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32))
+
+        keys, columns = np.unique(np.column_stack((floors, unit_nos)), axis=0, return_inverse=True)
+        columns = columns.ravel()
+        start = dates.min()
+        rows = (dates - start).astype(np.int64)
+        n_days = int(rows.max()) + 1
+
+        usage = np.full((n_days, len(keys)), np.nan, dtype=np.float32)
+        usage[rows, columns] = df['water_usage'].values
+        observed = np.zeros(usage.shape, dtype=bool)
+        observed[rows, columns] = True
+
+        # Static features: the value on each unit's latest reading
+        latest = np.lexsort((dates, columns))
+        last_rows = latest[np.r_[np.flatnonzero(np.diff(columns[latest])), len(latest) - 1]]
+        residents = df['num_residents'].values[last_rows].astype(np.int32)
+        unit_size = df['unit_size'].values[last_rows].astype(np.int32)
+
+        # Forward-fill every unit at once: each cell takes the row of the
+        # last reading at or above it
+        source = np.where(observed, np.arange(n_days)[:, None], 0)
+        np.maximum.accumulate(source, axis=0, out=source)
+        usage = usage[source, np.arange(len(keys))]
+        filled = int((~observed).sum() - np.isnan(usage).sum())
+        if filled:
+            logger.info(f"Forward-filled {filled} missing unit-days")
+
+        dates = start + np.arange(n_days).astype('timedelta64[D]')
+        units = [(int(floor), int(unit)) for floor, unit in keys]
+        return cls(dates, units, usage, observed, residents, unit_size)
+
+    def __contains__(self, unit):
+        return unit in self._columns
+
+    def column(self, floor_no, unit_no):
+        j = self._columns.get((int(floor_no), int(unit_no)))
+        if j is None:
+            raise ValueError(f"No readings for Floor {floor_no} Unit {unit_no}")
+        return j
+
+    def unit_rows(self, floor_no, unit_no):
+        """Row slice of a unit's span, first to last reading"""
+        j = self.column(floor_no, unit_no)
+        return slice(int(self.first[j]), int(self.last[j]))
+
+    def unit_usage(self, floor_no, unit_no):
+        """A unit's gap-filled daily usage over its span, as a view"""
+        return self.usage[self.unit_rows(floor_no, unit_no), self.column(floor_no, unit_no)]
+
+    def unit_dates(self, floor_no, unit_no):
+        return self.dates[self.unit_rows(floor_no, unit_no)]
+
+    def unit_frame(self, floor_no, unit_no):
+        """A unit's span as a DataFrame with the CSV's columns"""
+        import pandas as pd
+
+        j = self.column(floor_no, unit_no)
+        usage = self.unit_usage(floor_no, unit_no)
+        return pd.DataFrame({
+            'date': self.unit_dates(floor_no, unit_no).astype('datetime64[ns]'),
+            'floor': int(floor_no),
+            'unit': int(unit_no),
+            'water_usage': usage.astype(np.float64),
+            'num_residents': self.residents[j],
+            'unit_size': self.unit_size[j]
+        })
+
+
+def load_panel(source, floor_no=None, unit_no=None):
+    """Read a consumption source (see read_consumption) into a ConsumptionPanel
+
+    With floor_no and unit_no only that unit is read, for callers that
+    need a single column.
+    """
+    from utils.columnar import read_consumption
+
+    return ConsumptionPanel.from_frame(read_consumption(source, floor_no, unit_no))
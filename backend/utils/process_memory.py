@@ -0,0 +1,42 @@
+import os
+
+# Fields of /proc/<pid>/smaps_rollup, reported in MB
+SMAPS_FIELDS = {
+    'Rss': 'rss_mb',
+    'Pss': 'pss_mb',
+    'Shared_Clean': 'shared_clean_mb',
+    'Shared_Dirty': 'shared_dirty_mb',
+    'Private_Clean': 'private_clean_mb',
+    'Private_Dirty': 'private_dirty_mb'
+}
+
+
+def process_memory(pid='self'):
+    """Resident memory of a process, split into shared and private pages
+
+    PSS divides each shared page by the number of processes mapping it, so
+    summing PSS over preforked workers gives their real combined footprint
+    where summing RSS counts shared pages once per worker. Linux only;
+    returns None where /proc is not available.
+    """
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+            lines = f.readlines()
+    except OSError:
+        return None
+
+    memory = {'pid': os.getpid() if pid == 'self' else int(pid)}
+    for line in lines:
+        name, _, value = line.partition(':')
+        if name in SMAPS_FIELDS:
+            memory[SMAPS_FIELDS[name]] = round(int(value.split()[0]) / 1024, 1)
+    return memory
+
+
+def child_pids(pid):
+    """Direct children of a process, e.g. the workers of a preforking server"""
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children', 'r') as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
@@ -0,0 +1,116 @@
+import io
+import json
+from datetime import date
+
+import numpy as np
+
+from utils.data_store import FEATURES
+
+REQUIRED_COLUMNS = ['date', 'floor', 'unit', 'water_usage']
+# Optional features default to the unit's latest known value
+CARRIED_FEATURES = [feature for feature in FEATURES if feature != 'water_usage']
+MAX_REPORTED_ERRORS = 20
+
+
+def parse_readings(body, content_type):
+    """DataFrame of readings from a /api/readings body
+
+    text/csv in the consumption CSV's layout, or JSON: a list of row
+    objects, {"readings": [...]}, or one object of equal-length columns.
+    Values are left as sent; validate_readings converts and checks them.
+    """
+    import pandas as pd
+
+    if content_type and content_type.startswith('text/csv'):
+        return pd.read_csv(io.BytesIO(body), dtype=str)
+
+    data = json.loads(body)
+    if isinstance(data, dict) and 'readings' in data:
+        data = data['readings']
+    if isinstance(data, list):
+        return pd.DataFrame.from_records(data)
+    if isinstance(data, dict):
+        return pd.DataFrame(data)
+    raise ValueError('Expected a list of readings, {"readings": [...]} or columns')
+
+
+def validate_readings(df, store, today=None):
+    """Check a readings frame a column at a time
+
+    Returns (batch, duplicates, errors). batch is the ConsumptionStore.append
+    input holding the rows the store does not have yet; duplicates counts
+    rows it already had. errors lists {'row', 'error'} problems, and the
+    batch is None when there are any, so a batch is accepted whole or not
+    at all.
+    """
+    import pandas as pd
+
+    missing = [column for column in REQUIRED_COLUMNS if column not in df.columns]
+    if missing:
+        return None, 0, [{'row': None, 'error': f"Missing columns: {', '.join(missing)}"}]
+    if len(df) == 0:
+        return None, 0, [{'row': None, 'error': 'No readings'}]
+
+    today = np.datetime64(today or date.today(), 'D')
+    dates = pd.to_datetime(df['date'], errors='coerce', format='%Y-%m-%d').values.astype('datetime64[D]')
+    floors = pd.to_numeric(df['floor'], errors='coerce').values.astype(np.float64)
+    units = pd.to_numeric(df['unit'], errors='coerce').values.astype(np.float64)
+    features = {feature: pd.to_numeric(df[feature], errors='coerce').values.astype(np.float64)
+                if feature in df.columns else np.full(len(df), np.nan)
+                for feature in FEATURES}
+
+    def not_id(values):
+        return ~np.isfinite(values) | (values < 1) | (values % 1 != 0)
+
+    checks = [
+        ('date must be YYYY-MM-DD', np.isnat(dates)),
+        ('date is in the future', ~np.isnat(dates) & (dates > today)),
+        ('floor must be a positive integer', not_id(floors)),
+        ('unit must be a positive integer', not_id(units)),
+        ('water_usage must be a non-negative number',
+         ~np.isfinite(features['water_usage']) | (features['water_usage'] < 0))
+    ]
+    for feature in CARRIED_FEATURES:
+        checks.append((f'{feature} must be a non-negative number', features[feature] < 0))
+
+    keys = pd.DataFrame({'floor': floors, 'unit': units, 'date': dates})
+    checks.append(('reading repeated in this batch', keys.duplicated(keep=False).values))
+
+    # Fill carried features from each unit's latest reading, one lookup per unit
+    valid_ids = ~(not_id(floors) | not_id(units))
+    unit_rows = keys[valid_ids].groupby(['floor', 'unit']).indices
+    unit_rows = {(int(floor_no), int(unit_no)): np.flatnonzero(valid_ids)[rows]
+                 for (floor_no, unit_no), rows in unit_rows.items()}
+    for feature in CARRIED_FEATURES:
+        column = FEATURES.index(feature)
+        for (floor_no, unit_no), rows in unit_rows.items():
+            unknown = rows[np.isnan(features[feature][rows])]
+            if len(unknown) == 0:
+                continue
+            series = store.series(floor_no, unit_no)
+            if series is not None and len(series):
+                features[feature][unknown] = series.tail(1)[0, column]
+        checks.append((f'{feature} is required for a unit with no readings',
+                       np.isnan(features[feature]) & valid_ids))
+
+    errors = []
+    for message, mask in checks:
+        errors.extend({'row': int(row), 'error': message} for row in np.flatnonzero(mask))
+    if errors:
+        errors.sort(key=lambda error: error['row'])
+        return None, 0, errors
+
+    floors, units = floors.astype(np.int64), units.astype(np.int64)
+    values = np.column_stack([features[feature] for feature in FEATURES])
+
+    # Drop readings the store already has, so a retried batch is harmless
+    known = np.zeros(len(df), dtype=bool)
+    for (floor_no, unit_no), rows in unit_rows.items():
+        series = store.series(floor_no, unit_no)
+        # New readings usually all follow the unit's last one; only older
+        # dates need a search of its history
+        if series is not None and len(series) and dates[rows].min() <= series.dates[-1]:
+            known[rows] = np.isin(dates[rows], series.dates)
+    keep = ~known
+    batch = {'date': dates[keep], 'floor': floors[keep], 'unit': units[keep], 'values': values[keep]}
+    return batch, int(known.sum()), []
@@ -0,0 +1,185 @@
+import logging
+
+import numpy as np
+
+from utils.db import ConnectionPool, connect, db_config_from_env
+from utils.data_store import FEATURES
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ['floor', 'unit', 'date'] + FEATURES
+
+# The primary key is the (floor, unit, date) index: InnoDB clusters rows on
+# it and SQLite does too for a WITHOUT ROWID table, so every per-unit query
+# below is a range scan that reads its rows straight from the index
+SCHEMA = {
+    'mysql': """
+        CREATE TABLE IF NOT EXISTS readings (
+            floor SMALLINT NOT NULL,
+            unit SMALLINT NOT NULL,
+            date DATE NOT NULL,
+            water_usage DOUBLE NOT NULL,
+            num_residents SMALLINT NOT NULL,
+            unit_size INT NOT NULL,
+            PRIMARY KEY (floor, unit, date)
+        ) ENGINE=InnoDB
+    """,
+    'sqlite': """
+        CREATE TABLE IF NOT EXISTS readings (
+            floor INTEGER NOT NULL,
+            unit INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            water_usage REAL NOT NULL,
+            num_residents INTEGER NOT NULL,
+            unit_size INTEGER NOT NULL,
+            PRIMARY KEY (floor, unit, date)
+        ) WITHOUT ROWID
+    """
+}
+
+# Loading a day twice replaces it, so a reload of the same CSV is harmless
+UPSERT_SQL = {
+    'mysql': ('INSERT INTO readings (floor, unit, date, water_usage, num_residents, unit_size) '
+              'VALUES (%s, %s, %s, %s, %s, %s) '
+              'ON DUPLICATE KEY UPDATE water_usage = VALUES(water_usage), '
+              'num_residents = VALUES(num_residents), unit_size = VALUES(unit_size)'),
+    'sqlite': ('INSERT OR REPLACE INTO readings (floor, unit, date, water_usage, num_residents, unit_size) '
+               'VALUES (%s, %s, %s, %s, %s, %s)')
+}
+
+SELECT_ROWS = 'SELECT date, water_usage, num_residents, unit_size FROM readings'
+LAST_N_SQL = SELECT_ROWS + ' WHERE floor = %s AND unit = %s ORDER BY date DESC LIMIT %s'
+WINDOW_SQL = SELECT_ROWS + ' WHERE floor = %s AND unit = %s AND date BETWEEN %s AND %s ORDER BY date'
+FLOOR_ROLLUP_SQL = ('SELECT date, SUM(water_usage), AVG(water_usage), COUNT(*) FROM readings '
+                    'WHERE floor = %s AND date BETWEEN %s AND %s GROUP BY date ORDER BY date')
+UNITS_SQL = 'SELECT DISTINCT floor, unit FROM readings ORDER BY floor, unit'
+
+
+def _rows_to_arrays(rows):
+    """(dates, values) from (date, water_usage, num_residents, unit_size) rows"""
+    if not rows:
+        return np.array([], dtype='datetime64[D]'), np.empty((0, len(FEATURES)))
+    dates = np.array([str(row[0]) for row in rows], dtype='datetime64[D]')
+    values = np.array([row[1:] for row in rows], dtype=np.float64)
+    return dates, values
+
+
+class ReadingsRepository:
+    """Consumption readings in a (floor, unit, date) keyed SQL table
+
+    connection is a factory of with-block connections such as
+    ConnectionPool.connection; engine picks the schema and upsert dialect.
+    recent() has ConsumptionStore's contract, so prepare_prediction_data
+    and the forecasting code accept a repository in place of the store.
+    """
+
+    def __init__(self, connection, engine='mysql'):
+        if engine not in SCHEMA:
+            raise ValueError(f"Unknown engine: {engine}")
+        self.connection = connection
+        self.engine = engine
+
+    @classmethod
+    def from_url(cls, url):
+        """'sqlite:///<file>' for a local database, 'mysql' for the DB_* settings"""
+        if url.startswith('sqlite:///'):
+            config = {'engine': 'sqlite', 'database': url[len('sqlite:///'):]}
+        elif url == 'mysql':
+            config = {**db_config_from_env(), 'engine': 'mysql'}
+        else:
+            raise ValueError(f"Unsupported readings URL: {url}")
+        pool = ConnectionPool(lambda: connect(config), size=1, name='readings')
+        return cls(pool.connection, config['engine'])
+
+    def _query(self, sql, params=()):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+            cursor.close()
+        return rows
+
+    def create_schema(self):
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(SCHEMA[self.engine])
+            conn.commit()
+            cursor.close()
+
+    def load_frame(self, df, batch_size=5000):
+        """Upsert a DataFrame with the CSV's columns in executemany batches"""
+        df = df[COLUMNS].copy()
+        df['date'] = df['date'].astype(str).str[:10]
+        loaded = 0
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            for start in range(0, len(df), batch_size):
+                chunk = df.iloc[start:start + batch_size]
+                rows = [(int(floor), int(unit), date, float(usage), int(residents), int(size))
+                        for floor, unit, date, usage, residents, size in chunk.itertuples(index=False)]
+                cursor.executemany(UPSERT_SQL[self.engine], rows)
+                conn.commit()
+                loaded += len(rows)
+            cursor.close()
+        return loaded
+
+    def load_csv(self, csv_path, batch_size=5000):
+        """Bulk-load the consumption CSV, one committed batch at a time"""
+        import pandas as pd
+
+        self.create_schema()
+        loaded = 0
+        for chunk in pd.read_csv(csv_path, chunksize=batch_size):
+            loaded += self.load_frame(chunk, batch_size)
+        logger.info(f"Loaded {loaded} readings from {csv_path}")
+        return loaded
+
+    def last_n(self, floor_no, unit_no, n):
+        """(dates, values) of a unit's n most recent readings, oldest first"""
+        rows = self._query(LAST_N_SQL, (int(floor_no), int(unit_no), int(n)))
+        return _rows_to_arrays(rows[::-1])
+
+    def window(self, floor_no, unit_no, start, end):
+        """(dates, values) of a unit's readings from start to end inclusive"""
+        return _rows_to_arrays(self._query(WINDOW_SQL, (int(floor_no), int(unit_no), str(start), str(end))))
+
+    def floor_rollup(self, floor_no, start, end):
+        """Per-day total, mean and unit count of a floor's usage from start to end"""
+        rows = self._query(FLOOR_ROLLUP_SQL, (int(floor_no), str(start), str(end)))
+        return {
+            'dates': np.array([str(row[0]) for row in rows], dtype='datetime64[D]'),
+            'total': np.array([row[1] for row in rows], dtype=np.float64),
+            'mean': np.array([row[2] for row in rows], dtype=np.float64),
+            'units': np.array([row[3] for row in rows], dtype=np.int64)
+        }
+
+    def recent(self, floor_no, unit_no, n):
+        """Return the last n readings of a unit as an (n, features) array"""
+        _, values = self.last_n(floor_no, unit_no, n)
+        if len(values) < n:
+            raise ValueError(f"Insufficient data for Floor {floor_no} Unit {unit_no}")
+        return values
+
+    def last_date(self, floor_no, unit_no):
+        """Date of a unit's most recent reading"""
+        dates, _ = self.last_n(floor_no, unit_no, 1)
+        if len(dates) == 0:
+            raise ValueError(f"No readings for Floor {floor_no} Unit {unit_no}")
+        return dates[-1]
+
+    def units(self):
+        """All (floor, unit) pairs present in the table"""
+        return [(int(floor), int(unit)) for floor, unit in self._query(UNITS_SQL)]
+
+    def frame(self, floor_no=None, unit_no=None):
+        """Readings as a DataFrame with the CSV's columns, optionally for one unit"""
+        import pandas as pd
+
+        sql = f"SELECT {', '.join(COLUMNS)} FROM readings"
+        params = ()
+        if floor_no is not None:
+            sql += ' WHERE floor = %s AND unit = %s'
+            params = (int(floor_no), int(unit_no))
+        df = pd.DataFrame(self._query(sql + ' ORDER BY floor, unit, date', params), columns=COLUMNS)
+        df['date'] = pd.to_datetime(df['date'].astype(str))
+        return df[['date', 'floor', 'unit'] + FEATURES]
@@ -0,0 +1,93 @@
+import os
+import re
+import logging
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PATTERN = re.compile(r'^segment_(\d{8})\.npz$')
+
+
+class SegmentStore:
+    """Append-only log of reading batches, one immutable file per batch
+
+    Each accepted batch is written as segment_<seq>.npz holding its date,
+    floor, unit and values arrays. Segments are never rewritten, so
+    appending costs the size of the batch, not of the history. A segment
+    is published with os.link, which fails if the name is taken, so
+    preforked workers appending at the same time get distinct sequence
+    numbers and readers never see a partial file.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._next_seq = None
+        self.appended = 0
+
+    def _sequences(self):
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        return sorted(int(match.group(1)) for match in map(SEGMENT_PATTERN.match, names) if match)
+
+    def _path(self, seq):
+        return os.path.join(self.directory, f'segment_{seq:08d}.npz')
+
+    def mtime(self):
+        """Changes whenever a segment is added, so readers can poll cheaply"""
+        try:
+            return os.stat(self.directory).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def append(self, batch):
+        """Write a batch dict of arrays as the next segment; returns its sequence number"""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            tmp_path = os.path.join(self.directory, f'.segment_{os.getpid()}_{threading.get_ident()}.npz')
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, **batch)
+                f.flush()
+                os.fsync(f.fileno())
+            try:
+                if self._next_seq is None:
+                    sequences = self._sequences()
+                    self._next_seq = sequences[-1] + 1 if sequences else 1
+                while True:
+                    seq = self._next_seq
+                    self._next_seq += 1
+                    try:
+                        os.link(tmp_path, self._path(seq))
+                        break
+                    except FileExistsError:
+                        # Another process took this number; move past it
+                        continue
+            finally:
+                os.remove(tmp_path)
+            self.appended += 1
+        return seq
+
+    def read_after(self, seq=0):
+        """(sequence, batch) for every segment numbered above seq, in order
+
+        Numbers are handed out without gaps, so this probes seq + 1,
+        seq + 2, ... and costs the new segments only, not the whole log.
+        """
+        while True:
+            seq += 1
+            try:
+                with np.load(self._path(seq), allow_pickle=False) as archive:
+                    batch = {name: archive[name] for name in archive.files}
+            except FileNotFoundError:
+                return
+            yield seq, batch
+
+    def stats(self):
+        return {
+            'directory': self.directory,
+            'appended': self.appended
+        }
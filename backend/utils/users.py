@@ -0,0 +1,190 @@
+import io
+import csv
+import json
+import logging
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+INSERT_USER_SQL = ('INSERT INTO users (name, flat_no, phone_number, email, password_hash) '
+                   'VALUES (%s, %s, %s, %s, %s)')
+SELECT_USERS_SQL = 'SELECT id, name, flat_no, phone_number, email FROM users'
+# Keyset page: rows after the last id seen, so a deep page costs the same as the first
+PAGE_USERS_SQL = SELECT_USERS_SQL + ' WHERE id > %s ORDER BY id LIMIT %s'
+
+# CSV header names accepted for each INSERT_USER_SQL column, in order
+USER_COLUMNS = (
+    ('name',),
+    ('flat_no', 'flatNo'),
+    ('phone_number', 'phoneNumber'),
+    ('email',),
+    ('password', 'password_hash')
+)
+
+
+class UserImportError(Exception):
+    """A bulk import failed after committing `imported` rows"""
+
+    def __init__(self, message, imported):
+        super().__init__(message)
+        self.imported = imported
+
+
+def user_params(data):
+    """INSERT_USER_SQL parameters from a /api/register body"""
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    return (
+        data.get('name'),
+        data.get('flatNo'),
+        data.get('phoneNumber'),
+        data.get('email'),
+        data.get('password')  # Ensure to hash this in production
+    )
+
+
+def read_user_csv(f, email_columns=None):
+    """INSERT_USER_SQL parameters for each row of a CSV file object
+
+    Columns are matched by the names in USER_COLUMNS. With email_columns,
+    e.g. ('sender', 'receiver') for emails.csv, every distinct address in
+    those columns becomes a user with only the email set. Rows are read
+    lazily, so a large file is never held in memory.
+    """
+    reader = csv.DictReader(f)
+    if email_columns:
+        missing = [column for column in email_columns if column not in (reader.fieldnames or ())]
+        if missing:
+            raise ValueError(f"Email columns not in CSV header: {', '.join(missing)}")
+        seen = set()
+        for row in reader:
+            for column in email_columns:
+                email = (row[column] or '').strip()
+                if email and email not in seen:
+                    seen.add(email)
+                    yield (None, None, None, email, None)
+        return
+
+    columns = []
+    for aliases in USER_COLUMNS:
+        columns.append(next((name for name in aliases if name in (reader.fieldnames or ())), None))
+    if columns[3] is None:
+        raise ValueError("CSV has no email column; pass email_columns to pick one")
+    for row in reader:
+        params = tuple(row[column] if column else None for column in columns)
+        if params[3]:
+            yield params
+
+
+def parse_bulk_users(body, content_type, email_columns=None):
+    """INSERT_USER_SQL parameters from a /api/register/bulk request body
+
+    A text/csv body is read with read_user_csv. Otherwise the body is JSON:
+    a list of /api/register objects, or {"users": [...]}.
+    """
+    if content_type and content_type.startswith('text/csv'):
+        return list(read_user_csv(io.StringIO(body.decode('utf-8')), email_columns))
+
+    data = json.loads(body)
+    if isinstance(data, dict):
+        data = data.get('users')
+    if not isinstance(data, list):
+        raise ValueError("Expected a list of users or {\"users\": [...]}")
+    return [user_params(user) for user in data]
+
+
+def batches(rows, batch_size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def insert_users(connection, rows, batch_size=500):
+    """Insert INSERT_USER_SQL parameter tuples with executemany
+
+    Each batch of batch_size rows is one multi-row INSERT committed as one
+    transaction, on a single connection from the connection() factory. On
+    failure the current batch is rolled back and UserImportError reports
+    how many rows were already committed.
+    """
+    imported = 0
+    with connection() as conn:
+        cursor = conn.cursor()
+        try:
+            for batch in batches(rows, batch_size):
+                cursor.executemany(INSERT_USER_SQL, batch)
+                conn.commit()
+                imported += len(batch)
+        except Exception as e:
+            conn.rollback()
+            raise UserImportError(f"User import failed after {imported} rows: {e}", imported) from e
+        finally:
+            cursor.close()
+    logger.info(f"Imported {imported} users")
+    return imported
+
+
+def page_params(limit, after, max_page):
+    """(limit, after id) from /api/users query strings, limit clamped to [1, max_page]"""
+    try:
+        limit, after = int(limit), int(after)
+    except (TypeError, ValueError):
+        raise ValueError("limit and after must be integers")
+    if after < 0:
+        raise ValueError("after must not be negative")
+    return max(1, min(limit, max_page)), after
+
+
+def fetch_users_page(conn, after_id=0, limit=100):
+    cursor = conn.cursor(dictionary=True)
+    cursor.execute(PAGE_USERS_SQL, (after_id, limit))
+    users = cursor.fetchall()
+    cursor.close()
+    return users
+
+
+def iter_user_pages(connection, page_size=500, after_id=0):
+    """Pages of users in id order, each fetched on its own short checkout
+
+    A slow client reading a long stream therefore never pins a pooled
+    connection, and only one page is in memory at a time.
+    """
+    while True:
+        with connection() as conn:
+            page = fetch_users_page(conn, after_id, page_size)
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        after_id = page[-1]['id']
+
+
+def encode_users_page(page, first, ndjson=False):
+    """One page of a streamed /api/users body"""
+    if ndjson:
+        return ''.join(json.dumps(user, default=str) + '\n' for user in page)
+    chunk = ','.join(json.dumps(user, default=str) for user in page)
+    return chunk if first else ',' + chunk
+
+
+# A streamed JSON listing is these around the pages: the same body as the
+# non-streamed /api/users response
+USERS_STREAM_HEAD = '{"success": true, "users": ['
+USERS_STREAM_TAIL = ']}'
+
+
+def stream_users(pages, ndjson=False):
+    """Encode an iterable of user pages as a /api/users body, chunk by chunk"""
+    if not ndjson:
+        yield USERS_STREAM_HEAD
+    first = True
+    for page in pages:
+        if page:
+            yield encode_users_page(page, first, ndjson)
+            first = False
+    if not ndjson:
+        yield USERS_STREAM_TAIL